@@ -0,0 +1,343 @@
+"""
+Indicator-based alert rules
+Drop-below targets, percent moves over a time window, SMA/EMA crosses and
+Bollinger band breakouts. Each coin keeps one rolling indicator per distinct
+(kind, period), updated in O(1) per price; rules only reference an indicator
+and are evaluated together in one batched pass like ThresholdEngine.
+"""
+
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from fx_rates import format_money
+
+RULE_KINDS = ('above', 'below', 'change', 'sma', 'ema', 'bollinger')
+# Rules that alert on a cross; their first known state is taken without alerting
+CROSS_KINDS = ('sma', 'ema', 'bollinger')
+
+NAN = float('nan')
+
+
+class AlertRule(NamedTuple):
+    coin: str
+    kind: str                       # One of RULE_KINDS
+    direction: str                  # 'above' or 'below'
+    value: float = 0.0              # Target price, percent move or band width in standard deviations
+    period: float = 0.0             # Price updates for sma/ema/bollinger, seconds for change
+    chat_id: Optional[int] = None   # None notifies the default chat
+
+    def describe(self, currency: str = 'usd') -> str:
+        if self.kind in ('above', 'below'):
+            return f"{self.kind} {format_money(self.value, currency)}"
+        if self.kind == 'change':
+            return f"{'rise' if self.value > 0 else 'drop'} of {abs(self.value):g}% within {self.period / 60:g} min"
+        if self.kind == 'bollinger':
+            return f"breaks {self.direction} Bollinger band ({self.period:g} updates, {self.value:g}σ)"
+        return f"crosses {self.direction} {self.kind.upper()}({self.period:g})"
+
+
+class RuleEvent(NamedTuple):
+    rule: AlertRule
+    price: float
+    indicator: float    # Percent move for change rules, otherwise the level the price was compared with
+    fired: bool         # True when the condition became true, False when it was re-armed
+
+
+def parse_rule(spec: Dict) -> AlertRule:
+    """Build a rule from a config dict such as {"coin": "bitcoin", "type": "below", "price": 100000}"""
+    kind = spec.get('type')
+    if kind not in RULE_KINDS:
+        raise ValueError(f"Unknown alert rule type {kind!r}, expected one of: {', '.join(RULE_KINDS)}")
+    coin = spec.get('coin')
+    if not isinstance(coin, str) or not coin.strip():
+        raise ValueError(f"Alert rule {spec} has no coin")
+
+    try:
+        chat_id = spec.get('chat_id')
+        chat_id = int(chat_id) if chat_id is not None else None
+        if kind in ('above', 'below'):
+            return AlertRule(coin, kind, kind, float(spec['price']), chat_id=chat_id)
+        if kind == 'change':
+            percent = float(spec['percent'])
+            if percent == 0:
+                raise ValueError(f"Alert rule {spec} needs a non-zero percent")
+            return AlertRule(coin, kind, 'above' if percent > 0 else 'below', percent,
+                             float(spec['window_minutes']) * 60, chat_id)
+
+        direction = spec.get('direction', 'above')
+        if direction not in ('above', 'below'):
+            raise ValueError(f"Alert rule {spec} direction must be 'above' or 'below'")
+        period = int(spec['period'])
+        if period < 2:
+            raise ValueError(f"Alert rule {spec} needs a period of at least 2")
+        width = float(spec.get('width', 2)) if kind == 'bollinger' else 0.0
+        return AlertRule(coin, kind, direction, width, period, chat_id)
+    except KeyError as e:
+        raise ValueError(f"Alert rule {spec} is missing {e.args[0]!r}")
+    except (TypeError, OverflowError) as e:
+        # e.g. a list or table where a number belongs
+        raise ValueError(f"Alert rule {spec} has an invalid value: {e}")
+
+
+class RollingMean:
+    """Mean and standard deviation of the last period prices, kept in a ring buffer"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._window = [0.0] * period
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        # Prices are summed relative to the first one to limit rounding error
+        self._anchor: Optional[float] = None
+
+    def update(self, price: float, timestamp: float) -> Tuple[float, float, float]:
+        if self._anchor is None:
+            self._anchor = price
+        x = price - self._anchor
+        old = self._window[self._next]
+        self._window[self._next] = x
+        self._next = (self._next + 1) % self.period
+
+        if self._count < self.period:
+            self._count += 1
+            self._sum += x
+            self._sum_sq += x * x
+        elif self._next == 0:
+            # Once per lap, resum the window so running-sum drift cannot build up
+            self._sum = math.fsum(self._window)
+            self._sum_sq = math.fsum(v * v for v in self._window)
+        else:
+            self._sum += x - old
+            self._sum_sq += x * x - old * old
+
+        if self._count < self.period:
+            return price, NAN, NAN
+        mean = self._sum / self.period
+        variance = max(self._sum_sq / self.period - mean * mean, 0.0)
+        return price, self._anchor + mean, math.sqrt(variance)
+
+
+class ExponentialMean:
+    """Exponential moving average with smoothing 2 / (period + 1)"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self._ema: Optional[float] = None
+        self._count = 0
+
+    def update(self, price: float, timestamp: float) -> Tuple[float, float, float]:
+        self._ema = price if self._ema is None else self._ema + self.alpha * (price - self._ema)
+        self._count += 1
+        # The average means little before it has seen a period of prices
+        return price, self._ema if self._count >= self.period else NAN, 0.0
+
+
+class WindowChange:
+    """Percent change from the oldest price within the last window seconds"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._points = deque()
+
+    def update(self, price: float, timestamp: float) -> Tuple[float, float, float]:
+        points = self._points
+        points.append((timestamp, price))
+        cutoff = timestamp - self.window
+        while points[0][0] < cutoff:
+            points.popleft()
+        reference = points[0][1]
+        return (price - reference) / reference * 100 if reference else NAN, 0.0, 0.0
+
+
+class LastPrice:
+    def update(self, price: float, timestamp: float) -> Tuple[float, float, float]:
+        return price, 0.0, 0.0
+
+
+def _indicator_key(rule: AlertRule) -> tuple:
+    """Rules with the same key share one indicator"""
+    if rule.kind in ('above', 'below'):
+        return rule.coin, 'price'
+    if rule.kind in ('sma', 'bollinger'):
+        return rule.coin, 'mean', rule.period
+    return rule.coin, rule.kind, rule.period
+
+
+def _create_indicator(key: tuple):
+    kind = key[1]
+    if kind == 'price':
+        return LastPrice()
+    if kind == 'mean':
+        return RollingMean(int(key[2]))
+    if kind == 'ema':
+        return ExponentialMean(int(key[2]))
+    return WindowChange(key[2])
+
+
+class RuleEngine:
+    def __init__(self):
+        self.rules: List[AlertRule] = []
+        self._indicators: List = []
+        self._indicator_index: Dict[tuple, int] = {}
+        self._coin_indicators: Dict[str, List[int]] = {}
+
+        # Latest (value, base, scale) per indicator, NaN when its coin had no price this round
+        self._values = np.empty(0, dtype=np.float64)
+        self._bases = np.empty(0, dtype=np.float64)
+        self._scales = np.empty(0, dtype=np.float64)
+
+        # One row per rule: it holds while direction * (value - (base + width * scale + offset)) >= 0
+        self.indicator_idx = np.empty(0, dtype=np.int32)
+        self.direction = np.empty(0, dtype=np.int8)
+        self.width = np.empty(0, dtype=np.float64)
+        self.offset = np.empty(0, dtype=np.float64)
+        self.active = np.empty(0, dtype=bool)
+        self.primed = np.empty(0, dtype=bool)
+        self.reports_value = np.empty(0, dtype=bool)   # Events carry the move itself rather than the level
+
+    @classmethod
+    def from_config(cls, specs: Iterable[Dict]) -> 'RuleEngine':
+        """Build an engine from [[rules]] tables of the targets file"""
+        engine = cls()
+        engine.add_many(parse_rule(spec) for spec in specs)
+        return engine
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[AlertRule]) -> 'RuleEngine':
+        engine = cls()
+        engine.add_many(rules)
+        return engine
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def add_many(self, rules: Iterable[AlertRule]):
+        rules = list(rules)
+        if not rules:
+            return
+
+        indicator_idx, direction, width, offset = [], [], [], []
+        for rule in rules:
+            indicator_idx.append(self._intern_indicator(rule))
+            sign = 1 if rule.direction == 'above' else -1
+            direction.append(sign)
+            if rule.kind == 'bollinger':
+                width.append(sign * rule.value)
+                offset.append(0.0)
+            else:
+                width.append(0.0)
+                offset.append(rule.value if rule.kind in ('above', 'below', 'change') else 0.0)
+
+        self.rules.extend(rules)
+        self.indicator_idx = np.concatenate([self.indicator_idx, np.array(indicator_idx, dtype=np.int32)])
+        self.direction = np.concatenate([self.direction, np.array(direction, dtype=np.int8)])
+        self.width = np.concatenate([self.width, np.array(width, dtype=np.float64)])
+        self.offset = np.concatenate([self.offset, np.array(offset, dtype=np.float64)])
+        self.active = np.concatenate([self.active, np.zeros(len(rules), dtype=bool)])
+        # Level rules alert on a fresh start like the configured targets, crosses wait for one
+        self.primed = np.concatenate([self.primed, np.array([rule.kind not in CROSS_KINDS for rule in rules])])
+        self.reports_value = np.concatenate([self.reports_value, np.array([rule.kind == 'change' for rule in rules])])
+
+    def evaluate(self, prices: Dict[str, float], timestamp: Optional[float] = None) -> List[RuleEvent]:
+        """Feed a snapshot to the indicators and return rules that fired or re-armed
+
+        Coins missing from the snapshot neither update their indicators nor
+        change rule state.
+        """
+        if not self.rules:
+            return []
+        timestamp = timestamp if timestamp is not None else time.time()
+
+        values, bases, scales = self._values, self._bases, self._scales
+        values.fill(NAN)
+        for coin, price in prices.items():
+            for i in self._coin_indicators.get(coin, ()):
+                values[i], bases[i], scales[i] = self._indicators[i].update(price, timestamp)
+
+        idx = self.indicator_idx
+        value = values[idx]
+        level = bases[idx] + self.width * scales[idx] + self.offset
+        # NaN compares False both ways, so warming-up indicators and missing coins keep their state
+        holds = np.where(self.direction > 0, value >= level, value <= level)
+        known = (value == value) & (level == level)
+
+        unprimed = known & ~self.primed
+        if unprimed.any():
+            self.active[unprimed] = holds[unprimed]
+            self.primed |= unprimed
+
+        fired = known & holds & ~self.active
+        rearmed = known & ~holds & self.active
+        changed = np.flatnonzero(fired | rearmed)
+        if not len(changed):
+            return []
+
+        now_active = fired[changed]
+        self.active[changed] = now_active
+        indicators = np.where(self.reports_value[changed], value[changed], level[changed])
+        rules = self.rules
+        return [
+            RuleEvent(rules[i], prices[rules[i].coin], indicator, is_fired)
+            for i, indicator, is_fired in zip(changed.tolist(), indicators.tolist(), now_active.tolist())
+        ]
+
+    def adopt_state(self, previous: 'RuleEngine', reset_coins: Iterable[str] = ()):
+        """Take over indicators and alert state of rules that also exist in previous
+
+        Coins in reset_coins start over, e.g. because their prices are now
+        quoted in another currency.
+        """
+        reset_coins = set(reset_coins)
+        for key, i in self._indicator_index.items():
+            old = previous._indicator_index.get(key)
+            if old is not None and key[0] not in reset_coins:
+                self._indicators[i] = previous._indicators[old]
+
+        old_rows: Dict[AlertRule, List[int]] = {}
+        for i, rule in enumerate(previous.rules):
+            old_rows.setdefault(rule, []).append(i)
+        for i, rule in enumerate(self.rules):
+            rows = old_rows.get(rule) if rule.coin not in reset_coins else None
+            if rows:
+                j = rows.pop(0)
+                self.active[i] = previous.active[j]
+                self.primed[i] = previous.primed[j]
+
+    def to_state(self) -> List[list]:
+        """Alert state of rules that have one, as JSON-ready [*rule fields, active] lists"""
+        return [
+            [*rule, active]
+            for rule, active, primed in zip(self.rules, self.active.tolist(), self.primed.tolist()) if primed
+        ]
+
+    def restore_state(self, state: Iterable[list], reset_coins: Iterable[str] = ()):
+        """Set alert state from to_state() output; rules not in it, or for coins in reset_coins, start over"""
+        reset_coins = set(reset_coins)
+        saved: Dict[AlertRule, List[bool]] = {}
+        for entry in state:
+            if isinstance(entry, list) and len(entry) == len(AlertRule._fields) + 1:
+                saved.setdefault(AlertRule(*entry[:-1]), []).append(bool(entry[-1]))
+        for i, rule in enumerate(self.rules):
+            flags = saved.get(rule) if rule.coin not in reset_coins else None
+            if flags:
+                self.active[i] = flags.pop(0)
+                self.primed[i] = True
+
+    def _intern_indicator(self, rule: AlertRule) -> int:
+        key = _indicator_key(rule)
+        index = self._indicator_index.get(key)
+        if index is None:
+            index = self._indicator_index[key] = len(self._indicators)
+            self._indicators.append(_create_indicator(key))
+            self._coin_indicators.setdefault(rule.coin, []).append(index)
+            self._values = np.append(self._values, NAN)
+            self._bases = np.append(self._bases, NAN)
+            self._scales = np.append(self._scales, NAN)
+        return index
@@ -0,0 +1,428 @@
+"""
+Backtest price targets against historical prices
+Streams a CSV or Parquet price file in fixed-size chunks through the same
+fire/re-arm rule as ThresholdEngine and reports how many alerts each target
+would have sent. Candidate targets are evaluated together with one pass over
+the file; chunks are spread over a process pool. Coins, targets and their
+currencies come from targets.toml (TARGETS_FILE); prices in the file must be
+in each coin's currency.
+
+Input is either one row per price (timestamp,coin,price) or one row per
+snapshot (timestamp,bitcoin,ethereum,...), sorted by time. Coins may be named
+as in targets.toml, by CoinGecko ID or by symbol. Timestamps are epoch seconds,
+epoch milliseconds or ISO 8601.
+
+Usage: python backtest.py prices.csv [--sweep 0.8:1.2:0.05] [--workers 4]
+"""
+
+import os
+import csv
+import sys
+import time
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from coin_config import load_config
+from fx_rates import format_money
+
+TIMESTAMP_COLUMNS = ('timestamp', 'ts', 'time', 'date', 'datetime')
+DEFAULT_CHUNK_ROWS = 250_000
+# Max prices x targets compared in one task, bounds a task's memory to a few MB
+TASK_CELLS = 4_000_000
+# Distinct coin labels per chunk matched one by one before falling back to a sort
+MAX_LABEL_SCANS = 32
+
+Series = Tuple[np.ndarray, np.ndarray]   # (epoch seconds, prices)
+
+
+class ChunkSummary(NamedTuple):
+    """Alert activity of every target within one run of consecutive prices"""
+    start: float                # Timestamp of the first price
+    first_above: np.ndarray     # Whether the first price was at or above each target
+    last_above: np.ndarray
+    fires: np.ndarray           # Crossings within the run, not counting its first price
+    resets: np.ndarray
+    first_fire: np.ndarray      # Timestamps, NaN where the target never fired
+    last_fire: np.ndarray
+    rows: int
+    seconds: float
+
+
+def crossings(timestamps: np.ndarray, prices: np.ndarray, targets: np.ndarray) -> ChunkSummary:
+    """Find where prices cross each target; runs in pool workers"""
+    started = time.perf_counter()
+    # A target is notified exactly while the last price was at or above it
+    above = prices[:, None] >= targets[None, :]
+    fired = above[1:] & ~above[:-1]
+    reset = ~above[1:] & above[:-1]
+
+    first_fire = np.full(len(targets), np.nan)
+    last_fire = np.full(len(targets), np.nan)
+    if len(fired):
+        has_fired = fired.any(axis=0)
+        after_first = timestamps[1:]
+        first_fire[has_fired] = after_first[fired.argmax(axis=0)][has_fired]
+        last_fire[has_fired] = after_first[len(fired) - 1 - fired[::-1].argmax(axis=0)][has_fired]
+
+    return ChunkSummary(
+        float(timestamps[0]), above[0], above[-1], fired.sum(axis=0), reset.sum(axis=0),
+        first_fire, last_fire, len(prices), time.perf_counter() - started
+    )
+
+
+class TargetTally:
+    """Alert counts for a coin's candidate targets, fed chunk summaries in time order"""
+
+    def __init__(self, targets: np.ndarray):
+        self.targets = targets
+        # Like a fresh ThresholdEngine, nothing has been notified yet
+        self.notified = np.zeros(len(targets), dtype=bool)
+        self.fires = np.zeros(len(targets), dtype=np.int64)
+        self.resets = np.zeros(len(targets), dtype=np.int64)
+        self.first_fire = np.full(len(targets), np.nan)
+        self.last_fire = np.full(len(targets), np.nan)
+        self.rows = 0
+        self.seconds = 0.0
+
+    def add(self, summary: ChunkSummary):
+        # The chunk's first price is compared with the state the previous chunk left
+        boundary_fire = summary.first_above & ~self.notified
+        boundary_reset = ~summary.first_above & self.notified
+        self.fires += summary.fires + boundary_fire
+        self.resets += summary.resets + boundary_reset
+
+        chunk_first = np.where(boundary_fire, summary.start, summary.first_fire)
+        chunk_last = np.where(np.isnan(summary.last_fire), np.where(boundary_fire, summary.start, np.nan),
+                              summary.last_fire)
+        self.first_fire = np.where(np.isnan(self.first_fire), chunk_first, self.first_fire)
+        self.last_fire = np.where(np.isnan(chunk_last), self.last_fire, chunk_last)
+
+        self.notified = summary.last_above
+        self.rows += summary.rows
+        self.seconds += summary.seconds
+
+
+def coin_aliases(crypto_config: Dict[str, Dict]) -> Dict[str, str]:
+    """Map every name a coin may appear under in a price file to its config name"""
+    aliases = {}
+    for coin_name, config in crypto_config.items():
+        for alias in (coin_name, config['coingecko_id'], config['symbol']):
+            aliases[alias.lower()] = coin_name
+    return aliases
+
+
+def _to_seconds(raw: np.ndarray) -> np.ndarray:
+    """Convert a timestamp column to epoch seconds"""
+    if raw.dtype.kind == 'M':
+        return raw.astype('datetime64[ms]').astype(np.int64) / 1000.0
+    if raw.dtype.kind in 'UO':
+        try:
+            raw = raw.astype(np.float64)
+        except ValueError:
+            return np.array(raw, dtype='datetime64[ms]').astype(np.int64) / 1000.0
+    seconds = raw.astype(np.float64)
+    # Epoch milliseconds would be centuries from now as seconds
+    if len(seconds) and seconds[0] > 1e11:
+        seconds = seconds / 1000.0
+    return seconds
+
+
+def _timestamp_column(columns: List[str]) -> int:
+    for name in TIMESTAMP_COLUMNS:
+        if name in columns:
+            return columns.index(name)
+    raise ValueError(f"No timestamp column, expected one of: {', '.join(TIMESTAMP_COLUMNS)}")
+
+
+def _split_long(timestamps: np.ndarray, labels: np.ndarray, prices: np.ndarray,
+                aliases: Dict[str, str]) -> Tuple[Dict[str, Series], int]:
+    """Split (timestamp, coin, price) rows by coin, returns series and unknown row count"""
+    coin_names = sorted(set(aliases.values()))
+    coin_index = {coin_name: i for i, coin_name in enumerate(coin_names)}
+    codes = np.full(len(labels), -1, dtype=np.int32)
+
+    def label_code(label) -> int:
+        return coin_index.get(aliases.get(str(label).strip().lower()), -1)
+
+    remaining = np.ones(len(labels), dtype=bool)
+    for _ in range(MAX_LABEL_SCANS):
+        if not remaining.any():
+            break
+        # One comparison per distinct label is far cheaper than sorting strings
+        label = labels[remaining.argmax()]
+        mask = labels == label
+        codes[mask] = label_code(label)
+        remaining &= ~mask
+    if remaining.any():
+        # The file lists many more coins than are configured
+        rest = np.flatnonzero(remaining)
+        distinct, inverse = np.unique(labels[rest], return_inverse=True)
+        codes[rest] = np.array([label_code(label) for label in distinct], dtype=np.int32)[inverse]
+
+    series = {}
+    for i, coin_name in enumerate(coin_names):
+        mask = codes == i
+        if mask.any():
+            series[coin_name] = (timestamps[mask], prices[mask])
+    return series, int((codes < 0).sum())
+
+
+def read_csv(path: str, aliases: Dict[str, str],
+             chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[Dict[str, Series], int]]:
+    """Yield ({coin: (timestamps, prices)}, skipped rows) for each chunk of a CSV file"""
+    with open(path, newline='') as f:
+        columns = [name.strip().lower() for name in next(csv.reader([f.readline()]))]
+        ts_col = _timestamp_column(columns)
+        long_format = 'coin' in columns and 'price' in columns
+
+        # Numeric timestamps are parsed as floats, strings take 4 bytes per character
+        first = f.readline()
+        try:
+            float(first.split(',')[ts_col])
+            ts_dtype = 'f8'
+        except (ValueError, IndexError):
+            ts_dtype = 'U32'
+
+        if long_format:
+            usecols = (ts_col, columns.index('coin'), columns.index('price'))
+            dtype = [('ts', ts_dtype), ('coin', 'U32'), ('price', 'f8')]
+        else:
+            coin_cols = [(i, aliases[name]) for i, name in enumerate(columns) if name in aliases]
+            if not coin_cols:
+                raise ValueError(f"No configured coins among the columns of {path}")
+            usecols = (ts_col, *(i for i, _ in coin_cols))
+            dtype = [('ts', ts_dtype), *((f"c{i}", 'f8') for i, _ in coin_cols)]
+
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if first:
+                lines.insert(0, first)
+                first = ''
+            if not lines:
+                return
+            rows = np.loadtxt(lines, delimiter=',', dtype=dtype, usecols=usecols, ndmin=1)
+            timestamps = _to_seconds(rows['ts'])
+            if long_format:
+                yield _split_long(timestamps, rows['coin'], rows['price'], aliases)
+            else:
+                yield {coin_name: (timestamps, rows[f"c{i}"]) for i, coin_name in coin_cols}, 0
+
+
+def read_parquet(path: str, aliases: Dict[str, str],
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[Dict[str, Series], int]]:
+    """Yield ({coin: (timestamps, prices)}, skipped rows) for each row batch of a Parquet file"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+
+    parquet = pq.ParquetFile(path)
+    names = parquet.schema_arrow.names
+    columns = [name.lower() for name in names]
+    ts_name = names[_timestamp_column(columns)]
+    long_format = 'coin' in columns and 'price' in columns
+
+    if long_format:
+        coin_name_col, price_col = names[columns.index('coin')], names[columns.index('price')]
+        wanted = [ts_name, coin_name_col, price_col]
+    else:
+        coin_cols = [(name, aliases[name.lower()]) for name in names if name.lower() in aliases]
+        if not coin_cols:
+            raise ValueError(f"No configured coins among the columns of {path}")
+        wanted = [ts_name, *(name for name, _ in coin_cols)]
+
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=wanted):
+        data = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in wanted}
+        timestamps = _to_seconds(data[ts_name])
+        if long_format:
+            yield _split_long(timestamps, data[coin_name_col], data[price_col].astype(np.float64), aliases)
+        else:
+            yield {coin_name: (timestamps, data[name].astype(np.float64)) for name, coin_name in coin_cols}, 0
+
+
+def read_prices(path: str, aliases: Dict[str, str],
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[Dict[str, Series], int]]:
+    """Pick a reader by file extension"""
+    if path.lower().endswith(('.parquet', '.pq')):
+        return read_parquet(path, aliases, chunk_rows)
+    return read_csv(path, aliases, chunk_rows)
+
+
+def parse_sweep(spec: str) -> np.ndarray:
+    """Parse START:STOP:STEP into target multipliers, STOP included"""
+    try:
+        start, stop, step = (float(part) for part in spec.split(':'))
+    except ValueError:
+        raise ValueError(f"Invalid sweep {spec!r}, expected START:STOP:STEP such as 0.8:1.2:0.05")
+    if step <= 0 or stop < start:
+        raise ValueError(f"Invalid sweep {spec!r}, STEP must be positive and STOP at least START")
+    return np.round(np.arange(start, stop + step / 2, step), 10)
+
+
+def candidate_targets(crypto_config: Dict[str, Dict],
+                      multipliers: Optional[np.ndarray] = None) -> Dict[str, Dict[str, np.ndarray]]:
+    """Return {coin: {level: targets}}, the configured targets scaled by each multiplier"""
+    if multipliers is None:
+        multipliers = np.ones(1)
+    return {
+        coin_name: {
+            level: config[f"{level}_price"] * multipliers for level in ('realistic', 'optimistic')
+        }
+        for coin_name, config in crypto_config.items()
+    }
+
+
+class BacktestResult(NamedTuple):
+    tallies: Dict[str, TargetTally]
+    candidates: Dict[str, Dict[str, np.ndarray]]
+    rows: int
+    skipped: int
+    seconds: float
+
+
+def run_backtest(path: str, candidates: Dict[str, Dict[str, np.ndarray]], workers: int = 1,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 crypto_config: Optional[Mapping] = None) -> BacktestResult:
+    """Replay a price file once against every candidate target; coins default to the targets file"""
+    started = time.perf_counter()
+    crypto_config = crypto_config if crypto_config is not None else load_config().coins
+    aliases = coin_aliases({coin_name: crypto_config[coin_name] for coin_name in candidates})
+    tallies = {
+        coin_name: TargetTally(np.unique(np.concatenate(list(levels.values()))))
+        for coin_name, levels in candidates.items()
+    }
+    rows = skipped = 0
+
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    # Results are folded in submission order; a bounded queue keeps memory flat
+    pending = deque()
+
+    def fold(limit: int):
+        while len(pending) > limit:
+            coin_name, result = pending.popleft()
+            tallies[coin_name].add(result.result() if pool else result)
+
+    try:
+        for series, chunk_skipped in read_prices(path, aliases, chunk_rows):
+            skipped += chunk_skipped
+            for coin_name, (timestamps, prices) in series.items():
+                # Missing prices leave alert state untouched, as in ThresholdEngine
+                known = ~np.isnan(prices)
+                if not known.all():
+                    timestamps, prices = timestamps[known], prices[known]
+                rows += len(prices)
+
+                targets = tallies[coin_name].targets
+                step = max(2, TASK_CELLS // len(targets))
+                for offset in range(0, len(prices), step):
+                    args = (timestamps[offset:offset + step], prices[offset:offset + step], targets)
+                    pending.append((coin_name, pool.submit(crossings, *args) if pool else crossings(*args)))
+                    fold(2 * workers)
+        fold(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return BacktestResult(tallies, candidates, rows, skipped, time.perf_counter() - started)
+
+
+def _money(value: float, currency: str = 'usd', width: int = 14) -> str:
+    return format_money(value, currency).rjust(width)
+
+
+def _format_time(timestamp: float) -> str:
+    return '-' if np.isnan(timestamp) else f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M}"
+
+
+def print_report(result: BacktestResult, crypto_config: Mapping):
+    """Print alert counts per coin and target"""
+    rate = result.rows / result.seconds if result.seconds else 0
+    print(f"Replayed {result.rows:,} prices in {result.seconds:.2f}s ({rate:,.0f}/s), "
+          f"{result.skipped:,} rows of other coins skipped\n")
+
+    for coin_name, tally in result.tallies.items():
+        symbol = crypto_config[coin_name]['symbol']
+        currency = crypto_config[coin_name].get('currency', 'usd')
+        print(f"{symbol}: {tally.rows:,} prices, {tally.seconds:.2f}s evaluating")
+        if not tally.rows:
+            print()
+            continue
+
+        levels = result.candidates[coin_name]
+        if all(len(targets) == 1 for targets in levels.values()):
+            for level, targets in levels.items():
+                i = np.searchsorted(tally.targets, targets[0])
+                print(f"  {level.title():<10} {_money(targets[0], currency)}: {tally.fires[i]:>6,} alerts, "
+                      f"{tally.resets[i]:>6,} resets, first {_format_time(tally.first_fire[i])}, "
+                      f"last {_format_time(tally.last_fire[i])}")
+        else:
+            print(f"  {'Realistic':>14} {'Optimistic':>14} {'Alerts':>8}")
+            for realistic, optimistic, alerts in sweep_rows(tally, levels):
+                print(f"  {_money(realistic, currency)} {_money(optimistic, currency)} {alerts:>8,}")
+        print()
+
+
+def sweep_rows(tally: TargetTally, levels: Dict[str, np.ndarray]) -> List[Tuple[float, float, int]]:
+    """Total alerts of every (realistic, optimistic) pair with realistic below optimistic"""
+    fires = dict(zip(tally.targets.tolist(), tally.fires.tolist()))
+    return [
+        (realistic, optimistic, fires[realistic] + fires[optimistic])
+        for realistic in levels['realistic'].tolist()
+        for optimistic in levels['optimistic'].tolist()
+        if realistic < optimistic
+    ]
+
+
+def write_csv(result: BacktestResult, path: str):
+    """Write one row per coin and candidate pair"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['coin', 'realistic_price', 'optimistic_price', 'alerts'])
+        for coin_name, tally in result.tallies.items():
+            for row in sweep_rows(tally, result.candidates[coin_name]):
+                writer.writerow([coin_name, *row])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Count the alerts price targets would have sent")
+    parser.add_argument('path', help="CSV or Parquet file of historical prices")
+    parser.add_argument('--sweep', metavar='START:STOP:STEP',
+                        help="also try the configured targets scaled by each multiplier, e.g. 0.8:1.2:0.05")
+    parser.add_argument('--coins', help="comma-separated coins to replay, default all configured")
+    parser.add_argument('--targets', help="targets file to test, default the one the bot uses")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="processes evaluating chunks")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="rows read at a time")
+    parser.add_argument('--output', help="write the results as CSV to this path")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.targets)
+        crypto_config = config.coins
+        if args.coins:
+            names = [(coin, config.resolve(coin)) for coin in args.coins.split(',')]
+            unknown = [coin for coin, coin_name in names if coin_name is None]
+            if unknown:
+                raise ValueError(f"Unknown coins: {', '.join(unknown)}")
+            crypto_config = {coin_name: config.coins[coin_name] for _, coin_name in names}
+        multipliers = parse_sweep(args.sweep) if args.sweep else None
+        result = run_backtest(args.path, candidate_targets(crypto_config, multipliers),
+                              workers=max(1, args.workers), chunk_rows=args.chunk_rows, crypto_config=crypto_config)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print_report(result, crypto_config)
+    if args.output:
+        write_csv(result, args.output)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
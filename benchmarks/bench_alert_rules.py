@@ -0,0 +1,134 @@
+"""
+Micro-benchmark: incremental RuleEngine vs recomputing indicators from history
+
+Both evaluate the same mix of SMA, EMA, Bollinger, percent-move and
+drop-below rules on a random walk, one snapshot per tick.
+
+Usage: python benchmarks/bench_alert_rules.py [--rules-per-coin 2000] [--ticks 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_rules import RuleEngine
+
+COINS = ['bitcoin', 'ethereum', 'ripple', 'solana', 'litecoin']
+
+
+def make_rules(per_coin: int):
+    """Rules as users would pick them: a few common periods, many different levels"""
+    rng = random.Random(per_coin)
+    specs = []
+    for coin in COINS:
+        for i in range(per_coin):
+            kind = ('sma', 'ema', 'bollinger', 'change', 'below')[i % 5]
+            direction = rng.choice(['above', 'below'])
+            if kind == 'below':
+                specs.append({'coin': coin, 'type': 'below', 'price': rng.uniform(90, 100)})
+            elif kind == 'change':
+                specs.append({'coin': coin, 'type': 'change', 'percent': rng.choice([-1, 1]) * rng.uniform(0.5, 5),
+                              'window_minutes': rng.choice([5, 15, 60])})
+            elif kind == 'bollinger':
+                specs.append({'coin': coin, 'type': kind, 'period': rng.choice([20, 50]),
+                              'width': rng.uniform(1, 3), 'direction': direction})
+            else:
+                specs.append({'coin': coin, 'type': kind, 'period': rng.choice([10, 20, 50, 200]),
+                              'direction': direction})
+    return specs
+
+
+def make_ticks(count: int):
+    rng = np.random.default_rng(count)
+    walk = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, size=(count, len(COINS))), axis=0))
+    return [dict(zip(COINS, row.tolist())) for row in walk]
+
+
+class NaiveRules:
+    """Recomputes every rule's indicator from the full price history each tick"""
+
+    def __init__(self, engine: RuleEngine):
+        self.rules = engine.rules
+        self.history = {coin: [] for coin in COINS}
+        self.times = {coin: [] for coin in COINS}
+        self.active = [None] * len(self.rules)
+
+    def evaluate(self, prices, timestamp):
+        for coin, price in prices.items():
+            self.history[coin].append(price)
+            self.times[coin].append(timestamp)
+        fired = 0
+        for i, rule in enumerate(self.rules):
+            history = np.array(self.history[rule.coin])
+            price = history[-1]
+            if rule.kind == 'below':
+                holds = price <= rule.value
+            elif rule.kind == 'change':
+                times = np.array(self.times[rule.coin])
+                reference = history[np.searchsorted(times, timestamp - rule.period)]
+                change = (price - reference) / reference * 100
+                holds = change >= rule.value if rule.value > 0 else change <= rule.value
+            else:
+                period = int(rule.period)
+                if len(history) < period:
+                    continue
+                if rule.kind == 'ema':
+                    alpha = 2 / (period + 1)
+                    level = history[0]
+                    for p in history[1:]:
+                        level += alpha * (p - level)
+                else:
+                    window = history[-period:]
+                    level = window.mean()
+                    if rule.kind == 'bollinger':
+                        level += (rule.value if rule.direction == 'above' else -rule.value) * window.std()
+                holds = price >= level if rule.direction == 'above' else price <= level
+            if self.active[i] is not None and holds and not self.active[i]:
+                fired += 1
+            self.active[i] = holds
+        return fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rules-per-coin', type=int, default=2000)
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--naive-ticks', type=int, default=50, help="ticks for the slow baseline")
+    args = parser.parse_args()
+
+    specs = make_rules(args.rules_per_coin)
+    ticks = make_ticks(args.ticks)
+    print(f"{len(specs):,} rules over {len(COINS)} coins, {args.ticks:,} ticks")
+
+    engine = RuleEngine.from_config(specs)
+    events = 0
+    started = time.perf_counter()
+    for t, prices in enumerate(ticks):
+        events += sum(event.fired for event in engine.evaluate(prices, timestamp=t))
+    per_tick = (time.perf_counter() - started) / len(ticks)
+    print(f"  RuleEngine:  {per_tick * 1e6:>10,.0f} us/tick, {events:,} alerts, "
+          f"{len(engine._indicators)} shared indicators")
+
+    naive = NaiveRules(RuleEngine.from_config(specs))
+    # The baseline slows down as history grows, so time its last ticks after a warm-up
+    warmup = max(0, min(args.ticks, 500) - args.naive_ticks)
+    for t, prices in enumerate(ticks[:warmup]):
+        for coin, price in prices.items():
+            naive.history[coin].append(price)
+            naive.times[coin].append(t)
+    started = time.perf_counter()
+    for t, prices in enumerate(ticks[warmup:warmup + args.naive_ticks], start=warmup):
+        naive.evaluate(prices, t)
+    naive_per_tick = (time.perf_counter() - started) / args.naive_ticks
+    print(f"  Recompute:   {naive_per_tick * 1e6:>10,.0f} us/tick with {warmup + args.naive_ticks} "
+          f"ticks of history ({naive_per_tick / per_tick:,.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: backtest replay throughput and sweep scaling across processes
+
+Writes a synthetic timestamp,coin,price CSV, replays it with the configured
+targets and with a threshold sweep at several worker counts, and checks the
+alert counts against ThresholdEngine fed one price at a time.
+
+Usage: python benchmarks/bench_backtest.py [--rows 5000000] [--workers 1,2,4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import candidate_targets, parse_sweep, run_backtest
+from coin_config import load_config
+from threshold_engine import ThresholdEngine
+
+CRYPTO_CONFIG = load_config().coins
+
+
+def write_prices(path: str, rows: int, chunk: int = 500_000):
+    """Random walk around each coin's realistic target, one coin per row in turn"""
+    rng = np.random.default_rng(rows)
+    coins = list(CRYPTO_CONFIG)
+    start = np.array([CRYPTO_CONFIG[coin]['realistic_price'] for coin in coins])
+    log_prices = np.log(start)
+    with open(path, 'w') as f:
+        f.write('timestamp,coin,price\n')
+        for offset in range(0, rows, chunk):
+            n = min(chunk, rows - offset)
+            steps = rng.normal(0, 0.002, size=(n // len(coins) + 1, len(coins)))
+            walk = log_prices + np.cumsum(steps, axis=0)
+            log_prices = walk[-1]
+            prices = np.exp(walk).ravel()[:n]
+            timestamps = 1_700_000_000 + np.arange(offset, offset + n)
+            labels = np.array(coins)[np.arange(offset, offset + n) % len(coins)]
+            f.writelines(f"{ts},{coin},{price:.6f}\n" for ts, coin, price in zip(timestamps, labels, prices))
+
+
+def engine_alerts(path: str, rows: int) -> dict:
+    """Alert counts from ThresholdEngine for the first rows of the file"""
+    engine = ThresholdEngine.from_config(CRYPTO_CONFIG)
+    fires = {}
+    with open(path) as f:
+        next(f)
+        for _, line in zip(range(rows), f):
+            _, coin, price = line.rstrip().split(',')
+            for event in engine.evaluate({coin: float(price)}):
+                if event.fired:
+                    fires[(event.coin, event.level)] = fires.get((event.coin, event.level), 0) + 1
+    return fires
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--workers', default='1,2,4', help="comma-separated worker counts to try")
+    parser.add_argument('--sweep', default='0.5:1.5:0.01', help="multipliers for the sweep run")
+    parser.add_argument('--check-rows', type=int, default=100_000, help="rows checked against ThresholdEngine")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'prices.csv')
+        started = time.perf_counter()
+        write_prices(path, args.rows)
+        print(f"Wrote {args.rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB) in "
+              f"{time.perf_counter() - started:.1f}s, {os.cpu_count()} CPU(s)")
+
+        # Correctness: the vectorized replay must match the live engine
+        check_path = os.path.join(tmp, 'check.csv')
+        with open(path) as src, open(check_path, 'w') as dst:
+            dst.writelines(line for _, line in zip(range(args.check_rows + 1), src))
+        result = run_backtest(check_path, candidate_targets(CRYPTO_CONFIG), chunk_rows=7_919)
+        expected = engine_alerts(check_path, args.check_rows)
+        for coin_name, tally in result.tallies.items():
+            for level in ('realistic', 'optimistic'):
+                target = CRYPTO_CONFIG[coin_name][f"{level}_price"]
+                got = int(tally.fires[np.searchsorted(tally.targets, target)])
+                assert got == expected.get((coin_name, level), 0), (coin_name, level, got, expected)
+        print(f"Alert counts match ThresholdEngine on {args.check_rows:,} rows "
+              f"({sum(expected.values())} alerts)\n")
+
+        multipliers = parse_sweep(args.sweep)
+        print(f"{'Run':<28} {'Workers':>7} {'Seconds':>8} {'Prices/s':>12}")
+        for label, candidates in (
+            ("configured targets", candidate_targets(CRYPTO_CONFIG)),
+            (f"sweep, {len(multipliers)} x {len(multipliers)}", candidate_targets(CRYPTO_CONFIG, multipliers)),
+        ):
+            for workers in (int(n) for n in args.workers.split(',')):
+                result = run_backtest(path, candidates, workers=workers)
+                print(f"{label:<28} {workers:>7} {result.seconds:>8.2f} {result.rows / result.seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
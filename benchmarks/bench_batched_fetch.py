@@ -0,0 +1,94 @@
+"""
+Benchmark: fetching a large coin universe in one request vs parallel batches
+
+Runs CoinGeckoProvider against a local stub whose response time grows with the
+number of coins requested and which rejects URLs over 8 KB, like a CDN in
+front of the real API. Reports time per snapshot, coins returned and
+per-batch latency, then repeats with a share of failing requests to show that
+a failed batch only loses its own coins.
+
+Usage: python benchmarks/bench_batched_fetch.py [--coins 5000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_fetcher import PriceFetcher
+from price_providers import CoinGeckoProvider
+from stubs import FakeCoinGecko
+
+UNLIMITED = 10 ** 9
+
+
+def make_coin_ids(count: int):
+    """CoinGecko-like IDs, 4 to 24 characters"""
+    rng = random.Random(count)
+    alphabet = string.ascii_lowercase + '-'
+    return [f"{''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 20)))}-{i}" for i in range(count)]
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[int(p * (len(ordered) - 1))]
+
+
+async def run(provider: CoinGeckoProvider, concurrency: int, coin_ids, rounds: int):
+    fetcher = PriceFetcher(max_concurrency=concurrency, max_connections=concurrency)
+    times, returned, batch_times = [], [], []
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            try:
+                prices = await provider.fetch(fetcher, coin_ids)
+            except Exception:
+                prices = {}
+            times.append(time.perf_counter() - started)
+            returned.append(len(prices))
+            batch_times.extend(batch.seconds for batch in provider.last_batches)
+    finally:
+        await fetcher.aclose()
+    return statistics.median(times), min(returned), len(provider.last_batches), batch_times
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--coins', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=5, help="snapshots fetched per run")
+    parser.add_argument('--latency', type=float, default=0.05, help="stub delay per request in seconds")
+    parser.add_argument('--per-coin', type=float, default=0.00002, help="stub delay per coin in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.1, help="share of failing requests in the last run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    coin_ids = make_coin_ids(args.coins)
+    print(f"{args.coins:,} coins, {sum(len(c) for c in coin_ids):,} characters of IDs, "
+          f"stub: {args.latency * 1000:.0f} ms + {args.per_coin * 1e6:.0f} us/coin per request\n")
+    print(f"{'Run':<34} {'Batches':>7} {'Snapshot':>10} {'Coins':>7} {'Batch p50':>10} {'Batch p99':>10}")
+
+    runs = [
+        ("one request, 8 KB URL limit", 8192, 0.0, UNLIMITED, UNLIMITED, 1),
+        ("batched, 1 in flight", 8192, 0.0, 250, 4000, 1),
+        ("batched, 4 in flight", 8192, 0.0, 250, 4000, 4),
+        ("batched, 8 in flight", 8192, 0.0, 250, 4000, 8),
+        (f"batched, 8 in flight, {args.error_rate:.0%} errors", 8192, args.error_rate, 250, 4000, 8),
+    ]
+    for label, max_url, error_rate, batch_size, batch_chars, concurrency in runs:
+        with FakeCoinGecko(latency=args.latency, per_coin_latency=args.per_coin,
+                           max_url=max_url, error_rate=error_rate) as stub:
+            provider = CoinGeckoProvider(stub.price_url, batch_size=batch_size, batch_chars=batch_chars)
+            seconds, coins, batches, batch_times = await run(provider, concurrency, coin_ids, args.rounds)
+        print(f"{label:<34} {batches:>7} {seconds * 1000:>8.0f} ms {coins:>7,} "
+              f"{percentile(batch_times, 0.5) * 1000:>7.0f} ms {percentile(batch_times, 0.99) * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
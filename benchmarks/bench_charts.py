@@ -0,0 +1,106 @@
+"""
+Benchmark: /chart rendering on the event loop vs in the process pool, and cache hits
+
+Fills a price history with a day of 10-second ticks for a few coins, then
+renders distinct charts while a heartbeat task measures how long the event
+loop was blocked, which is how late /status and other updates would be
+answered meanwhile. Repeated requests are then served from the chart cache.
+
+Usage: python benchmarks/bench_charts.py [--coins 8] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_renderer import CHART_RANGES, ChartService, render_png
+from price_history import PriceHistory
+
+LEVELS = {'realistic': 110.0, 'optimistic': 120.0}
+
+
+def fill_history(history: PriceHistory, coins, days: float = 1.0, step: float = 10.0):
+    rng = np.random.default_rng(len(coins))
+    start = time.time() - days * 86_400
+    walks = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, size=(int(days * 86_400 / step), len(coins))), axis=0))
+    for i, row in enumerate(walks):
+        history.append(dict(zip(coins, row.tolist())), start + i * step)
+
+
+async def heartbeat(lags, stop: asyncio.Event, interval: float = 0.005):
+    """Record how late each short sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - started - interval)
+
+
+async def run_inline(history: PriceHistory, coins):
+    """Previous approach: draw in the handler, on the event loop"""
+    for coin in coins:
+        for range_name, (seconds, resolution) in CHART_RANGES.items():
+            records = history.range(coin, time.time() - seconds, resolution=resolution, include_open=True)
+            render_png(records['ts'], records['low'], records['high'], records['close'], LEVELS)
+            await asyncio.sleep(0)
+
+
+async def run_pool(service: ChartService, coins):
+    await asyncio.gather(*(service.chart(coin, range_name, LEVELS) for coin in coins for range_name in CHART_RANGES))
+
+
+async def measure(label: str, work, charts: int):
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    started = time.perf_counter()
+    await work
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    print(f"{label:<30} {charts / elapsed:>9.1f} {max(lags) * 1000:>12.1f} {statistics.median(lags) * 1000:>12.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--coins', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2, help="chart processes")
+    parser.add_argument('--requests', type=int, default=1000, help="repeated requests served from the cache")
+    args = parser.parse_args()
+
+    coins = [f"coin-{i}" for i in range(args.coins)]
+    charts = len(coins) * len(CHART_RANGES)
+    with tempfile.TemporaryDirectory() as tmp:
+        history = PriceHistory(tmp)
+        fill_history(history, coins)
+        service = ChartService(history, workers=args.workers)
+        # Start the worker processes outside the measurement
+        await service.chart(coins[0], '1h', {})
+
+        print(f"{charts} distinct charts ({args.coins} coins x {len(CHART_RANGES)} ranges), {os.cpu_count()} CPU(s)\n")
+        print(f"{'Run':<30} {'Charts/s':>9} {'Max loop lag':>12} {'p50 lag':>12}")
+        await measure("on the event loop (old)", run_inline(history, coins), charts)
+        await measure(f"process pool, {args.workers} worker(s)", run_pool(service, coins), charts)
+
+        latencies = []
+        for i in range(args.requests):
+            started = time.perf_counter()
+            await service.chart(coins[i % len(coins)], '24h', LEVELS)
+            latencies.append(time.perf_counter() - started)
+        stats = service.cache.stats()
+        print(f"\nRepeated requests: p50 {statistics.median(latencies) * 1e6:.0f} us, "
+              f"{stats['hits']} hits, {service.renders} renders, "
+              f"{service.cache.bytes / 1024:.0f} KB cached in {len(service.cache)} charts")
+        service.close()
+        history.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
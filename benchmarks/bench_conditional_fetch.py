@@ -0,0 +1,100 @@
+"""
+Benchmark: per-tick I/O and work when few prices change between ticks
+
+Runs CryptoPriceMonitor.monitor_prices against a local CoinGecko stub with a
+large targets file, changing a share of the prices before each tick. Compares
+a server without ETags (full body every time) to one that answers 304 Not
+Modified, and reports bytes transferred, requests revalidated and the share
+of coins whose targets were not re-checked.
+
+Usage: python benchmarks/bench_conditional_fetch.py [--coins 2000] [--ticks 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import FakeCoinGecko
+
+
+def write_targets(path: str, coins: int):
+    with open(path, 'w') as f:
+        for i in range(coins):
+            f.write(f'[coins.coin{i}]\nsymbol = "C{i}"\ncoingecko_id = "coin-{i}"\n'
+                    f'realistic_price = 150\noptimistic_price = 200\n\n')
+
+
+async def run(stub: FakeCoinGecko, coins: int, ticks: int, change_ratio: float):
+    from crypto_monitor import CryptoPriceMonitor
+
+    monitor = CryptoPriceMonitor()
+
+    async def discard(message, chat_id=None):
+        pass
+
+    monitor.send_notification = discard
+    rng = random.Random(ticks)
+    coin_ids = [f"coin-{i}" for i in range(coins)]
+    stub.prices = {coin_id: 100.0 for coin_id in coin_ids}
+    await monitor.monitor_prices()      # Warm-up: first full download
+    stub.bytes_sent = 0
+    checked, skipped = monitor.coins_checked, monitor.coins_skipped
+    before = monitor.fetcher.stats()
+
+    elapsed = 0.0
+    for _ in range(ticks):
+        for coin_id in rng.sample(coin_ids, int(coins * change_ratio)):
+            stub.prices[coin_id] = round(stub.prices[coin_id] * rng.uniform(0.99, 1.01), 2)
+        started = time.perf_counter()
+        await monitor.monitor_prices()
+        elapsed += time.perf_counter() - started
+
+    after = monitor.fetcher.stats()
+    delta = {name: after[name] - before[name] for name in after}
+    checked, skipped = monitor.coins_checked - checked, monitor.coins_skipped - skipped
+    await monitor.close()
+    return elapsed / ticks, delta, stub.bytes_sent, skipped / max(1, checked + skipped)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--coins', type=int, default=2000)
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--changes', default='0,0.001,0.01,0.1,1', help="comma-separated shares of coins moving per tick")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_targets(os.path.join(tmp, 'targets.toml'), args.coins)
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123:bench')
+        os.environ.setdefault('TELEGRAM_CHAT_ID', '1')
+        os.environ['TARGETS_FILE'] = os.path.join(tmp, 'targets.toml')
+        os.environ['SUBSCRIPTIONS_DB'] = os.path.join(tmp, 'subscriptions.db')
+        os.environ['PRICE_HISTORY_DIR'] = os.path.join(tmp, 'history')
+        os.environ['STATE_FILE'] = os.path.join(tmp, 'state.json')
+        os.environ['PRICE_PROVIDERS'] = 'coingecko'
+        os.environ['PRICE_CACHE_TTL_SECONDS'] = '0'
+        os.environ['PRICE_CACHE_STALE_SECONDS'] = '0'
+
+        print(f"{args.coins:,} coins, {args.ticks} ticks per run\n")
+        print(f"{'Moving/tick':>11} {'Server':>8} {'ms/tick':>8} {'KB sent/tick':>13} {'304s':>6} "
+              f"{'Not parsed':>10} {'KB saved':>9} {'Coins skipped':>14}")
+        for ratio in (float(r) for r in args.changes.split(',')):
+            for etag in (False, True):
+                with FakeCoinGecko(etag=etag) as stub:
+                    os.environ['COINGECKO_API_URL'] = stub.price_url
+                    per_tick, stats, sent, skipped = await run(stub, args.coins, args.ticks, ratio)
+                print(f"{ratio:>11.1%} {'ETag' if etag else 'plain':>8} {per_tick * 1000:>8.1f} "
+                      f"{sent / args.ticks / 1024:>13.1f} {stats['not_modified']:>6} {stats['unchanged']:>10} "
+                      f"{stats['bytes_saved'] / 1024:>9.0f} {skipped:>14.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
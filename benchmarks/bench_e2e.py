@@ -0,0 +1,345 @@
+"""
+End-to-end benchmark: main.py against local CoinGecko and Bot API stand-ins
+
+Starts main.py in a subprocess with its price and Bot API URLs pointed at the
+stubs and drives it through getUpdates the way users would:
+
+- ticks/s: monitor loop throughput, with the check interval far below a tick
+- /watch throughput and RSS growth per 1,000 subscriptions
+- /status p50/p99: from the update being queued to the reply arriving, with
+  many users asking at once
+- alert fan-out: alerts/s delivered when a price crosses every subscriber's target
+
+Results are printed as JSON and optionally written to --output. --compare
+takes an earlier result file and lists metrics that got worse by more than
+--tolerance; the exit status is 1 if any did.
+
+Usage: python benchmarks/bench_e2e.py [--coins 500] [--subscriptions 2000] [--output e2e.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stubs import FakeBotAPI, FakeCoinGecko
+
+# Direction of each metric, for --compare
+HIGHER_IS_BETTER = {
+    'ticks_per_second': True,
+    'tick_ms': False,
+    'watch_per_second': True,
+    'memory_per_1k_subscriptions_mb': False,
+    'status_p50_ms': False,
+    'status_p99_ms': False,
+    'alerts_per_second': True,
+    'first_alert_ms': False,
+}
+
+FIRST_SUBSCRIBER = 1000     # Chat IDs of simulated users start here
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def write_targets(path: str, coins: int):
+    with open(path, 'w') as f:
+        for i in range(coins):
+            f.write(f'[coins.coin{i}]\nsymbol = "C{i}"\ncoingecko_id = "coin-{i}"\n'
+                    f'realistic_price = 150\noptimistic_price = 200\n\n')
+
+
+def wait_until(predicate, what: str, timeout: float = 60.0, interval: float = 0.005):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out waiting for {what}")
+        time.sleep(interval)
+
+
+def rss_bytes(pid: int):
+    """Resident memory of a process, None where /proc is not available"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=30).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class PriceWalk:
+    """Moves a share of the stub's prices a little every interval, staying below the targets"""
+
+    def __init__(self, stub: FakeCoinGecko, coin_ids, share: float, interval: float = 0.05):
+        self.stub = stub
+        self.coin_ids = coin_ids
+        self.count = int(len(coin_ids) * share)
+        self.interval = interval
+        self.rng = random.Random(len(coin_ids))
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        prices = self.stub.prices
+        while not self._stopping.wait(self.interval):
+            for coin_id in self.rng.sample(self.coin_ids, self.count):
+                price = prices.get(coin_id, self.stub.base_price) * self.rng.uniform(0.99, 1.01)
+                prices[coin_id] = round(min(110.0, max(90.0, price)), 2)
+
+
+class BotProcess:
+    """main.py in a subprocess, with stderr kept in a log file for failures"""
+
+    def __init__(self, env: dict, log_path: str):
+        self.env = env
+        self.log_path = log_path
+        self.metrics_url = f"http://127.0.0.1:{env['METRICS_PORT']}/metrics"
+        self.process = None
+
+    def __enter__(self):
+        self._log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'main.py')], env=self.env, cwd=ROOT,
+                                        stdout=subprocess.DEVNULL, stderr=self._log)
+        try:
+            wait_until(lambda: self.metric('crypto_monitor_ticks_total') >= 1, "the first monitor tick")
+        except Exception:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+        if exc and exc[0] is not None:
+            with open(self.log_path, errors='replace') as f:
+                log(f"main.py output:\n{''.join(f.readlines()[-20:])}")
+
+    def metric(self, name: str) -> float:
+        """Current value of an unlabelled metric, 0 until the server answers"""
+        if self.process.poll() is not None:
+            raise RuntimeError(f"main.py exited with status {self.process.returncode}")
+        try:
+            with urllib.request.urlopen(self.metrics_url, timeout=5) as response:
+                for line in response.read().decode().splitlines():
+                    if line.startswith(f"{name} "):
+                        return float(line.split()[-1])
+        except OSError:
+            pass
+        return 0.0
+
+    @property
+    def rss(self):
+        return rss_bytes(self.process.pid)
+
+
+def replies_since(api: FakeBotAPI, mark: int, chats) -> dict:
+    """Arrival time of the first message to each of chats after the first mark messages"""
+    chats = set(chats)
+    first = {}
+    for (chat_id, _), sent_at in zip(api.messages[mark:], api.sent_at[mark:]):
+        if chat_id in chats and chat_id not in first:
+            first[chat_id] = sent_at
+    return first
+
+
+def bot_env(args, tmp: str, name: str, api: FakeBotAPI, stub: FakeCoinGecko, interval_minutes: float) -> dict:
+    return {
+        **os.environ,
+        'TELEGRAM_BOT_TOKEN': '123:bench',
+        'TELEGRAM_CHAT_ID': '1',
+        'TELEGRAM_BASE_URL': f"{api.url}/bot",
+        'TELEGRAM_GLOBAL_RATE': str(args.global_rate),
+        'COINGECKO_API_URL': stub.price_url,
+        'PRICE_PROVIDERS': 'coingecko',
+        'PRICE_CACHE_TTL_SECONDS': '0',
+        'PRICE_CACHE_STALE_SECONDS': '0',
+        'CHECK_INTERVAL_MINUTES': str(interval_minutes),
+        'CONFIG_RELOAD_SECONDS': '0',
+        'TARGETS_FILE': os.path.join(tmp, 'targets.toml'),
+        'SUBSCRIPTIONS_DB': os.path.join(tmp, f"subscriptions-{name}.db"),
+        'PRICE_HISTORY_DIR': os.path.join(tmp, f"history-{name}"),
+        'STATE_FILE': os.path.join(tmp, f"state-{name}.json"),
+        'METRICS_PORT': str(free_port()),
+    }
+
+
+def measure_ticks(args, tmp: str) -> dict:
+    """Run the monitor loop back to back and count ticks"""
+    with FakeCoinGecko(latency=args.latency, error_rate=args.error_rate) as stub, FakeBotAPI() as api:
+        coin_ids = [f"coin-{i}" for i in range(args.coins)]
+        # A check interval of ~0.1 ms means every tick overruns and the next starts right away
+        env = bot_env(args, tmp, 'ticks', api, stub, 0.000001)
+        with PriceWalk(stub, coin_ids, args.moving), BotProcess(env, os.path.join(tmp, 'ticks.log')) as bot:
+            time.sleep(1.0)     # Let the first full fetch and history files settle
+            ticks, requests, started = bot.metric('crypto_monitor_ticks_total'), stub.requests, time.perf_counter()
+            time.sleep(args.duration)
+            ticks = bot.metric('crypto_monitor_ticks_total') - ticks
+            elapsed = time.perf_counter() - started
+            requests = stub.requests - requests
+    return {
+        'ticks_per_second': ticks / elapsed,
+        'tick_ms': elapsed / max(ticks, 1) * 1000,
+        'price_requests_per_tick': requests / max(ticks, 1),
+    }
+
+
+def measure_users(args, tmp: str) -> dict:
+    """Subscriptions, /status latency and alert fan-out against one running bot"""
+    metrics = {}
+    with FakeCoinGecko(latency=args.latency, error_rate=args.error_rate) as stub, FakeBotAPI() as api:
+        env = bot_env(args, tmp, 'users', api, stub, args.interval / 60)
+        with BotProcess(env, os.path.join(tmp, 'users.log')) as bot:
+            # Polling is up once a command gets an answer
+            mark = len(api.messages)
+            api.send_command(FIRST_SUBSCRIBER - 1, '/help')
+            wait_until(lambda: replies_since(api, mark, [FIRST_SUBSCRIBER - 1]), "a reply to /help")
+
+            # Every subscriber watches the same coin, so one price move alerts all of them
+            chats = range(FIRST_SUBSCRIBER, FIRST_SUBSCRIBER + args.subscriptions)
+            rss_before = bot.rss
+            mark, started = len(api.messages), time.perf_counter()
+            for chat_id in chats:
+                api.send_command(chat_id, '/watch C0 150 200')
+            wait_until(lambda: len(replies_since(api, mark, chats)) == len(chats),
+                       f"{len(chats)} replies to /watch", timeout=300, interval=0.05)
+            metrics['watch_per_second'] = len(chats) / (time.perf_counter() - started)
+            if rss_before is not None:
+                metrics['memory_per_1k_subscriptions_mb'] = (bot.rss - rss_before) / len(chats) * 1000 / 2 ** 20
+
+            # Rounds of users pressing /status at the same moment
+            latencies = []
+            users = chats[:args.users]
+            for _ in range(args.rounds):
+                mark, queued = len(api.messages), {}
+                for chat_id in users:
+                    api.send_command(chat_id, '/status')
+                    queued[chat_id] = time.perf_counter()
+                wait_until(lambda: len(replies_since(api, mark, users)) == len(users),
+                           f"{len(users)} replies to /status")
+                replies = replies_since(api, mark, users)
+                latencies.extend((replies[chat_id] - queued[chat_id]) * 1000 for chat_id in users)
+            metrics['status_p50_ms'] = percentile(latencies, 50)
+            metrics['status_p99_ms'] = percentile(latencies, 99)
+
+            # Cross every subscriber's realistic target at once
+            mark, moved = len(api.messages), time.perf_counter()
+            stub.prices['coin-0'] = 160.0
+            wait_until(lambda: len(replies_since(api, mark, chats)) == len(chats),
+                       f"{len(chats)} alerts", timeout=300, interval=0.05)
+            arrivals = sorted(replies_since(api, mark, chats).values())
+            metrics['first_alert_ms'] = (arrivals[0] - moved) * 1000
+            metrics['alerts_per_second'] = len(arrivals) / max(arrivals[-1] - arrivals[0], 1e-9)
+    return metrics
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    """Metrics at least tolerance worse than baseline, as (name, before, after) tuples"""
+    regressions = []
+    for name, higher_is_better in HIGHER_IS_BETTER.items():
+        before, after = baseline.get(name), metrics.get(name)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coins', type=int, default=500, help="coins in the targets file")
+    parser.add_argument('--moving', type=float, default=0.05, help="share of prices moving every 50 ms")
+    parser.add_argument('--latency', type=float, default=0.0, help="fake CoinGecko latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of failing price requests")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of ticks to count")
+    parser.add_argument('--interval', type=float, default=1.0, help="check interval in seconds for the user runs")
+    parser.add_argument('--subscriptions', type=int, default=2000, help="chats that /watch a coin")
+    parser.add_argument('--users', type=int, default=50, help="users sending /status at once")
+    parser.add_argument('--rounds', type=int, default=10, help="rounds of concurrent /status")
+    parser.add_argument('--global-rate', type=float, default=500, help="TELEGRAM_GLOBAL_RATE for the bot")
+    parser.add_argument('--output', help="also write the JSON result to this file")
+    parser.add_argument('--compare', help="earlier JSON result to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="relative change counted as a regression")
+    args = parser.parse_args()
+    args.users = min(args.users, args.subscriptions)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_targets(os.path.join(tmp, 'targets.toml'), args.coins)
+        log(f"Ticks: {args.coins} coins, {args.moving:.0%} moving, {args.duration:.0f}s")
+        metrics = measure_ticks(args, tmp)
+        log(f"Users: {args.subscriptions} subscriptions, {args.rounds} x {args.users} concurrent /status")
+        metrics.update(measure_users(args, tmp))
+
+    result = {
+        'benchmark': 'e2e',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'timestamp': int(time.time()),
+        'params': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        'metrics': {name: round(value, 3) for name, value in metrics.items()},
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result['metrics'], baseline['metrics'], args.tolerance)
+        for name, before, after in regressions:
+            log(f"Regression: {name} {before:g} -> {after:g} (vs {baseline.get('revision')})")
+        if regressions:
+            sys.exit(1)
+        log(f"No metric worse than {args.tolerance:.0%} vs {baseline.get('revision')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: tail latency and missed ticks with a single provider vs hedged providers
+
+Two simulated providers with long-tailed latency (mostly fast, occasionally very
+slow). Halfway through, the primary goes down for a while. Reports latency
+percentiles and how many ticks got no prices at all.
+
+Usage: python benchmarks/bench_hedged_providers.py [--ticks 400]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_providers import HedgedPriceProvider, PriceProvider
+
+COIN_IDS = ['bitcoin', 'ethereum', 'ripple', 'solana', 'litecoin']
+
+
+class SimulatedProvider(PriceProvider):
+    def __init__(self, name, rng, fast, slow, slow_ratio):
+        self.name = name
+        self.rng = rng
+        self.fast = fast
+        self.slow = slow
+        self.slow_ratio = slow_ratio
+        self.down = False
+
+    async def fetch(self, http, coin_ids):
+        slow = self.rng.random() < self.slow_ratio
+        await asyncio.sleep(self.slow if slow else self.fast * self.rng.uniform(0.5, 1.5))
+        if self.down:
+            raise ConnectionError(f"{self.name} is down")
+        return {coin_id: 100.0 for coin_id in coin_ids}
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[int(p * (len(ordered) - 1))]
+
+
+async def run(provider, primary, ticks, outage):
+    latencies = []
+    missed = 0
+    for tick in range(ticks):
+        primary.down = outage[0] <= tick < outage[1]
+        started = time.perf_counter()
+        try:
+            await provider.fetch(None, COIN_IDS)
+        except Exception:
+            missed += 1
+        latencies.append(time.perf_counter() - started)
+    return latencies, missed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ticks', type=int, default=400, help="price checks to simulate")
+    parser.add_argument('--fast', type=float, default=0.02, help="typical provider latency in seconds")
+    parser.add_argument('--slow', type=float, default=0.5, help="latency of a slow response in seconds")
+    parser.add_argument('--slow-ratio', type=float, default=0.03, help="share of slow responses")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    outage = (args.ticks // 2, args.ticks // 2 + args.ticks // 8)
+
+    def make_providers(seed):
+        rng = random.Random(seed)
+        return [SimulatedProvider(name, rng, args.fast, args.slow, args.slow_ratio)
+                for name in ('primary', 'secondary')]
+
+    single = make_providers(1)[0]
+    pair = make_providers(1)
+    hedged = HedgedPriceProvider(pair, default_hedge_delay=args.fast * 3)
+
+    print(f"{args.ticks} ticks, primary down for ticks {outage[0]}-{outage[1] - 1}")
+    for label, provider, primary in (('single provider', single, single), ('hedged', hedged, pair[0])):
+        latencies, missed = await run(provider, primary, args.ticks, outage)
+        print(f"{label:>16}: p50 {percentile(latencies, 0.5) * 1000:6.1f} ms  "
+              f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:6.1f} ms  missed ticks {missed}")
+    print(f"Hedged requests: {hedged.hedges}, health: {hedged.health()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark: live status edits vs sending a status message to every chat each tick
+
+Many chats follow the status while prices tick; some ticks change no price.
+Counts Bot API calls for both approaches against a local fake Bot API.
+
+Usage: python benchmarks/bench_live_status.py [--chats 500] [--ticks 20]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from coin_config import load_config
+from live_status import LiveStatusBoard
+from status_renderer import StatusRenderer
+from stubs import FakeBotAPI
+from subscriptions import SubscriptionStore
+
+CRYPTO_CONFIG = load_config().coins
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=500)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--unchanged-ratio', type=float, default=0.5, help="share of ticks where no price moved")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(1)
+    prices = {coin: config['realistic_price'] * 0.95 for coin, config in CRYPTO_CONFIG.items()}
+    snapshots = []
+    for _ in range(args.ticks):
+        if rng.random() >= args.unchanged_ratio:
+            prices = {**prices, 'bitcoin': round(prices['bitcoin'] * rng.uniform(0.99, 1.01), 2)}
+        snapshots.append((prices, time.time()))
+
+    with tempfile.TemporaryDirectory() as tmp, FakeBotAPI() as api:
+        bot = Bot('123:bench', base_url=f"{api.url}/bot", request=HTTPXRequest(connection_pool_size=16))
+        async with bot:
+            renderer = StatusRenderer(CRYPTO_CONFIG)
+
+            # Previous behaviour: a fresh status message per chat per tick
+            started = time.perf_counter()
+            for snapshot, updated_at in snapshots:
+                text = renderer.render(snapshot, updated_at)
+                await asyncio.gather(*(bot.send_message(chat_id, text, parse_mode='HTML')
+                                       for chat_id in range(1, args.chats + 1)))
+            send_elapsed = time.perf_counter() - started
+            send_calls = api.calls.get('sendMessage', 0)
+
+            store = SubscriptionStore(os.path.join(tmp, 'subscriptions.db'))
+            board = LiveStatusBoard(store, min_interval=0, max_concurrency=16)
+            text = renderer.render(*snapshots[0])
+            for chat_id in range(1, args.chats + 1):
+                await board.start(bot, chat_id, text, key=renderer.body)
+
+            started = time.perf_counter()
+            for snapshot, updated_at in snapshots:
+                text = renderer.render(snapshot, updated_at)
+                await board.refresh(bot, text, key=renderer.body)
+            live_elapsed = time.perf_counter() - started
+            store.close()
+
+    changed_ticks = len({id(snapshot) for snapshot, _ in snapshots}) - 1
+    print(f"{args.chats} chats, {args.ticks} ticks, {changed_ticks} with a price change after the first")
+    print(f"send per tick: {send_calls:,} sendMessage calls in {send_elapsed:.2f}s")
+    print(f"live status:   {api.calls.get('editMessageText', 0):,} editMessageText calls in {live_elapsed:.2f}s "
+          f"({board.unchanged:,} skipped as unchanged)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
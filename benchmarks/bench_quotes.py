@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: cost of quote currencies per tick
+
+Evaluates the same targets on USD snapshots with every coin quoted in USD,
+then with coins spread over several currencies. Conversion uses one cached
+rate table, so the extra cost is one multiplication per coin and no extra
+price requests.
+
+Usage: python benchmarks/bench_quotes.py [--coins 5000] [--ticks 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fx_rates import FxRates, QuoteConverter
+from threshold_engine import ThresholdEngine
+
+CURRENCIES = ['usd', 'eur', 'gbp', 'btc']
+RATES = {'usd': 1.0, 'eur': 0.9, 'gbp': 0.78, 'btc': 1 / 120000}
+
+
+class StubHttp:
+    """Answers the exchange rate request like CoinGecko and counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_json(self, url, params=None):
+        self.calls += 1
+        return {'rates': {currency: {'value': rate * 120000} for currency, rate in RATES.items()}}
+
+
+def run(coins, currencies, ticks):
+    fx = FxRates('stub')
+    http = StubHttp()
+    quotes = QuoteConverter(fx, dict(zip(coins, currencies)))
+    engine = ThresholdEngine()
+    engine.add_many((coin, 'realistic', 100 * RATES[currency]) for coin, currency in zip(coins, currencies))
+
+    rng = np.random.default_rng(len(coins))
+    snapshots = [dict(zip(coins, (100 * np.exp(rng.normal(0, 0.01, len(coins)))).tolist())) for _ in range(ticks)]
+
+    async def loop():
+        started = time.perf_counter()
+        for prices in snapshots:
+            await fx.ensure_fresh(http, quotes.currencies.values())
+            engine.evaluate(quotes.convert(prices))
+        return (time.perf_counter() - started) / ticks
+
+    return asyncio.run(loop()), http.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--coins', type=int, default=5000)
+    parser.add_argument('--ticks', type=int, default=200)
+    args = parser.parse_args()
+
+    coins = [f"coin-{i}" for i in range(args.coins)]
+    print(f"{args.coins:,} coins, {args.ticks} ticks")
+    for count in range(1, len(CURRENCIES) + 1):
+        currencies = [CURRENCIES[i % count] for i in range(args.coins)]
+        per_tick, fx_calls = run(coins, currencies, args.ticks)
+        label = f"{count} currenc{'y' if count == 1 else 'ies'} ({','.join(CURRENCIES[:count])})"
+        print(f"  {label:<32} {per_tick * 1000:6.2f} ms/tick, {fx_calls} exchange rate request(s), "
+              f"1 price request per tick")
+
+
+if __name__ == "__main__":
+    main()
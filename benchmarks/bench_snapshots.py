@@ -0,0 +1,91 @@
+"""
+Benchmark: reading prices and their timestamp separately vs as one snapshot
+
+A writer thread keeps storing snapshots in which every price and the
+timestamp equal a counter, as the stale-refresh thread does. Reader threads
+either read peek() and updated_at one after the other, the way the status
+handlers used to, and count pairs that came from different writes, or take
+the snapshot attribute once, which cannot mix two writes.
+
+Usage: python benchmarks/bench_snapshots.py [--readers 2] [--seconds 2]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_cache import PriceCache
+
+COINS = [f"coin-{i}" for i in range(50)]
+
+
+def writer(cache: PriceCache, stop: threading.Event, writes):
+    version = 0
+    while not stop.is_set():
+        version += 1
+        cache.put(dict.fromkeys(COINS, float(version)), updated_at=float(version))
+        # Switch threads often, so reads interleave with writes as much as possible
+        time.sleep(0)
+    writes.append(version)
+
+
+def read_separately(cache: PriceCache, stop: threading.Event, results):
+    reads = torn = 0
+    while not stop.is_set():
+        prices = cache.peek()
+        updated_at = cache.updated_at
+        reads += 1
+        if prices['coin-0'] != updated_at:
+            torn += 1
+    results.append((reads, torn))
+
+
+def read_snapshot(cache: PriceCache, stop: threading.Event, results):
+    reads = torn = 0
+    while not stop.is_set():
+        snapshot = cache.snapshot
+        reads += 1
+        if snapshot.prices['coin-0'] != snapshot.updated_at:
+            torn += 1
+    results.append((reads, torn))
+
+
+def run(reader, readers: int, seconds: float):
+    cache = PriceCache(lambda: None, ttl=60)
+    cache.put(dict.fromkeys(COINS, 0.0), updated_at=0.0)
+    stop, results, writes = threading.Event(), [], []
+    threads = [threading.Thread(target=writer, args=(cache, stop, writes))]
+    threads += [threading.Thread(target=reader, args=(cache, stop, results)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    reads = sum(r for r, _ in results)
+    torn = sum(t for _, t in results)
+    return reads / seconds, torn, writes[0] / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=2, help="reader threads")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    # A short switch interval makes the interpreter swap threads between the two reads more often
+    sys.setswitchinterval(1e-5)
+    print(f"{args.readers} reader thread(s), 1 writer, {args.seconds:g} s each, {os.cpu_count()} CPU(s)\n")
+    print(f"{'Read':<32} {'Reads/s':>12} {'Writes/s':>10} {'Torn reads':>11}")
+    for label, reader in (("peek() then updated_at (old)", read_separately),
+                          ("snapshot", read_snapshot)):
+        reads_per_s, torn, writes_per_s = run(reader, args.readers, args.seconds)
+        print(f"{label:<32} {reads_per_s:>12,.0f} {writes_per_s:>10,.0f} {torn:>11,}")
+
+
+if __name__ == "__main__":
+    main()
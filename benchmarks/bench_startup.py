@@ -0,0 +1,119 @@
+"""
+Startup profile: import time, time to first update and time to first tick
+
+Starts main.py against the local Bot API and CoinGecko stand-ins with a /help
+command already waiting, like a user who wrote while the bot restarted, and
+measures from process start:
+
+- first update: until the reply to that /help arrives
+- first tick: until the first price response has been sent, i.e. when the
+  first monitor tick has prices to work with
+
+Each run starts from an empty state directory, so it is a cold start without
+a checkpoint to warm up from. The imports of main.py are timed separately
+with python -X importtime.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--latency 0.5] [--coins 50]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_e2e import ROOT, free_port, replies_since, wait_until, write_targets
+from stubs import FakeBotAPI, FakeCoinGecko
+
+USER = 1000
+
+
+def import_profile(env: dict, top: int):
+    """Total import time of main.py and the slowest top-level packages, in ms"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], env=env, cwd=ROOT,
+                            capture_output=True, text=True, timeout=120)
+    packages = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            cumulative = int(cumulative) / 1000
+        except ValueError:
+            continue    # The header line
+        name = name.strip()
+        if name == 'main':
+            total = cumulative
+        elif '.' not in name:
+            packages[name] = max(packages.get(name, 0.0), cumulative)
+    return total, sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def start_once(args, tmp: str, run: int):
+    """Boot main.py once and return (first update, first tick) in ms after the process started"""
+    with FakeCoinGecko(latency=args.latency) as stub, FakeBotAPI() as api:
+        env = {
+            **os.environ,
+            'TELEGRAM_BOT_TOKEN': '123:bench',
+            'TELEGRAM_CHAT_ID': '1',
+            'TELEGRAM_BASE_URL': f"{api.url}/bot",
+            'COINGECKO_API_URL': stub.price_url,
+            'PRICE_PROVIDERS': 'coingecko',
+            'CONFIG_RELOAD_SECONDS': '0',
+            'TARGETS_FILE': os.path.join(tmp, 'targets.toml'),
+            'SUBSCRIPTIONS_DB': os.path.join(tmp, f"subscriptions-{run}.db"),
+            'PRICE_HISTORY_DIR': os.path.join(tmp, f"history-{run}"),
+            'STATE_FILE': os.path.join(tmp, f"state-{run}.json"),
+            'METRICS_PORT': str(free_port()),
+        }
+        # The stand-in keeps updates queued before start, even though polling asks to drop them
+        api.send_command(USER, '/help')
+        with open(os.path.join(tmp, f"startup-{run}.log"), 'wb') as log:
+            started = time.perf_counter()
+            process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'main.py')], env=env, cwd=ROOT,
+                                       stdout=subprocess.DEVNULL, stderr=log)
+            try:
+                wait_until(lambda: replies_since(api, 0, [USER]) and stub.served_at or process.poll() is not None,
+                           "the first reply and price response", timeout=60, interval=0.001)
+            finally:
+                process.terminate()
+                process.wait(30)
+        if not stub.served_at or not replies_since(api, 0, [USER]):
+            raise RuntimeError(f"main.py exited early, see {log.name}")
+        return (replies_since(api, 0, [USER])[USER] - started) * 1000, (stub.served_at[0] - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help="cold starts to take the median of")
+    parser.add_argument('--latency', type=float, default=0.5, help="fake CoinGecko latency in seconds")
+    parser.add_argument('--coins', type=int, default=50, help="coins in the targets file")
+    parser.add_argument('--top', type=int, default=8, help="slowest imported packages to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_targets(os.path.join(tmp, 'targets.toml'), args.coins)
+        env = {**os.environ, 'TARGETS_FILE': os.path.join(tmp, 'targets.toml')}
+        total, packages = import_profile(env, args.top)
+        print(f"import main: {total:.0f} ms")
+        for name, cumulative in packages:
+            print(f"  {name:<24} {cumulative:>7.1f} ms")
+
+        updates, ticks = [], []
+        for run in range(args.runs):
+            first_update, first_tick = start_once(args, tmp, run)
+            updates.append(first_update)
+            ticks.append(first_tick)
+
+    print(f"\n{args.runs} cold start(s), {args.coins} coins, price API latency {args.latency * 1000:.0f} ms, "
+          f"{os.cpu_count()} CPU(s)")
+    print(f"{'':<22} {'median ms':>10} {'min ms':>10}")
+    print(f"{'time to first update':<22} {statistics.median(updates):>10.0f} {min(updates):>10.0f}")
+    print(f"{'time to first tick':<22} {statistics.median(ticks):>10.0f} {min(ticks):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
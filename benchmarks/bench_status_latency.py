@@ -0,0 +1,90 @@
+"""
+Benchmark /status latency with 100 concurrent requests against a slow stub server
+
+Usage: python benchmarks/bench_status_latency.py [--latency 0.2] [--requests 100]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import FakeCoinGecko
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_concurrent(handler, count):
+    """Start `count` handlers at once and return their latencies in ms"""
+    start = time.perf_counter()
+
+    async def timed():
+        await handler()
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(timed() for _ in range(count)))
+
+
+def report(name, latencies):
+    print(f"{name:<32} p50={percentile(latencies, 50):8.1f} ms  "
+          f"p99={percentile(latencies, 99):8.1f} ms  "
+          f"mean={statistics.mean(latencies):8.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.2, help="stub response delay in seconds")
+    parser.add_argument('--requests', type=int, default=100, help="concurrent /status requests")
+    args = parser.parse_args()
+
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    with FakeCoinGecko(latency=args.latency) as stub:
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123:bench')
+        os.environ.setdefault('TELEGRAM_CHAT_ID', '1')
+        os.environ['COINGECKO_API_URL'] = stub.price_url
+        os.environ['PRICE_PROVIDERS'] = 'coingecko'
+
+        from crypto_monitor import CryptoPriceMonitor
+        from bot_commands import TelegramBotCommands
+
+        monitor = CryptoPriceMonitor()
+        commands = TelegramBotCommands(monitor)
+        url = f"{stub.price_url}?ids={','.join(monitor.coin_ids())}&vs_currencies=usd"
+
+        # Previous behaviour: a blocking HTTP call inside the async handler
+        async def blocking_status():
+            urllib.request.urlopen(url).read()
+
+        # Async fetch path with the cache disabled: pooled client + concurrency cap
+        async def uncached_status():
+            await monitor.fetch_crypto_prices_async()
+
+        print(f"{args.requests} concurrent /status requests, stub latency {args.latency * 1000:.0f} ms\n")
+        report("blocking HTTP call (old)", await run_concurrent(blocking_status, args.requests))
+        report("async fetch, no cache", await run_concurrent(uncached_status, args.requests))
+
+        monitor.price_cache.ttl = 0
+        monitor.price_cache.stale_ttl = 0
+        report("async + single-flight cache", await run_concurrent(commands.get_status_message, args.requests))
+
+        monitor.price_cache.ttl = 60
+        report("async, warm cache", await run_concurrent(commands.get_status_message, args.requests))
+
+        print(f"\nStub requests served: {stub.requests}")
+        print(f"Cache stats: {monitor.price_cache.stats()}")
+        await monitor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
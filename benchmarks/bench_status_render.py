@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: StatusRenderer vs rebuilding the status message every time
+
+Usage: python benchmarks/bench_status_render.py [--renders 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coin_config import load_config
+from status_renderer import StatusRenderer
+
+CRYPTO_CONFIG = load_config().coins
+
+
+def legacy_render(prices, updated_at):
+    """The previous get_status_message body"""
+    message = "📊 <b>Current Crypto Status</b>\n\n"
+    for coin_name, current_price in prices.items():
+        if coin_name not in CRYPTO_CONFIG:
+            continue
+        config = CRYPTO_CONFIG[coin_name]
+        realistic_price = config['realistic_price']
+        optimistic_price = config['optimistic_price']
+        realistic_pct = ((current_price - realistic_price) / realistic_price * 100)
+        optimistic_pct = ((current_price - optimistic_price) / optimistic_price * 100)
+        realistic_status = "✅" if current_price >= realistic_price else f"📈 {realistic_pct:+.1f}%"
+        optimistic_status = "✅" if current_price >= optimistic_price else f"📈 {optimistic_pct:+.1f}%"
+        message += (
+            f"<b>{config['symbol']}</b> - ${current_price:,.2f}\n"
+            f"  Realistic (${realistic_price:,.2f}): {realistic_status}\n"
+            f"  Optimistic (${optimistic_price:,.2f}): {optimistic_status}\n\n"
+        )
+    updated = datetime.fromtimestamp(updated_at)
+    message += f"Last updated: {updated.strftime('%Y-%m-%d %H:%M:%S')}"
+    return message
+
+
+def bench(label, render, snapshots, renders):
+    started = time.perf_counter()
+    for i in range(renders):
+        prices, updated_at = snapshots[i % len(snapshots)]
+        render(prices, updated_at)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<38} {elapsed / renders * 1e6:8.2f} us/render")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--renders', type=int, default=100_000)
+    args = parser.parse_args()
+
+    base = {coin: config['realistic_price'] * 0.97 for coin, config in CRYPTO_CONFIG.items()}
+    now = time.time()
+    unchanged = [(base, now)]
+    # Every snapshot is new, but only one coin moved
+    one_moved = [({**base, 'bitcoin': base['bitcoin'] + i}, now + i) for i in range(100)]
+
+    assert legacy_render(base, now) == StatusRenderer(CRYPTO_CONFIG).render(base, now)
+
+    bench("legacy, repeated /status", legacy_render, unchanged, args.renders)
+    bench("renderer, repeated /status", StatusRenderer(CRYPTO_CONFIG).render, unchanged, args.renders)
+    bench("legacy, one coin moved per snapshot", legacy_render, one_moved, args.renders)
+    bench("renderer, one coin moved per snapshot", StatusRenderer(CRYPTO_CONFIG).render, one_moved, args.renders)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark streaming mode against a local WebSocket ticker stream
+
+Measures tick-to-alert latency (spike published -> notification handed to the
+sender) and how many ticks/s the feed can take while alerts are being checked.
+
+Usage: python benchmarks/bench_stream_latency.py [--spikes 50] [--ticks 200000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stubs import FakeTickerStream
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[int(p * (len(ordered) - 1))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--spikes', type=int, default=50, help="price spikes to time")
+    parser.add_argument('--ticks', type=int, default=200_000, help="ticks for the throughput run")
+    parser.add_argument('--debounce', type=float, default=0.25, help="stream debounce window in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeTickerStream() as stub:
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123:bench')
+        os.environ.setdefault('TELEGRAM_CHAT_ID', '1')
+        os.environ['SUBSCRIPTIONS_DB'] = os.path.join(tmp, 'subscriptions.db')
+        os.environ['PRICE_HISTORY_DIR'] = os.path.join(tmp, 'history')
+        os.environ['STATE_FILE'] = os.path.join(tmp, 'state.json')
+        os.environ['PRICE_STREAM_ENABLED'] = 'true'
+        os.environ['PRICE_STREAM_URL'] = stub.url
+        os.environ['PRICE_STREAM_DEBOUNCE_SECONDS'] = str(args.debounce)
+
+        from crypto_monitor import CryptoPriceMonitor
+
+        monitor = CryptoPriceMonitor()
+        CRYPTO_CONFIG = monitor.config.coins
+        alerted = asyncio.Event()
+        alerts = []
+
+        async def record_alert(message, chat_id=None):
+            alerts.append(time.perf_counter())
+            alerted.set()
+
+        monitor.send_notification = record_alert
+        stream = monitor.create_stream()
+        stream.start()
+        await asyncio.to_thread(stub.wait_for_clients)
+
+        bitcoin = CRYPTO_CONFIG['bitcoin']
+        latencies = []
+        for _ in range(args.spikes):
+            # Re-arm below the target, then spike through both levels
+            await asyncio.to_thread(stub.publish, {'BTCUSDT': bitcoin['realistic_price'] * 0.9})
+            await asyncio.sleep(args.debounce * 1.5)
+            alerted.clear()
+            sent = time.perf_counter()
+            await asyncio.to_thread(stub.publish, {'BTCUSDT': bitcoin['optimistic_price'] * 1.01})
+            await asyncio.wait_for(alerted.wait(), 5)
+            latencies.append(alerts[-1] - sent)
+            await asyncio.sleep(args.debounce * 1.5)
+
+        print(f"Tick-to-alert over {len(latencies)} spikes (debounce {args.debounce * 1000:.0f} ms): "
+              f"p50={percentile(latencies, 0.5) * 1000:.1f} ms  p99={percentile(latencies, 0.99) * 1000:.1f} ms  "
+              f"max={max(latencies) * 1000:.1f} ms")
+
+        # Throughput: all coins ticking as fast as the socket allows, below every target
+        symbols = {config.get('binance_symbol', f"{config['symbol']}USDT"): config['realistic_price'] * 0.5
+                   for config in CRYPTO_CONFIG.values()}
+        snapshots = [symbols] * (args.ticks // len(symbols))
+        expected = stream.ticks + len(snapshots) * len(symbols)
+        dispatches = stream.dispatches
+
+        started = time.perf_counter()
+        publisher = asyncio.create_task(asyncio.to_thread(stub.replay, snapshots))
+        while stream.ticks < expected:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+        await publisher
+
+        print(f"Throughput: {len(snapshots) * len(symbols):,} ticks in {elapsed:.2f}s -> "
+              f"{len(snapshots) * len(symbols) / elapsed:,.0f} ticks/s, "
+              f"{stream.dispatches - dispatches} threshold checks")
+        print(f"Stream stats: {stream.stats()}")
+
+        await stream.stop()
+        await monitor.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
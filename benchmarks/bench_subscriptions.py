@@ -0,0 +1,59 @@
+"""
+Benchmark SubscriptionStore evaluation with 100k subscriptions
+
+Usage: python benchmarks/bench_subscriptions.py [--subscriptions 100000] [--coins 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subscriptions import SubscriptionStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscriptions', type=int, default=100_000, help="chat/coin subscriptions")
+    parser.add_argument('--coins', type=int, default=20, help="distinct coins")
+    parser.add_argument('--ticks', type=int, default=200, help="price moves per coin")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    base_prices = {f"coin{i}": rng.uniform(1, 50_000) for i in range(args.coins)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SubscriptionStore(os.path.join(tmp, 'bench.db'))
+
+        start = time.perf_counter()
+        rows = []
+        for chat_id in range(args.subscriptions):
+            coin = f"coin{chat_id % args.coins}"
+            realistic = base_prices[coin] * rng.uniform(0.8, 1.2)
+            rows.append((chat_id, coin, 'realistic', realistic))
+            rows.append((chat_id, coin, 'optimistic', realistic * 1.05))
+        store.set_targets_many(rows)
+        print(f"Inserted {store.count():,} targets in {time.perf_counter() - start:.2f}s")
+
+        # Seed last prices, then time small per-tick moves
+        store.evaluate(base_prices)
+        prices = dict(base_prices)
+        events = 0
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            prices = {coin: price * rng.uniform(0.997, 1.003) for coin, price in prices.items()}
+            events += len(store.evaluate(prices))
+        elapsed = time.perf_counter() - start
+
+        per_coin_us = elapsed / (args.ticks * args.coins) * 1e6
+        print(f"{args.ticks} ticks x {args.coins} coins: {per_coin_us:.1f} us per coin, "
+              f"{elapsed / args.ticks * 1000:.2f} ms per tick, {events / args.ticks:.1f} events per tick")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: ThresholdEngine vs the old per-coin Python loop
+
+Usage: python benchmarks/bench_threshold_engine.py [--ticks 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from threshold_engine import ThresholdEngine
+
+
+def make_config(threshold_count):
+    """Build a CRYPTO_CONFIG-shaped dict with two thresholds per coin"""
+    rng = random.Random(threshold_count)
+    config = {}
+    for i in range(max(1, threshold_count // 2)):
+        base = rng.uniform(1, 1000)
+        config[f"coin{i}"] = {
+            'symbol': f"C{i}",
+            'realistic_price': base,
+            'optimistic_price': base * 1.02,
+            'coingecko_id': f"coin{i}",
+        }
+    return config
+
+
+def make_ticks(config, tick_count):
+    """Random walk around each coin's realistic target"""
+    rng = random.Random(tick_count)
+    prices = {coin: c['realistic_price'] for coin, c in config.items()}
+    ticks = []
+    for _ in range(tick_count):
+        prices = {coin: price * rng.uniform(0.995, 1.005) for coin, price in prices.items()}
+        ticks.append(prices)
+    return ticks
+
+
+def legacy_check(config, notified, prices):
+    """The previous check_price_thresholds + reset_notifications_if_below_threshold, minus sending"""
+    events = 0
+    for coin_name, current_price in prices.items():
+        if coin_name not in config:
+            continue
+        c = config[coin_name]
+        if coin_name not in notified:
+            notified[coin_name] = {'realistic': False, 'optimistic': False}
+        if current_price >= c['realistic_price'] and not notified[coin_name]['realistic']:
+            notified[coin_name]['realistic'] = True
+            events += 1
+        if current_price >= c['optimistic_price'] and not notified[coin_name]['optimistic']:
+            notified[coin_name]['optimistic'] = True
+            events += 1
+
+    for coin_name, current_price in prices.items():
+        if coin_name not in config or coin_name not in notified:
+            continue
+        c = config[coin_name]
+        if current_price < c['realistic_price'] and notified[coin_name]['realistic']:
+            notified[coin_name]['realistic'] = False
+            events += 1
+        if current_price < c['optimistic_price'] and notified[coin_name]['optimistic']:
+            notified[coin_name]['optimistic'] = False
+            events += 1
+    return events
+
+
+def bench(threshold_count, tick_count):
+    config = make_config(threshold_count)
+    ticks = make_ticks(config, tick_count)
+
+    notified = {}
+    start = time.perf_counter()
+    legacy_events = sum(legacy_check(config, notified, prices) for prices in ticks)
+    legacy_time = time.perf_counter() - start
+
+    engine = ThresholdEngine.from_config(config)
+    start = time.perf_counter()
+    engine_events = sum(len(engine.evaluate(prices)) for prices in ticks)
+    engine_time = time.perf_counter() - start
+
+    assert legacy_events == engine_events, (legacy_events, engine_events)
+
+    legacy_us = legacy_time / tick_count * 1e6
+    engine_us = engine_time / tick_count * 1e6
+    print(f"{len(engine):>8} thresholds | loop {legacy_us:>10.1f} us/tick | "
+          f"engine {engine_us:>10.1f} us/tick | {legacy_us / engine_us:5.1f}x | "
+          f"{engine_events / tick_count:>8.1f} events/tick")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ticks', type=int, default=50, help="price snapshots per size")
+    args = parser.parse_args()
+
+    for threshold_count in (10, 1_000, 100_000):
+        bench(threshold_count, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
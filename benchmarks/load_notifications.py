@@ -0,0 +1,70 @@
+"""
+Load test NotificationDispatcher against a local fake Bot API
+
+Simulates a popular level being crossed: every chat gets one or more alerts at
+once. Reports send throughput, how many alerts were coalesced and how many
+flood-control errors were retried.
+
+Usage: python benchmarks/load_notifications.py [--chats 2000] [--global-rate 500]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from notification_dispatcher import NotificationDispatcher
+from stubs import FakeBotAPI
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=2000, help="chats receiving alerts")
+    parser.add_argument('--max-alerts', type=int, default=3, help="max alerts per chat in the burst")
+    parser.add_argument('--global-rate', type=float, default=500, help="global messages/second limit")
+    parser.add_argument('--flood-every', type=int, default=500, help="fake a 429 every N sends (0 = never)")
+    parser.add_argument('--latency', type=float, default=0.005, help="fake Bot API latency in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(1)
+
+    with FakeBotAPI(latency=args.latency, flood_every=args.flood_every) as api:
+        bot = Bot('123:bench', base_url=f"{api.url}/bot",
+                  request=HTTPXRequest(connection_pool_size=32))
+        async with bot:
+            dispatcher = NotificationDispatcher(bot, global_rate=args.global_rate, workers=32, backoff=0.1)
+            dispatcher.start()
+
+            alerts = 0
+            start = time.perf_counter()
+            for chat_id in range(1, args.chats + 1):
+                for n in range(rng.randint(1, args.max_alerts)):
+                    dispatcher.enqueue(chat_id, f"🎯 <b>Target {n} reached</b>")
+                    alerts += 1
+
+            peak_depth = dispatcher.queue_depth
+            while dispatcher.queue_depth or dispatcher._in_flight:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            await dispatcher.stop()
+
+        stats = dispatcher.stats()
+        print(f"Alerts queued:         {alerts:,} (peak queue depth {peak_depth:,})")
+        print(f"Messages sent:         {stats['sent']:,} ({stats['coalesced']:,} alerts coalesced)")
+        print(f"Flood-control retries: {stats['retried']:,}, failed: {stats['failed']:,}")
+        print(f"Drained in:            {elapsed:.2f}s -> {stats['sent'] / elapsed:,.0f} messages/s, "
+              f"{alerts / elapsed:,.0f} alerts/s")
+        print(f"Bot API calls:         {api.calls}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
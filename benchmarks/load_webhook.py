@@ -0,0 +1,141 @@
+"""
+Load test webhook mode against a local fake Bot API
+
+Starts webhook_server.py with 1, 2, 4... worker processes, posts /status
+updates from many chats to its webhook and measures how many updates per
+second are answered (replies arriving at the fake Bot API).
+
+Usage: python benchmarks/load_webhook.py [--updates 3000] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from coin_config import load_config
+from stubs import FakeBotAPI
+
+CRYPTO_CONFIG = load_config().coins
+
+SECRET = 'load-test-secret'
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def status_update(update_id: int, chat_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load'},
+            'text': '/status',
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 7}],
+        },
+    }
+
+
+async def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run(workers: int, args, api: FakeBotAPI, tmp: str) -> float:
+    port = free_port()
+    env = {
+        **os.environ,
+        'TELEGRAM_BOT_TOKEN': '123:bench',
+        'TELEGRAM_CHAT_ID': '1',
+        'TELEGRAM_BASE_URL': f"{api.url}/bot",
+        'WEBHOOK_PORT': str(port),
+        'WEBHOOK_WORKERS': str(workers),
+        'WEBHOOK_SECRET': SECRET,
+        'PRICE_PROVIDERS': 'replay',
+        'PRICE_REPLAY_FILE': os.path.join(tmp, 'prices.jsonl'),
+        'SUBSCRIPTIONS_DB': os.path.join(tmp, f"subscriptions-{workers}.db"),
+        'PRICE_HISTORY_DIR': os.path.join(tmp, 'history'),
+        'STATE_FILE': os.path.join(tmp, f"state-{workers}.json"),
+        'SNAPSHOT_PATH': os.path.join(tmp, f"snapshot-{workers}"),
+        'METRICS_PORT': '0',
+    }
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'webhook_server.py')], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_for_port(port)
+        # Give the workers time to start and the leader time to publish prices
+        await asyncio.sleep(2 + workers)
+
+        url = f"http://127.0.0.1:{port}/telegram"
+        def replies():
+            return sum(1 for chat_id, _ in api.messages if chat_id >= 1000)
+
+        baseline = replies()
+        semaphore = asyncio.Semaphore(args.concurrency)
+        headers = {'X-Telegram-Bot-Api-Secret-Token': SECRET}
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.concurrency)) as client:
+            async def post(i):
+                async with semaphore:
+                    update = status_update(i, 1000 + i % args.chats)
+                    async with client.post(url, json=update, headers=headers) as response:
+                        response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(post(i) for i in range(1, args.updates + 1)))
+            posted = time.perf_counter() - started
+            while replies() - baseline < args.updates:
+                if time.perf_counter() - started > 120:
+                    raise TimeoutError(f"only {replies() - baseline} replies arrived")
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - started
+        print(f"  posted in {posted:.2f}s, answered in {elapsed:.2f}s")
+    finally:
+        server.terminate()
+        server.wait(30)
+    return args.updates / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=3000)
+    parser.add_argument('--chats', type=int, default=500, help="distinct chats sending updates")
+    parser.add_argument('--workers', default='1,2,4', help="comma-separated worker counts to try")
+    parser.add_argument('--concurrency', type=int, default=64, help="webhook requests in flight")
+    parser.add_argument('--latency', type=float, default=0.0, help="fake Bot API latency in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeBotAPI(latency=args.latency) as api:
+        with open(os.path.join(tmp, 'prices.jsonl'), 'w') as f:
+            f.write(json.dumps({c['coingecko_id']: c['realistic_price'] * 0.9 for c in CRYPTO_CONFIG.values()}))
+
+        print(f"{args.updates} /status updates from {args.chats} chats, {os.cpu_count()} CPU(s)")
+        for workers in (int(n) for n in args.workers.split(',')):
+            rate = await run(workers, args, api, tmp)
+            print(f"{workers} worker(s): {rate:,.0f} updates/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
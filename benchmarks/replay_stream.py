@@ -0,0 +1,58 @@
+"""
+Replay recorded prices as a local WebSocket ticker stream
+
+Serves a JSON-lines file of {coingecko_id: price} snapshots (the same format
+as the replay price provider) in Binance's combined-stream format, so the
+monitor's streaming mode can be run offline:
+
+    python benchmarks/replay_stream.py prices.jsonl --port 8765
+    PRICE_STREAM_ENABLED=true PRICE_STREAM_URL=ws://127.0.0.1:8765/stream python main.py
+
+Usage: python benchmarks/replay_stream.py FILE [--port 8765] [--interval 1.0]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coin_config import load_config
+from stubs import FakeTickerStream
+
+CRYPTO_CONFIG = load_config().coins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', help="JSON lines of {coingecko_id: price}")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between snapshots")
+    parser.add_argument('--once', action='store_true', help="stop at the end of the file instead of looping")
+    args = parser.parse_args()
+
+    pairs = {
+        config['coingecko_id']: config.get('binance_symbol', f"{config['symbol']}USDT")
+        for config in CRYPTO_CONFIG.values()
+    }
+    with open(args.file) as f:
+        snapshots = [
+            {pairs[coin_id]: price for coin_id, price in json.loads(line).items() if coin_id in pairs}
+            for line in f if line.strip()
+        ]
+
+    with FakeTickerStream(port=args.port) as stream:
+        print(f"Replaying {len(snapshots)} snapshots on {stream.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                stream.replay(snapshots, args.interval)
+                if args.once:
+                    break
+        except KeyboardInterrupt:
+            pass
+        print(f"Sent {stream.sent} ticks to {stream.connections} connection(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Local stand-in servers used by the benchmarks
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Dict, Iterable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from websockets.asyncio.server import serve
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Write each response in one packet, otherwise delayed ACKs add ~40 ms per request
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _BacklogHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections when many clients connect at once
+    request_queue_size = 1024
+
+
+class StubServer:
+    """Run an HTTP handler class on a random local port in a background thread"""
+
+    def __init__(self, handler_class):
+        self.httpd = _BacklogHTTPServer(('127.0.0.1', 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeCoinGecko(StubServer):
+    """Fake /simple/price endpoint with a fixed response delay
+
+    Optionally adds delay per requested coin, rejects URLs longer than max_url
+    with 414 like a CDN would, fails a share of requests with 500, and answers
+    304 to If-None-Match when etag is set. Prices come from the prices dict,
+    base_price for coins not in it.
+    """
+
+    def __init__(self, latency: float = 0.0, base_price: float = 100.0, per_coin_latency: float = 0.0,
+                 max_url: int = 0, error_rate: float = 0.0, seed: int = 0, etag: bool = False):
+        self.latency = latency
+        self.base_price = base_price
+        self.prices: Dict[str, float] = {}
+        self.etag = etag
+        self.bytes_sent = 0
+        self.per_coin_latency = per_coin_latency
+        self.max_url = max_url
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.served_at = []                 # perf_counter() time each successful response was sent
+        super().__init__(_CoinGeckoHandler)
+
+    @property
+    def price_url(self) -> str:
+        return f"{self.url}/api/v3/simple/price"
+
+
+class _CoinGeckoHandler(_QuietHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        stub.requests += 1
+        if stub.max_url and len(self.path) > stub.max_url:
+            self.send_json({'error': 'URI Too Long'}, status=414)
+            return
+        query = parse_qs(urlparse(self.path).query)
+        ids = query.get('ids', [''])[0].split(',')
+        currencies = query.get('vs_currencies', ['usd'])[0].split(',')
+
+        delay = stub.latency + stub.per_coin_latency * len(ids)
+        if delay:
+            time.sleep(delay)
+        if stub.error_rate and stub.rng.random() < stub.error_rate:
+            self.send_json({'error': 'Internal Server Error'}, status=500)
+            return
+
+        payload = {
+            coin_id: {currency: stub.prices.get(coin_id, stub.base_price) for currency in currencies}
+            for coin_id in ids if coin_id
+        }
+        body = json.dumps(payload).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"' if stub.etag else None
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        stub.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+        stub.served_at.append(time.perf_counter())
+
+
+class FakeBotAPI(StubServer):
+    """Fake Telegram Bot API that accepts any method and can answer with flood-control errors
+
+    Point a Bot at it with Bot(token, base_url=f"{server.url}/bot"). Updates
+    queued with send_command() are handed out by getUpdates, so a bot running
+    with polling can be driven like real users would.
+    """
+
+    def __init__(self, latency: float = 0.0, flood_every: int = 0, retry_after: int = 1):
+        self.latency = latency
+        self.flood_every = flood_every      # Reply 429 to every Nth sendMessage, 0 disables
+        self.retry_after = retry_after
+        self.calls = {}
+        self.messages = []                  # (chat_id, text) for every accepted sendMessage
+        self.sent_at = []                   # perf_counter() time each of messages arrived
+        self._lock = threading.Lock()
+        self._message_id = 0
+        self._updates = []
+        self._new_updates = threading.Condition(self._lock)
+        super().__init__(_BotAPIHandler)
+
+    def next_message_id(self) -> int:
+        with self._lock:
+            self._message_id += 1
+            return self._message_id
+
+    def send_command(self, chat_id: int, text: str) -> int:
+        """Queue a message from a user in a private chat, returns its update_id"""
+        command = text.split(' ', 1)[0]
+        with self._lock:
+            update_id = len(self._updates) + 1
+            self._updates.append({
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+                    'text': text,
+                    'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+                    if command.startswith('/') else [],
+                },
+            })
+            self._new_updates.notify_all()
+        return update_id
+
+    def pending_updates(self, offset: int, timeout: float, limit: int = 100) -> list:
+        """Updates from offset on, waiting up to timeout seconds for one to arrive"""
+        start = max(offset, 1) - 1
+        with self._lock:
+            self._new_updates.wait_for(lambda: len(self._updates) > start, timeout)
+            return self._updates[start:start + limit]
+
+
+class _BotAPIHandler(_QuietHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        method = self.path.rsplit('/', 1)[-1]
+        length = int(self.headers.get('Content-Length', 0))
+        params = self._parse_params(self.rfile.read(length))
+
+        with stub._lock:
+            stub.calls[method] = count = stub.calls.get(method, 0) + 1
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if method == 'getMe':
+            self.send_json({'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'
+            }})
+            return
+
+        if method in ('pinChatMessage', 'unpinChatMessage', 'deleteWebhook', 'setWebhook'):
+            self.send_json({'ok': True, 'result': True})
+            return
+
+        if method == 'getUpdates':
+            # Long polling: wait for new updates, but not long enough to hold up shutdown
+            updates = stub.pending_updates(int(params.get('offset', 0)), min(float(params.get('timeout', 0)), 1.0),
+                                           int(params.get('limit', 100)))
+            self.send_json({'ok': True, 'result': updates})
+            return
+
+        if method == 'sendMessage' and stub.flood_every and count % stub.flood_every == 0:
+            self.send_json({
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {stub.retry_after}",
+                'parameters': {'retry_after': stub.retry_after}
+            }, status=429)
+            return
+
+        chat_id = int(params.get('chat_id', 0))
+        if method == 'sendMessage':
+            with stub._lock:
+                stub.messages.append((chat_id, params.get('text', '')))
+                stub.sent_at.append(time.perf_counter())
+
+        self.send_json({'ok': True, 'result': {
+            'message_id': stub.next_message_id(),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+            'text': params.get('text', ''),
+        }})
+
+    def _parse_params(self, body: bytes) -> dict:
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(body or b'{}')
+        return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+
+class FakeTickerStream:
+    """Local WebSocket server speaking Binance's combined-stream miniTicker format
+
+    Prices are pushed to every connected client with publish() or replay().
+    Point PriceStream at .url.
+    """
+
+    def __init__(self, port: int = 0, drop_every: int = 0):
+        self.port = port                # 0 picks a free port
+        self.drop_every = drop_every    # Close each connection after N messages, 0 disables
+        self.connections = 0
+        self.sent = 0
+        self._clients = set()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}/stream"
+
+    def __enter__(self):
+        self._thread.start()
+        self._server = self._call(self._serve())
+        return self
+
+    def __exit__(self, *exc):
+        self._server.close()
+        self._call(self._server.wait_closed())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def wait_for_clients(self, count: int = 1, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while len(self._clients) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError("No client connected to the ticker stream")
+            time.sleep(0.005)
+
+    def publish(self, prices: Dict[str, float]):
+        """Send one ticker per symbol, e.g. {'BTCUSDT': 101000.0}"""
+        self._call(self._broadcast(prices))
+
+    def replay(self, snapshots: Iterable[Dict[str, float]], interval: float = 0.0):
+        """Send snapshots one after another, interval seconds apart"""
+        self._call(self._replay(snapshots, interval))
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _serve(self):
+        return await serve(self._handler, '127.0.0.1', self.port, compression=None)
+
+    async def _handler(self, ws):
+        self.connections += 1
+        self._clients.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self._clients.discard(ws)
+
+    async def _replay(self, snapshots, interval):
+        for prices in snapshots:
+            await self._broadcast(prices)
+            if interval:
+                await asyncio.sleep(interval)
+
+    async def _broadcast(self, prices):
+        now = int(time.time() * 1000)
+        for symbol, price in prices.items():
+            message = json.dumps({
+                'stream': f"{symbol.lower()}@miniTicker",
+                'data': {'e': '24hrMiniTicker', 'E': now, 's': symbol, 'c': f"{price:.8f}"},
+            })
+            for ws in list(self._clients):
+                try:
+                    await ws.send(message)
+                except Exception:
+                    self._clients.discard(ws)
+                    continue
+                self.sent += 1
+                if self.drop_every and self.sent % self.drop_every == 0:
+                    self._clients.discard(ws)
+                    await ws.close()
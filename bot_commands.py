@@ -3,9 +3,15 @@ Telegram bot command handlers for interactive features
 """
 
 import asyncio
+import html
+import math
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from chart_renderer import CHART_RANGES, DEFAULT_CHART_RANGE, chart_range
 from crypto_monitor import CryptoPriceMonitor
+from fx_rates import format_money
+from metrics import HANDLER_SECONDS
 
 
 class TelegramBotCommands:
@@ -38,43 +44,43 @@ class TelegramBotCommands:
     
     async def get_status_message(self):
         """Generate status message with current prices"""
-        prices = self.monitor.get_crypto_prices()
-        if not prices:
+        if not await self.monitor.get_crypto_prices_async():
             return "❌ Could not fetch current prices. Please try again later."
         
-        message = "📊 <b>Current Crypto Status</b>\n\n"
-        
-        for coin_name, current_price in prices.items():
-            from config import CRYPTO_CONFIG
-            config = CRYPTO_CONFIG[coin_name]
-            symbol = config['symbol']
-            realistic_price = config['realistic_price']
-            optimistic_price = config['optimistic_price']
-            
-            # Calculate percentage to targets
-            realistic_pct = ((current_price - realistic_price) / realistic_price * 100)
-            optimistic_pct = ((current_price - optimistic_price) / optimistic_price * 100)
-            
-            # Status indicators
-            realistic_status = "✅" if current_price >= realistic_price else f"📈 {realistic_pct:+.1f}%"
-            optimistic_status = "✅" if current_price >= optimistic_price else f"📈 {optimistic_pct:+.1f}%"
-            
-            message += (
-                f"<b>{symbol}</b> - ${current_price:,.2f}\n"
-                f"  Realistic (${realistic_price:,.2f}): {realistic_status}\n"
-                f"  Optimistic (${optimistic_price:,.2f}): {optimistic_status}\n\n"
-            )
-        
-        from datetime import datetime
-        message += f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        return message
+        # Prices and their timestamp from one snapshot, however many refreshes land while quoting
+        snapshot = self.monitor.price_cache.snapshot
+        quoted = await self.monitor.quote(snapshot.prices)
+        return self.monitor.status_renderer.render(quoted, snapshot.updated_at)
 
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /status command and Status button"""
+        """Handle /status command and Status button; /status live pins a live status instead"""
+        if context.args and context.args[0].lower() == 'live':
+            context.args = context.args[1:]
+            await self.live_command(update, context)
+            return
+        
         message = await self.get_status_message()
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.reply_keyboard)
     
+    async def live_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /live [off] - pin a status message that is edited as prices change"""
+        chat_id = update.effective_chat.id
+        live_status = self.monitor.live_status
+        
+        if context.args and context.args[0].lower() == 'off':
+            if await live_status.stop(context.bot, chat_id):
+                message = "Live status stopped."
+            else:
+                message = "There is no live status in this chat."
+            await update.message.reply_text(message, reply_markup=self.reply_keyboard)
+            return
+        
+        message = await self.get_status_message()
+        if not self.monitor.price_cache.peek():
+            await update.message.reply_text(message, reply_markup=self.reply_keyboard)
+            return
+        await live_status.start(context.bot, chat_id, message, key=self.monitor.status_renderer.body)
+    
     async def get_help_message(self):
         """Generate help message"""
         help_message = (
@@ -86,16 +92,18 @@ class TelegramBotCommands:
             "<b>Commands:</b>\n"
             "/start - Welcome message and bot info\n"
             "/status - Show current prices and progress to targets\n"
+            "/live - Pin a status message that updates itself (/live off to stop)\n"
+            "/chart &lt;coin&gt; [1h|24h|7d|30d|1y] - Price chart with the target lines\n"
+            "/watch &lt;coin&gt; &lt;realistic&gt; [optimistic] - Get alerts for your own targets\n"
+            "/unwatch &lt;coin&gt; - Stop watching a coin\n"
+            "/mywatches - List your watched coins\n"
             "/help - Show this help message\n\n"
             "<b>Monitored Coins:</b>\n"
         )
         
-        from config import CRYPTO_CONFIG
-        for coin_name, config in CRYPTO_CONFIG.items():
-            symbol = config['symbol']
-            realistic = config['realistic_price']
-            optimistic = config['optimistic_price']
-            help_message += f"• {symbol}: ${realistic:,.0f} / ${optimistic:,.0f}\n"
+        for coin in self.monitor.config.coins.values():
+            help_message += (f"• {coin.symbol}: {format_money(coin.realistic_price, coin.currency, compact=True)} / "
+                             f"{format_money(coin.optimistic_price, coin.currency, compact=True)}\n")
         
         return help_message
 
@@ -104,6 +112,148 @@ class TelegramBotCommands:
         help_message = await self.get_help_message()
         await update.message.reply_text(help_message, parse_mode='HTML', reply_markup=self.reply_keyboard)
 
+    def resolve_coin(self, name: str) -> str:
+        """Map a symbol or coin name to its CoinGecko ID; unknown names are used as IDs"""
+        config = self.monitor.config
+        coin_name = config.resolve(name)
+        return config.coins[coin_name].coingecko_id if coin_name else name.lower()
+
+    async def watch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /watch <coin> <realistic> [optimistic]"""
+        args = context.args or []
+        try:
+            if len(args) not in (2, 3):
+                raise ValueError
+            realistic = float(args[1].replace(',', ''))
+            optimistic = float(args[2].replace(',', '')) if len(args) == 3 else None
+            if not math.isfinite(realistic) or realistic <= 0:
+                raise ValueError
+            if optimistic is not None and (not math.isfinite(optimistic) or optimistic < realistic):
+                raise ValueError
+        except ValueError:
+            await update.message.reply_text(
+                "Usage: /watch &lt;coin&gt; &lt;realistic&gt; [optimistic]\n"
+                "The optimistic target must be at least the realistic one.\n"
+                "Example: /watch BTC 120000 125000",
+                parse_mode='HTML',
+                reply_markup=self.reply_keyboard
+            )
+            return
+
+        coin = self.resolve_coin(args[0])
+        current_price = await self.monitor.fetch_coin_price(coin)
+        if current_price is None:
+            await update.message.reply_text(
+                f"❌ Unknown coin <b>{html.escape(coin)}</b>. Use a symbol like BTC or a CoinGecko ID.",
+                parse_mode='HTML',
+                reply_markup=self.reply_keyboard
+            )
+            return
+
+        self.monitor.subscriptions.set_targets(update.effective_chat.id, coin, realistic, optimistic)
+
+        message = f"👀 Watching <b>{html.escape(coin)}</b> - ${current_price:,.2f}\n  Realistic: ${realistic:,.2f}"
+        if optimistic is not None:
+            message += f"\n  Optimistic: ${optimistic:,.2f}"
+        # New targets are checked against the price on the next tick, so ones already reached alert right away
+        reached = [level for level, target in (('realistic', realistic), ('optimistic', optimistic))
+                   if target is not None and current_price >= target]
+        if reached:
+            message += (f"\n\n✅ The price is already above your {' and '.join(reached)} target, "
+                        "you'll get an alert on the next price check.")
+        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.reply_keyboard)
+
+    async def unwatch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /unwatch <coin>"""
+        if not context.args:
+            await update.message.reply_text("Usage: /unwatch <coin>", reply_markup=self.reply_keyboard)
+            return
+
+        coin = self.resolve_coin(context.args[0])
+        if self.monitor.subscriptions.remove(update.effective_chat.id, coin):
+            message = f"🗑 Stopped watching <b>{html.escape(coin)}</b>"
+        else:
+            message = f"You are not watching <b>{html.escape(coin)}</b>"
+        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.reply_keyboard)
+
+    async def mywatches_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /mywatches - list this chat's targets"""
+        targets = self.monitor.subscriptions.targets_for_chat(update.effective_chat.id)
+        if not targets:
+            await update.message.reply_text(
+                "You are not watching any coins. Add one with /watch &lt;coin&gt; &lt;realistic&gt; [optimistic]",
+                parse_mode='HTML',
+                reply_markup=self.reply_keyboard
+            )
+            return
+
+        message = "👀 <b>Your Watched Coins</b>\n\n"
+        for coin, levels in targets.items():
+            message += f"<b>{html.escape(coin)}</b>\n  Realistic: ${levels['realistic']:,.2f}\n"
+            if 'optimistic' in levels:
+                message += f"  Optimistic: ${levels['optimistic']:,.2f}\n"
+            message += "\n"
+        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.reply_keyboard)
+
+    async def chart_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /chart <coin> [range] - price chart with the target lines"""
+        args = context.args or []
+        range_name = chart_range(args[1]) if len(args) == 2 else DEFAULT_CHART_RANGE
+        if len(args) not in (1, 2) or range_name is None:
+            await update.message.reply_text(
+                f"Usage: /chart &lt;coin&gt; [{'|'.join(CHART_RANGES)}]\n"
+                "Example: /chart BTC 7d",
+                parse_mode='HTML',
+                reply_markup=self.reply_keyboard
+            )
+            return
+
+        result = await self.monitor.get_chart(args[0], range_name, update.effective_chat.id)
+        if result is None:
+            await update.message.reply_text(
+                f"No price history for <b>{html.escape(args[0])}</b> yet. Charts fill in as prices are checked.",
+                parse_mode='HTML',
+                reply_markup=self.reply_keyboard
+            )
+            return
+
+        key, chart = result
+        if chart.file_id is not None:
+            try:
+                await update.message.reply_photo(chart.file_id, caption=chart.caption, parse_mode='HTML',
+                                                 reply_markup=self.reply_keyboard)
+                return
+            except BadRequest:
+                # Telegram no longer has the file, upload it again
+                pass
+
+        message = await update.message.reply_photo(chart.png, caption=chart.caption, parse_mode='HTML',
+                                                    filename=f"{range_name}.png", reply_markup=self.reply_keyboard)
+        if message.photo:
+            self.monitor.charts.uploaded(key, message.photo[-1].file_id)
+
+    def register_handlers(self, application: Application):
+        """Add all command and message handlers to the application"""
+        application.add_handler(CommandHandler("start", self.timed("start", self.start_command)))
+        application.add_handler(CommandHandler("status", self.timed("status", self.status_command)))
+        application.add_handler(CommandHandler("live", self.timed("live", self.live_command)))
+        application.add_handler(CommandHandler("chart", self.timed("chart", self.chart_command)))
+        application.add_handler(CommandHandler("help", self.timed("help", self.help_command)))
+        application.add_handler(CommandHandler("watch", self.timed("watch", self.watch_command)))
+        application.add_handler(CommandHandler("unwatch", self.timed("unwatch", self.unwatch_command)))
+        application.add_handler(CommandHandler("mywatches", self.timed("mywatches", self.mywatches_command)))
+
+        # Add message handler for Status button and other text messages
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND,
+                                               self.timed("message", self.handle_message)))
+
+    def timed(self, command: str, handler):
+        """Wrap a handler so its run time is recorded per command"""
+        async def timed_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            with HANDLER_SECONDS.time(command=command):
+                await handler(update, context)
+        return timed_handler
+
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages (including Status button presses)"""
         text = update.message.text
@@ -125,13 +275,6 @@ def create_bot_application(bot_token: str, monitor: CryptoPriceMonitor) -> Appli
     application = Application.builder().token(bot_token).build()
     
     commands = TelegramBotCommands(monitor)
-    
-    # Add command handlers
-    application.add_handler(CommandHandler("start", commands.start_command))
-    application.add_handler(CommandHandler("status", commands.status_command))
-    application.add_handler(CommandHandler("help", commands.help_command))
-    
-    # Add message handler for Status button and other text messages
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, commands.handle_message))
+    commands.register_handlers(application)
     
     return application
\ No newline at end of file
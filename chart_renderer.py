@@ -0,0 +1,271 @@
+"""
+Price charts
+Draws a coin's price history with its target lines as a PNG, using numpy and
+zlib only. Drawing runs in a small process pool, or threads in daemonic
+processes such as the webhook workers, so the event loop keeps answering
+updates meanwhile. Charts are cached by (coin, range, last bucket)
+in an LRU capped by size, and once Telegram has a copy its file_id is sent
+instead of uploading the same image again.
+"""
+
+import asyncio
+import html
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from fx_rates import format_money
+from metrics import RENDER_SECONDS
+from price_history import PriceHistory
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# Range name -> (seconds shown, rollup resolution), 60 to 1,440 points each
+CHART_RANGES = {
+    '1h': (3_600, '1m'),
+    '24h': (86_400, '1m'),
+    '7d': (7 * 86_400, '1h'),
+    '30d': (30 * 86_400, '1h'),
+    '1y': (365 * 86_400, '1d'),
+}
+RANGE_ALIASES = {'1d': '24h', '1w': '7d', '1mo': '30d'}
+DEFAULT_CHART_RANGE = '24h'
+
+BACKGROUND = (255, 255, 255)
+BAND = (214, 228, 245)      # Low to high of each bucket
+LINE = (31, 94, 168)        # Closing prices
+# Target line colour and the caption marker in the same colour
+LEVEL_STYLES = {
+    'realistic': ((46, 160, 67), '🟩'),
+    'optimistic': ((219, 109, 40), '🟧'),
+}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def chart_range(name: str) -> Optional[str]:
+    """Canonical range name for user input like 7d or 1w, None if unknown"""
+    name = name.strip().lower()
+    name = RANGE_ALIASES.get(name, name)
+    return name if name in CHART_RANGES else None
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """Encode an RGB uint8 array of shape (height, width, 3) as PNG"""
+    height, width, _ = pixels.shape
+    # Every scanline starts with its filter type, 0 (none)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * 3)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)     # 8-bit RGB
+    return (PNG_SIGNATURE + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+def render_png(ts: np.ndarray, low: np.ndarray, high: np.ndarray, close: np.ndarray,
+               levels: Dict[str, float], width: int = 800, height: int = 400) -> bytes:
+    """Draw closing prices over their low-high band, with a dashed line per target level"""
+    margin = 12
+    canvas = np.empty((height, width, 3), dtype=np.uint8)
+    canvas[:] = BACKGROUND
+
+    # Targets are always in view, so the chart shows how far away they are
+    values = [float(low.min()), float(high.max()), *levels.values()]
+    bottom, top = min(values), max(values)
+    pad = (top - bottom) * 0.05 or abs(top) * 0.01 or 1.0
+    bottom, top = bottom - pad, top + pad
+
+    def to_row(prices):
+        return margin + (top - prices) / (top - bottom) * (height - 2 * margin - 1)
+
+    span = max(int(ts[-1] - ts[0]), 1)
+    xs = margin + (ts - ts[0]) / span * (width - 2 * margin - 1)
+    first, last = int(round(xs[0])), int(round(xs[-1]))
+    columns = np.arange(first, last + 1)
+    rows = np.arange(height)[:, None]
+    plot = canvas[:, first:last + 1]    # A view, so masked writes land on the canvas
+
+    band_top = np.interp(columns, xs, to_row(high))
+    band_bottom = np.interp(columns, xs, to_row(low))
+    plot[(rows >= np.floor(band_top)) & (rows <= np.ceil(band_bottom))] = BAND
+
+    dashes = (np.arange(width) // 10) % 2 == 0
+    dashes[:margin] = dashes[width - margin:] = False
+    for name, level in levels.items():
+        row = int(round(to_row(level)))
+        canvas[max(row - 1, 0):row + 1, dashes] = LEVEL_STYLES.get(name, ((128, 128, 128), ''))[0]
+
+    # Join neighbouring columns vertically, so steep moves leave no gaps
+    line = np.interp(columns, xs, to_row(close))
+    previous = np.concatenate([line[:1], line[:-1]])
+    line_top = np.floor(np.minimum(previous, line)) - 1
+    line_bottom = np.ceil(np.maximum(previous, line)) + 1
+    plot[(rows >= line_top) & (rows <= line_bottom)] = LINE
+
+    # Dot on the latest price
+    y, x = np.ogrid[:height, :width]
+    canvas[(y - to_row(close[-1])) ** 2 + (x - xs[-1]) ** 2 <= 20] = LINE
+    return encode_png(canvas)
+
+
+class Chart:
+    """A rendered chart and, once uploaded, Telegram's file_id for it"""
+    __slots__ = ('png', 'caption', 'file_id')
+
+    def __init__(self, png: bytes, caption: str, file_id: Optional[str] = None):
+        self.png = png
+        self.caption = caption
+        self.file_id = file_id
+
+
+class ChartCache:
+    """LRU of rendered charts, capped by total PNG bytes and number of charts"""
+
+    def __init__(self, max_bytes: int, max_entries: int = 4096):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._charts: 'OrderedDict[Hashable, Chart]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._charts)
+
+    def get(self, key: Hashable) -> Optional[Chart]:
+        chart = self._charts.get(key)
+        if chart is None:
+            self.misses += 1
+            return None
+        self._charts.move_to_end(key)
+        self.hits += 1
+        return chart
+
+    def put(self, key: Hashable, chart: Chart):
+        previous = self._charts.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous.png)
+        self._charts[key] = chart
+        self.bytes += len(chart.png)
+        while len(self._charts) > 1 and (self.bytes > self.max_bytes or len(self._charts) > self.max_entries):
+            _, evicted = self._charts.popitem(last=False)
+            self.bytes -= len(evicted.png)
+            self.evictions += 1
+
+    def set_file_id(self, key: Hashable, file_id: Optional[str]):
+        """Remember the file_id Telegram gave an uploaded chart, None forgets it"""
+        chart = self._charts.get(key)
+        if chart is not None:
+            # Charts are replaced, not changed, as handlers may still hold the old one
+            self._charts[key] = Chart(chart.png, chart.caption, file_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class ChartService:
+    """Builds charts from price history, rendering in a process pool behind the cache"""
+
+    def __init__(self, history: PriceHistory, workers: int = 2, cache_bytes: int = 32 * 2 ** 20,
+                 width: int = 800, height: int = 400):
+        self.history = history
+        self.workers = max(1, workers)
+        self.width = width
+        self.height = height
+        self.cache = ChartCache(cache_bytes)
+        self.renders = 0
+        self.uploads = 0
+
+        # Started with the first render, not at boot
+        self._pool: Optional['Executor'] = None
+        # Renders in progress, so identical requests share one
+        self._rendering: Dict[Hashable, asyncio.Future] = {}
+
+    async def chart(self, coin: str, range_name: str, levels: Dict[str, float], currency: str = 'usd',
+                    scale: float = 1.0, label: Optional[str] = None) -> Optional[Tuple[Hashable, Chart]]:
+        """Return (cache key, chart) of a coin over range_name, None if it has no history yet
+
+        History is in USD; scale converts it to currency, the currency of levels.
+        """
+        seconds, resolution = CHART_RANGES[range_name]
+        records = self.history.range(coin, time.time() - seconds, resolution=resolution, include_open=True)
+        if not len(records):
+            return None
+
+        # A new key whenever a bucket opens, so a chart is redrawn at most once per bucket
+        key = (coin, range_name, int(records['ts'][-1]), tuple(sorted(levels.items())), currency, scale)
+        chart = self.cache.get(key)
+        if chart is not None:
+            return key, chart
+
+        future = self._rendering.get(key)
+        if future is None:
+            future = self._rendering[key] = asyncio.ensure_future(
+                self._render(key, records, levels, currency, scale, label or coin.upper(), range_name)
+            )
+            future.add_done_callback(lambda _: self._rendering.pop(key, None))
+        return key, await asyncio.shield(future)
+
+    def uploaded(self, key: Hashable, file_id: Optional[str]):
+        """Record the file_id of a chart sent as a new upload"""
+        self.uploads += 1
+        self.cache.set_file_id(key, file_id)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self) -> 'Executor':
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+            if multiprocessing.current_process().daemon:
+                # Daemonic processes, such as the webhook workers, may not start children;
+                # numpy and zlib release the GIL for most of a render, so threads still help
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='chart')
+            else:
+                # spawn rather than fork: this process runs threads a forked child would inherit mid-flight
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    async def _render(self, key: Hashable, records: np.ndarray, levels: Dict[str, float], currency: str,
+                      scale: float, label: str, range_name: str) -> Chart:
+        low, high, close = records['low'] * scale, records['high'] * scale, records['close'] * scale
+        started = time.perf_counter()
+        png = await asyncio.get_running_loop().run_in_executor(
+            self._executor(), render_png, records['ts'], low, high, close, levels, self.width, self.height
+        )
+        RENDER_SECONDS.observe(time.perf_counter() - started, message='chart')
+        self.renders += 1
+
+        chart = Chart(png, chart_caption(label, range_name, records['open'][0] * scale, low, high, close,
+                                         levels, currency))
+        self.cache.put(key, chart)
+        return chart
+
+
+def chart_caption(label: str, range_name: str, first: float, low: np.ndarray, high: np.ndarray,
+                  close: np.ndarray, levels: Dict[str, float], currency: str) -> str:
+    """Caption with the latest price, its change over the range and the target lines' legend"""
+    last = float(close[-1])
+    lines = [
+        f"📈 <b>{html.escape(label)}</b> - {range_name}",
+        f"Last: <b>{format_money(last, currency)}</b> ({(last / first - 1) * 100:+.2f}%)",
+        f"High: {format_money(float(high.max()), currency)} | Low: {format_money(float(low.min()), currency)}",
+    ]
+    for name, level in levels.items():
+        marker = LEVEL_STYLES.get(name, (None, '▫️'))[1]
+        away = (level / last - 1) * 100
+        lines.append(f"{marker} {name.title()}: {format_money(level, currency)} ({away:+.1f}% away)")
+    return '\n'.join(lines)
@@ -0,0 +1,232 @@
+"""
+Coin and alert rule configuration
+Loads coins, price targets and alert rules from a TOML file into immutable
+objects with precomputed lookup tables, and polls the file so edits are applied
+while the bot runs.
+"""
+
+import os
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Mapping, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+from alert_rules import AlertRule, parse_rule
+from config import DEFAULT_TARGETS_FILE
+
+logger = logging.getLogger(__name__)
+
+COIN_FIELDS = ('symbol', 'coingecko_id', 'realistic_price', 'optimistic_price', 'binance_symbol', 'currency')
+
+
+class CoinTargets:
+    __slots__ = ('name', 'symbol', 'coingecko_id', 'realistic_price', 'optimistic_price', 'binance_symbol',
+                 'currency')
+
+    def __init__(self, name: str, symbol: str, coingecko_id: str, realistic_price: float,
+                 optimistic_price: float, binance_symbol: Optional[str] = None, currency: str = 'usd'):
+        set_field = object.__setattr__
+        set_field(self, 'name', name)
+        set_field(self, 'symbol', symbol)
+        set_field(self, 'coingecko_id', coingecko_id)
+        set_field(self, 'realistic_price', realistic_price)
+        set_field(self, 'optimistic_price', optimistic_price)
+        set_field(self, 'binance_symbol', binance_symbol or f"{symbol}USDT")
+        set_field(self, 'currency', currency)   # Quote currency of the targets and alert rule prices
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key: str):
+        # Lets code written for the old per-coin config dicts keep using config['symbol']
+        if key == 'name' or key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def _fields(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CoinTargets) and self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    def __repr__(self) -> str:
+        return f"CoinTargets({', '.join(f'{field}={value!r}' for field, value in zip(self.__slots__, self._fields()))})"
+
+
+class MonitorConfig:
+    __slots__ = ('coins', 'rules', 'by_symbol', 'by_coingecko_id', 'path', 'stamp')
+
+    def __init__(self, coins: Iterable[CoinTargets], rules: Iterable[AlertRule] = (),
+                 path: Optional[str] = None, stamp: Optional[tuple] = None):
+        coins = {coin.name: coin for coin in coins}
+        set_field = object.__setattr__
+        set_field(self, 'coins', MappingProxyType(coins))
+        set_field(self, 'rules', tuple(rules))
+        set_field(self, 'by_symbol', MappingProxyType({coin.symbol.lower(): coin.name for coin in coins.values()}))
+        set_field(self, 'by_coingecko_id', MappingProxyType({coin.coingecko_id: coin.name for coin in coins.values()}))
+        set_field(self, 'path', path)
+        set_field(self, 'stamp', stamp)     # File identity and mtime the config was read at
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the coin name for a coin name, symbol or CoinGecko ID, None if it isn't configured"""
+        key = name.strip().lower()
+        if key in self.coins:
+            return key
+        return self.by_symbol.get(key) or self.by_coingecko_id.get(key)
+
+    def coingecko_id(self, coin_name: str) -> str:
+        """CoinGecko ID of a configured coin; other keys are already CoinGecko IDs"""
+        coin = self.coins.get(coin_name)
+        return coin.coingecko_id if coin is not None else coin_name
+
+
+def targets_path() -> str:
+    """TARGETS_FILE, or targets.toml next to this module"""
+    return os.getenv('TARGETS_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_TARGETS_FILE)
+
+
+def _positive(coin_name: str, spec: Dict, field: str) -> float:
+    value = spec.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"Coin {coin_name!r}: {field} must be a positive number, got {value!r}")
+    return float(value)
+
+
+def parse_config(data: Mapping, path: Optional[str] = None, stamp: Optional[tuple] = None) -> MonitorConfig:
+    """Validate parsed TOML and build a MonitorConfig, raises ValueError on the first problem"""
+    coin_specs = data.get('coins')
+    if not isinstance(coin_specs, dict) or not coin_specs:
+        raise ValueError("No coins configured, add at least one [coins.<name>] table")
+
+    coins = []
+    for coin_name, spec in coin_specs.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"Coin {coin_name!r} must be a table")
+        unknown = set(spec) - set(COIN_FIELDS)
+        if unknown:
+            raise ValueError(f"Coin {coin_name!r} has unknown fields: {', '.join(sorted(unknown))}")
+        symbol, coingecko_id = spec.get('symbol'), spec.get('coingecko_id')
+        if not symbol or not coingecko_id:
+            raise ValueError(f"Coin {coin_name!r} needs a symbol and a coingecko_id")
+        currency = str(spec.get('currency', 'usd')).lower()
+        if not currency.isalpha():
+            raise ValueError(f"Coin {coin_name!r}: currency must be a code like usd, eur or btc, got {currency!r}")
+        coins.append(CoinTargets(
+            coin_name.lower(), str(symbol), str(coingecko_id),
+            _positive(coin_name, spec, 'realistic_price'), _positive(coin_name, spec, 'optimistic_price'),
+            spec.get('binance_symbol'), currency
+        ))
+
+    if (len({coin.symbol.lower() for coin in coins}) != len(coins)
+            or len({coin.coingecko_id for coin in coins}) != len(coins)):
+        raise ValueError("Each coin needs its own symbol and coingecko_id")
+
+    rule_specs = data.get('rules', [])
+    if not isinstance(rule_specs, list) or not all(isinstance(spec, dict) for spec in rule_specs):
+        raise ValueError("Alert rules must be [[rules]] tables")
+    # Rules may name a coin by symbol or CoinGecko ID, e.g. coin = "BTC"; they are keyed by coin name
+    lookup = MonitorConfig(coins)
+    rules, unknown_coins = [], set()
+    for spec in rule_specs:
+        rule = parse_rule(spec)
+        coin_name = lookup.resolve(rule.coin)
+        if coin_name is None:
+            unknown_coins.add(rule.coin)
+        rules.append(rule._replace(coin=coin_name))
+    if unknown_coins:
+        raise ValueError(f"Alert rules for coins that are not configured: {', '.join(sorted(unknown_coins))}")
+    return MonitorConfig(coins, rules, path, stamp)
+
+
+def _stamp(stat: os.stat_result) -> tuple:
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def load_config(path: Optional[str] = None) -> MonitorConfig:
+    """Read and validate the targets file"""
+    path = path or targets_path()
+    with open(path, 'rb') as f:
+        stamp = _stamp(os.fstat(f.fileno()))
+        try:
+            data = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+    return parse_config(data, path, stamp)
+
+
+class ConfigWatcher:
+    """Polls the targets file's mtime and hands each valid new version to a callback"""
+
+    def __init__(self, config: MonitorConfig, on_change: Callable[[MonitorConfig], None],
+                 interval: float = 5.0):
+        self.config = config
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self.errors = 0
+        self._failed_stamp: Optional[tuple] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def check(self) -> bool:
+        """Reload if the file changed, returns True when a new config was applied"""
+        try:
+            stamp = _stamp(os.stat(self.config.path))
+        except OSError:
+            stamp = ()  # Missing, e.g. between an editor's delete and rename
+        if stamp in (self.config.stamp, self._failed_stamp):
+            return False
+
+        try:
+            config = load_config(self.config.path)
+        except (OSError, ValueError) as e:
+            # Keep running on the last good config until the file changes again
+            self._failed_stamp = stamp
+            self.errors += 1
+            logger.error(f"Not reloading {self.config.path}: {e}")
+            return False
+
+        self.config = config
+        self.reloads += 1
+        self.on_change(config)
+        logger.info(f"Reloaded {config.path}: {len(config.coins)} coins, {len(config.rules)} alert rules")
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                # A failed reload or callback must not stop watching for the next edit
+                self.errors += 1
+                logger.exception(f"Error reloading {self.config.path}")
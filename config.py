@@ -2,42 +2,94 @@
 Configuration for cryptocurrency price monitoring bot
 """
 
-# Cryptocurrency configuration with realistic and optimistic price thresholds
-CRYPTO_CONFIG = {
-    "bitcoin": {
-        "symbol": "BTC",
-        "realistic_price": 120000,  # USD
-        "optimistic_price": 122000,  # USD
-        "coingecko_id": "bitcoin"
-    },
-    "ethereum": {
-        "symbol": "ETH", 
-        "realistic_price": 4700,   # USD
-        "optimistic_price": 4800,  # USD
-        "coingecko_id": "ethereum"
-    },
-    "ripple": {
-        "symbol": "XPR",
-        "realistic_price": 3.0,    # USD
-        "optimistic_price": 3.03,   # USD
-        "coingecko_id": "ripple"
-    },
-    "solana": {
-        "symbol": "SOL",
-        "realistic_price": 215,    # USD
-        "optimistic_price": 216,   # USD
-        "coingecko_id": "solana"
-    },
-    "litecoin": {
-        "symbol": "LTC",
-        "realistic_price": 115,     # USD
-        "optimistic_price": 117,    # USD
-        "coingecko_id": "litecoin"
-    }
-}
+# Coins, price targets and alert rules are read from this TOML file (next to
+# this module unless TARGETS_FILE is set) and reloaded when it changes
+DEFAULT_TARGETS_FILE = "targets.toml"
+
+# Seconds between checks of the targets file for changes, 0 disables reloading
+DEFAULT_CONFIG_RELOAD_INTERVAL = 5
 
 # API Configuration
 COINGECKO_API_URL = "https://api.coingecko.com/api/v3/simple/price"
+BINANCE_API_URL = "https://api.binance.com/api/v3/ticker/price"
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+FX_RATES_URL = "https://api.coingecko.com/api/v3/exchange_rates"
+
+# Seconds between refreshes of the exchange rate table used for coins whose
+# targets are not in USD (prices are always fetched in USD)
+DEFAULT_FX_REFRESH_INTERVAL = 600
+
+# Price sources in order of preference; the next one is asked when the current
+# one fails or is slower than its usual (p95) latency. Also available: replay
+# (reads PRICE_REPLAY_FILE, for offline testing)
+DEFAULT_PRICE_PROVIDERS = "coingecko,binance"
 
 # Default check interval in minutes
 DEFAULT_CHECK_INTERVAL = 5
+
+# Max random delay in seconds added to each check, spreads load when many bots
+# poll on the same schedule
+DEFAULT_CHECK_JITTER = 0
+
+# Shared price cache: seconds a snapshot is fresh, plus extra seconds it may be
+# served stale while a background refresh runs
+DEFAULT_PRICE_CACHE_TTL = 60
+DEFAULT_PRICE_CACHE_STALE_TTL = 240
+
+# Price requests: per-request timeout in seconds and max requests in flight
+DEFAULT_FETCH_TIMEOUT = 10
+DEFAULT_FETCH_CONCURRENCY = 4
+
+# Large coin lists are fetched in batches of at most this many coins and URL
+# characters of IDs, so no request hits URL or response size limits
+DEFAULT_FETCH_BATCH_SIZE = 250
+DEFAULT_FETCH_BATCH_CHARS = 4000
+
+# SQLite database for per-chat subscriptions
+DEFAULT_DB_PATH = "crypto_monitor.db"
+
+# Outbound notifications: max messages per second across all chats, and seconds
+# to wait for more alerts to the same chat before sending them as one message
+DEFAULT_TELEGRAM_GLOBAL_RATE = 25
+DEFAULT_COALESCE_WINDOW = 0.5
+
+# Price history: directory for the per-coin series files, and days of raw and
+# 1-minute data to keep (0 keeps everything; hourly and daily rollups are kept)
+DEFAULT_HISTORY_DIR = "price_history"
+DEFAULT_HISTORY_RETENTION_DAYS = 30
+
+# Checkpoint of alert flags and last prices, restored on startup
+DEFAULT_STATE_FILE = "monitor_state.json"
+
+# Streaming mode: take ticks from an exchange WebSocket feed in addition to polling.
+# Alerts are evaluated at most once per debounce window, using the highest price
+# seen in that window
+DEFAULT_STREAM_ENABLED = False
+DEFAULT_STREAM_CHANNEL = "miniTicker"
+DEFAULT_STREAM_DEBOUNCE = 0.25
+
+# Local metrics endpoint (Prometheus text format at /metrics, 0 disables it) and
+# cProfile sampling of every Nth monitor tick (0 = off, can be changed at runtime
+# with POST /profile?every=N)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+DEFAULT_PROFILE_EVERY = 0
+
+# Live status messages (/live) are edited at most this often, and only when
+# a price shown in them changed
+DEFAULT_LIVE_STATUS_INTERVAL = 5
+
+# /chart: processes drawing charts (per bot process), and megabytes of rendered
+# charts kept for repeated requests
+DEFAULT_CHART_WORKERS = 2
+DEFAULT_CHART_CACHE_MB = 32
+
+# Webhook mode (webhook_server.py): Telegram posts updates to this server, which
+# hands them to worker processes. Set WEBHOOK_URL to the public HTTPS address
+# that reaches it (e.g. through a reverse proxy)
+DEFAULT_WEBHOOK_HOST = "127.0.0.1"
+DEFAULT_WEBHOOK_PORT = 8080
+DEFAULT_WEBHOOK_PATH = "/telegram"
+DEFAULT_WEBHOOK_WORKERS = 4
+# Updates waiting per worker before the server answers 503 and Telegram retries
+DEFAULT_WEBHOOK_QUEUE_SIZE = 10000
@@ -4,16 +4,50 @@ Monitors crypto prices and sends Telegram notifications when thresholds are reac
 """
 
 import os
+import html
 import time
+import asyncio
 import logging
-import requests
+import httpx
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 from dotenv import load_dotenv
 from telegram import Bot
 from telegram.error import TelegramError
 
-from config import CRYPTO_CONFIG, COINGECKO_API_URL, DEFAULT_CHECK_INTERVAL
+from alert_rules import RuleEngine, RuleEvent
+from chart_renderer import Chart, ChartService
+from coin_config import ConfigWatcher, MonitorConfig, load_config
+from config import (
+    COINGECKO_API_URL, BINANCE_API_URL, BINANCE_STREAM_URL, FX_RATES_URL, DEFAULT_CHECK_INTERVAL,
+    DEFAULT_PRICE_CACHE_TTL, DEFAULT_PRICE_CACHE_STALE_TTL,
+    DEFAULT_FETCH_TIMEOUT, DEFAULT_FETCH_CONCURRENCY, DEFAULT_FETCH_BATCH_SIZE, DEFAULT_FETCH_BATCH_CHARS,
+    DEFAULT_CHECK_JITTER,
+    DEFAULT_DB_PATH, DEFAULT_TELEGRAM_GLOBAL_RATE, DEFAULT_COALESCE_WINDOW,
+    DEFAULT_HISTORY_DIR, DEFAULT_HISTORY_RETENTION_DAYS, DEFAULT_STATE_FILE,
+    DEFAULT_PRICE_PROVIDERS, DEFAULT_STREAM_ENABLED, DEFAULT_STREAM_CHANNEL, DEFAULT_STREAM_DEBOUNCE,
+    DEFAULT_METRICS_HOST, DEFAULT_METRICS_PORT, DEFAULT_PROFILE_EVERY, DEFAULT_LIVE_STATUS_INTERVAL,
+    DEFAULT_CONFIG_RELOAD_INTERVAL, DEFAULT_FX_REFRESH_INTERVAL, DEFAULT_CHART_WORKERS, DEFAULT_CHART_CACHE_MB
+)
+from fx_rates import FxRates, QuoteConverter, format_money
+from live_status import LiveStatusBoard
+from metrics import (
+    REGISTRY, ALERTS, EVALUATE_SECONDS, FETCH_ERRORS, FETCH_SECONDS, SEND_SECONDS,
+    MetricsServer, Sample, TickProfiler
+)
+from monitor_scheduler import MonitorScheduler
+from notification_dispatcher import NotificationDispatcher
+from price_cache import PriceCache, PriceSnapshot
+from price_fetcher import PriceFetcher
+from price_history import PriceHistory
+from price_providers import (
+    PriceProvider, CoinGeckoProvider, BinanceProvider, ReplayProvider, HedgedPriceProvider
+)
+from price_stream import PriceStream
+from state_store import StateStore
+from status_renderer import StatusRenderer
+from subscriptions import SubscriptionStore
+from threshold_engine import ThresholdEngine
 
 # Load environment variables
 load_dotenv()
@@ -25,198 +59,753 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds a metrics scrape waits for the event loop to report component stats
+METRICS_COLLECT_TIMEOUT = 5.0
+
+ALERT_TITLES = {
+    'realistic': "🎯 <b>Realistic Target Reached!</b>",
+    'optimistic': "🚀 <b>Optimistic Target Reached!</b>",
+}
+
+RULE_TITLES = {
+    'above': "🎯 <b>Price Above Target</b>",
+    'below': "📉 <b>Price Below Target</b>",
+    'change': "⚡ <b>Big Price Move</b>",
+    'sma': "〰️ <b>Moving Average Cross</b>",
+    'ema': "〰️ <b>Moving Average Cross</b>",
+    'bollinger': "📊 <b>Bollinger Band Breakout</b>",
+}
+
 
 class CryptoPriceMonitor:
-    def __init__(self):
+    def __init__(self, read_only: bool = False):
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
-        self.check_interval = int(os.getenv('CHECK_INTERVAL_MINUTES', DEFAULT_CHECK_INTERVAL))
+        # Fractions of a minute are allowed, e.g. 0.05 for a 3 second loop in benchmarks
+        self.check_interval = float(os.getenv('CHECK_INTERVAL_MINUTES', DEFAULT_CHECK_INTERVAL))
         
         if not self.bot_token or not self.chat_id:
             raise ValueError("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID must be set in .env file")
         
-        self.bot = Bot(token=self.bot_token)
-        self.notified_thresholds = {}  # Track which thresholds have been notified
+        # Built on first use: under main.py the application's bot is used instead, see start_notifications
+        self._bot: Optional[Bot] = None
+        # Coins, targets and alert rules from the targets file, swapped as a whole on reload
+        self.config: MonitorConfig = load_config()
+        self.config_watcher: Optional[ConfigWatcher] = None
+        # Targets and which of them have been notified, evaluated in one batched pass
+        self.thresholds = ThresholdEngine.from_config(self.config.coins)
+        # Drop-below, percent move and indicator rules, with rolling state per coin
+        self.rules = RuleEngine.from_rules(self.config.rules)
+        # Targets registered by individual chats
+        self.subscriptions = SubscriptionStore(os.getenv('SUBSCRIPTIONS_DB', DEFAULT_DB_PATH))
+        # Processes serving commands for a leader (webhook workers) only read the history
+        self.read_only = read_only
+        # Every fetched snapshot is kept on disk for trends and charts
+        retention_days = float(os.getenv('PRICE_HISTORY_RETENTION_DAYS', DEFAULT_HISTORY_RETENTION_DAYS))
+        self.history = PriceHistory(
+            os.getenv('PRICE_HISTORY_DIR', DEFAULT_HISTORY_DIR),
+            retention_days=None if read_only else retention_days or None
+        )
+        # /chart images, drawn from the history in worker processes and cached
+        self.charts = ChartService(
+            self.history,
+            workers=int(os.getenv('CHART_WORKERS', DEFAULT_CHART_WORKERS)),
+            cache_bytes=int(float(os.getenv('CHART_CACHE_MB', DEFAULT_CHART_CACHE_MB)) * 2 ** 20)
+        )
+        # Alert flags and last prices survive restarts through this checkpoint
+        self.state_store = StateStore(os.getenv('STATE_FILE', DEFAULT_STATE_FILE))
+        # Outbound queue, set up by start_notifications once the event loop is running
+        self.dispatcher: Optional[NotificationDispatcher] = None
+        # Status message shared by /status and status updates
+        self.status_renderer = StatusRenderer(self.config.coins)
+        # Exchange rates for coins with targets in another currency than USD
+        self.fx = FxRates(
+            os.getenv('FX_RATES_URL', FX_RATES_URL),
+            refresh_interval=float(os.getenv('FX_REFRESH_SECONDS', DEFAULT_FX_REFRESH_INTERVAL))
+        )
+        self.quotes = QuoteConverter(self.fx, self._currencies())
+        # Pinned status messages edited in place as prices change
+        self.live_status = LiveStatusBoard(
+            self.subscriptions,
+            min_interval=float(os.getenv('LIVE_STATUS_INTERVAL_SECONDS', DEFAULT_LIVE_STATUS_INTERVAL))
+        )
+        # (snapshot version, exchange rates, renderer) the live status was last rendered for
+        self._live_rendered: tuple = ()
+        # cProfile sampling of monitor ticks, adjustable through the metrics endpoint
+        self.profiler = TickProfiler(int(os.getenv('PROFILE_EVERY_N_TICKS', DEFAULT_PROFILE_EVERY)))
+        self.metrics_server: Optional[MetricsServer] = None
+        self._metrics_collector: Optional[Callable[[], List[Sample]]] = None
+        
+        # Price each coin's targets were last checked at; coins that did not move are skipped
+        self._checked_prices: Dict[str, float] = {}
+        self._checked_against: tuple = ()
+        self.coins_checked = 0
+        self.coins_skipped = 0
+        
+        # Pooled HTTP client for price requests
+        self.fetcher = PriceFetcher(
+            timeout=float(os.getenv('FETCH_TIMEOUT_SECONDS', DEFAULT_FETCH_TIMEOUT)),
+            max_concurrency=int(os.getenv('FETCH_MAX_CONCURRENCY', DEFAULT_FETCH_CONCURRENCY))
+        )
+        # Price sources, tried in order with hedging and failover
+        self.provider = self._create_provider(os.getenv('PRICE_PROVIDERS', DEFAULT_PRICE_PROVIDERS))
+        
+        # Shared snapshot cache used by both the monitor loop and bot commands
+        self.price_cache = PriceCache(
+            self.fetch_crypto_prices,
+            async_loader=self.fetch_crypto_prices_async,
+            ttl=float(os.getenv('PRICE_CACHE_TTL_SECONDS', DEFAULT_PRICE_CACHE_TTL)),
+            stale_ttl=float(os.getenv('PRICE_CACHE_STALE_SECONDS', DEFAULT_PRICE_CACHE_STALE_TTL))
+        )
         
         logger.info("Crypto Price Monitor initialized")
     
+    @property
+    def bot(self) -> Bot:
+        """Bot used for notifications; creating one loads TLS certificates, so it is deferred"""
+        if self._bot is None:
+            self._bot = Bot(token=self.bot_token,
+                            base_url=os.getenv('TELEGRAM_BASE_URL', 'https://api.telegram.org/bot'))
+        return self._bot
+    
     def get_crypto_prices(self) -> Optional[Dict[str, float]]:
-        """Fetch current cryptocurrency prices from CoinGecko API"""
+        """Return current cryptocurrency prices from the shared cache (blocking, not for the event loop)"""
+        return self.price_cache.get()
+    
+    async def get_crypto_prices_async(self) -> Optional[Dict[str, float]]:
+        """Return current cryptocurrency prices from the shared cache without blocking the event loop"""
+        return await self.price_cache.aget()
+    
+    def fetch_crypto_prices(self) -> Optional[Dict[str, float]]:
+        """Fetch current cryptocurrency prices from the price providers (blocking)"""
         try:
-            # Get all coin IDs we're monitoring
-            coin_ids = [config['coingecko_id'] for config in CRYPTO_CONFIG.values()]
-            coin_ids_str = ','.join(coin_ids)
-            
-            params = {
-                'ids': coin_ids_str,
-                'vs_currencies': 'usd'
-            }
-            
-            response = requests.get(COINGECKO_API_URL, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Convert to our format: {coin_name: price}
-            prices = {}
-            for coin_name, config in CRYPTO_CONFIG.items():
-                coingecko_id = config['coingecko_id']
-                if coingecko_id in data and 'usd' in data[coingecko_id]:
-                    prices[coin_name] = data[coingecko_id]['usd']
-            
-            return prices
-            
-        except requests.RequestException as e:
+            coin_ids = self.coin_ids()
+            data = self.fetcher.run_sync(lambda http: self.provider.fetch(http, coin_ids))
+            return self._record(self._prices_from_response(data))
+        except (httpx.HTTPError, RuntimeError) as e:
+            FETCH_ERRORS.inc(provider=self.provider.name)
             logger.error(f"Error fetching prices: {e}")
             return None
         except Exception as e:
-            logger.error(f"Unexpected error in get_crypto_prices: {e}")
+            FETCH_ERRORS.inc(provider=self.provider.name)
+            logger.error(f"Unexpected error in fetch_crypto_prices: {e}")
             return None
     
-    def send_notification(self, message: str):
-        """Send notification message via Telegram"""
+    async def fetch_crypto_prices_async(self) -> Optional[Dict[str, float]]:
+        """Fetch current cryptocurrency prices from the price providers"""
+        try:
+            with FETCH_SECONDS.time(provider=self.provider.name):
+                data = await self.provider.fetch(self.fetcher, self.coin_ids())
+            return self._record(self._prices_from_response(data))
+        except (httpx.HTTPError, RuntimeError) as e:
+            FETCH_ERRORS.inc(provider=self.provider.name)
+            logger.error(f"Error fetching prices: {e}")
+            return None
+        except Exception as e:
+            FETCH_ERRORS.inc(provider=self.provider.name)
+            logger.error(f"Unexpected error in fetch_crypto_prices_async: {e}")
+            return None
+    
+    def _create_provider(self, names: str) -> PriceProvider:
+        """Build the provider chain from a comma-separated list of provider names"""
+        providers = []
+        batching = {
+            'batch_size': int(os.getenv('FETCH_BATCH_SIZE', DEFAULT_FETCH_BATCH_SIZE)),
+            'batch_chars': int(os.getenv('FETCH_BATCH_CHARS', DEFAULT_FETCH_BATCH_CHARS)),
+        }
+        for name in (n.strip() for n in names.split(',')):
+            if name == 'coingecko':
+                providers.append(CoinGeckoProvider(os.getenv('COINGECKO_API_URL', COINGECKO_API_URL), **batching))
+            elif name == 'binance':
+                providers.append(BinanceProvider(os.getenv('BINANCE_API_URL', BINANCE_API_URL), self._binance_symbols(),
+                                                 **batching))
+            elif name == 'replay':
+                providers.append(ReplayProvider(os.getenv('PRICE_REPLAY_FILE', 'prices.jsonl')))
+            elif name:
+                raise ValueError(f"Unknown price provider: {name}")
+        
+        if not providers:
+            raise ValueError("PRICE_PROVIDERS must name at least one provider")
+        return HedgedPriceProvider(providers)
+    
+    def _binance_pairs(self) -> Dict[str, str]:
+        """Binance USDT pair for each configured coin: {coin_name: 'BTCUSDT'}"""
+        return {coin_name: coin.binance_symbol for coin_name, coin in self.config.coins.items()}
+    
+    def _binance_symbols(self) -> Dict[str, str]:
+        """Binance pair for each configured coin by CoinGecko ID"""
+        return {coin.coingecko_id: coin.binance_symbol for coin in self.config.coins.values()}
+    
+    def coin_ids(self) -> List[str]:
+        """Get all CoinGecko IDs we're monitoring, including coins chats subscribed to"""
+        coin_ids = list(self.config.by_coingecko_id)
+        return coin_ids + sorted(self.subscriptions.coins() - set(coin_ids))
+    
+    def _prices_from_response(self, data: Dict[str, float]) -> Dict[str, float]:
+        """Convert {coingecko_id: price} to our format: {coin_name: price}
+        
+        Subscribed coins that are not configured are keyed by their CoinGecko ID.
+        """
+        prices = {}
+        for coingecko_id, coin_name in self.config.by_coingecko_id.items():
+            if coingecko_id in data:
+                prices[coin_name] = data[coingecko_id]
+        
+        for coingecko_id in self.subscriptions.coins():
+            if coingecko_id not in prices and coingecko_id in data:
+                prices[coingecko_id] = data[coingecko_id]
+        
+        return prices
+    
+    def _record(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """Append prices that differ from the current snapshot to the price history"""
+        previous = self.price_cache.peek() or {}
+        moved = {coin_name: price for coin_name, price in prices.items() if previous.get(coin_name) != price}
+        if moved and not self.read_only:
+            try:
+                self.history.append(moved)
+            except OSError as e:
+                logger.error(f"Error writing price history: {e}")
+        return prices
+    
+    def _currencies(self, config: Optional[MonitorConfig] = None) -> Dict[str, str]:
+        """Quote currency of each configured coin"""
+        return {coin_name: coin.currency for coin_name, coin in (config or self.config).coins.items()}
+    
+    async def quote(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """Convert a USD snapshot to each coin's quote currency, refreshing exchange rates when due"""
+        await self.fx.ensure_fresh(self.fetcher, self.quotes.currencies.values())
+        return self.quotes.convert(prices)
+    
+    def _prices_by_coingecko_id(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """Re-key a snapshot from coin names to CoinGecko IDs"""
+        coingecko_id = self.config.coingecko_id
+        return {coingecko_id(coin_name): price for coin_name, price in prices.items()}
+    
+    async def fetch_coin_price(self, coingecko_id: str) -> Optional[float]:
+        """Fetch the price of a single coin, returns None if no provider knows it"""
         try:
-            self.bot.send_message(chat_id=self.chat_id, text=message, parse_mode='HTML')
+            data = await self.provider.fetch(self.fetcher, [coingecko_id])
+        except (httpx.HTTPError, RuntimeError) as e:
+            logger.error(f"Error fetching price for {coingecko_id}: {e}")
+            return None
+        return data.get(coingecko_id)
+    
+    async def get_chart(self, name: str, range_name: str,
+                        chat_id: Optional[int] = None) -> Optional[Tuple[Hashable, Chart]]:
+        """Chart of a configured coin with its targets, or of a CoinGecko ID with the chat's own targets
+
+        Returns (cache key, chart), or None if the coin has no price history yet.
+        """
+        coin_name = self.config.resolve(name)
+        if coin_name is not None:
+            coin = self.config.coins[coin_name]
+            label, currency = coin.symbol, coin.currency
+            levels = {'realistic': coin.realistic_price, 'optimistic': coin.optimistic_price}
+        else:
+            coin_name = name.strip().lower()
+            label, currency = coin_name, 'usd'
+            levels = self.subscriptions.targets_for_chat(chat_id).get(coin_name, {}) if chat_id is not None else {}
+        
+        scale = 1.0
+        if currency != 'usd':
+            await self.fx.ensure_fresh(self.fetcher, [currency])
+            scale = self.fx.rate(currency)
+            if scale != scale:
+                # No exchange rate yet: chart in USD, without the targets in the other currency
+                currency, scale, levels = 'usd', 1.0, {}
+        return await self.charts.chart(coin_name, range_name, levels, currency=currency, scale=scale, label=label)
+    
+    def start_notifications(self, bot: Optional[Bot] = None):
+        """Route notifications through a rate-limited dispatcher, optionally using another bot"""
+        if bot is not None:
+            self._bot = bot
+        self.dispatcher = NotificationDispatcher(
+            self.bot,
+            global_rate=float(os.getenv('TELEGRAM_GLOBAL_RATE', DEFAULT_TELEGRAM_GLOBAL_RATE)),
+            coalesce_window=float(os.getenv('NOTIFICATION_COALESCE_SECONDS', DEFAULT_COALESCE_WINDOW))
+        )
+        self.dispatcher.start()
+    
+    def start_config_watcher(self, persist: bool = True) -> Optional[ConfigWatcher]:
+        """Apply edits to the targets file while running (CONFIG_RELOAD_SECONDS, 0 disables)"""
+        interval = float(os.getenv('CONFIG_RELOAD_SECONDS', DEFAULT_CONFIG_RELOAD_INTERVAL))
+        if not interval:
+            return None
+        self.config_watcher = ConfigWatcher(
+            self.config, lambda config: self.apply_config(config, persist=persist), interval=interval
+        )
+        self.config_watcher.start()
+        return self.config_watcher
+    
+    def apply_config(self, config: MonitorConfig, persist: bool = True):
+        """Switch to a new config, keeping alert state of targets and rules that did not change"""
+        thresholds = ThresholdEngine.from_config(config.coins)
+        thresholds.restore_state(self._unchanged_flags(self.notified_thresholds, self._targets(), config))
+        rules = RuleEngine.from_rules(config.rules)
+        currencies = self._currencies(config)
+        requoted = [coin_name for coin_name, currency in currencies.items()
+                    if self.quotes.currencies.get(coin_name, 'usd') != currency]
+        rules.adopt_state(self.rules, reset_coins=requoted)
+        status_renderer = StatusRenderer(config.coins)
+        quotes = QuoteConverter(self.fx, currencies)
+        
+        # No awaits from here on, so handlers never see a half-applied config
+        self.config = config
+        self.thresholds = thresholds
+        self.rules = rules
+        self.status_renderer = status_renderer
+        self.quotes = quotes
+        for provider in getattr(self.provider, 'providers', [self.provider]):
+            if isinstance(provider, BinanceProvider):
+                provider.symbols = self._binance_symbols()
+        if persist:
+            self.save_state()
+    
+    def _targets(self, config: Optional[MonitorConfig] = None) -> Dict[str, Dict[str, float]]:
+        """Target prices as {coin_name: {level: price, 'currency': currency}}"""
+        coins = (config or self.config).coins
+        return {
+            coin_name: {'realistic': coin.realistic_price, 'optimistic': coin.optimistic_price,
+                        'currency': coin.currency}
+            for coin_name, coin in coins.items()
+        }
+    
+    def _unchanged_flags(self, flags: Dict[str, Dict[str, bool]], targets: Dict[str, Dict[str, float]],
+                         config: MonitorConfig) -> Dict[str, Dict[str, bool]]:
+        """Keep only alert flags whose target price and currency are the same in config"""
+        new_targets = self._targets(config)
+        return {
+            coin_name: {
+                level: flag for level, flag in levels.items()
+                if level in targets.get(coin_name, {})
+                and targets[coin_name][level] == new_targets.get(coin_name, {}).get(level)
+                and targets[coin_name].get('currency', 'usd') == new_targets[coin_name]['currency']
+            }
+            for coin_name, levels in flags.items()
+        }
+    
+    async def close(self):
+        """Flush queued notifications, save state and release network resources"""
+        if self.config_watcher is not None:
+            await self.config_watcher.stop()
+            self.config_watcher = None
+        self.save_state()
+        if self.dispatcher is not None:
+            await self.dispatcher.stop()
+            self.dispatcher = None
+        if self._metrics_collector is not None:
+            REGISTRY.remove_collector(self._metrics_collector)
+            self._metrics_collector = None
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        await self.fetcher.aclose()
+        self.charts.close()
+        self.subscriptions.close()
+        self.history.close()
+    
+    async def send_notification(self, message: str, chat_id: Optional[int] = None):
+        """Send notification message via Telegram, to the configured chat by default"""
+        chat_id = chat_id or self.chat_id
+        if self.dispatcher is not None:
+            self.dispatcher.enqueue(chat_id, message)
+            return
+        
+        started = time.perf_counter()
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=message, parse_mode='HTML')
+            SEND_SECONDS.observe(time.perf_counter() - started, result='ok')
             logger.info(f"Notification sent: {message}")
         except TelegramError as e:
+            SEND_SECONDS.observe(time.perf_counter() - started, result='error')
             logger.error(f"Error sending Telegram message: {e}")
         except Exception as e:
+            SEND_SECONDS.observe(time.perf_counter() - started, result='error')
             logger.error(f"Unexpected error in send_notification: {e}")
     
-    def check_price_thresholds(self, prices: Dict[str, float]):
-        """Check if any price thresholds have been reached and send notifications"""
-        for coin_name, current_price in prices.items():
-            if coin_name not in CRYPTO_CONFIG:
+    @property
+    def notified_thresholds(self) -> Dict[str, Dict[str, bool]]:
+        """Track which thresholds have been notified: {coin_name: {level: bool}}"""
+        return self.thresholds.notified_state()
+    
+    async def check_price_thresholds(self, prices: Dict[str, float]) -> bool:
+        """Send notifications for reached thresholds and reset those the price dropped below
+        
+        Returns True if any alert flag changed.
+        """
+        changed = False
+        quoted = await self.quote(prices)
+        with EVALUATE_SECONDS.time(source='config'):
+            events = self.thresholds.evaluate(quoted)
+        for event in events:
+            changed = True
+            ALERTS.inc(source='config', level=event.level, event='fired' if event.fired else 'reset')
+            if not event.fired:
+                logger.info(f"Reset {event.level} threshold for {event.coin}")
                 continue
-                
-            config = CRYPTO_CONFIG[coin_name]
-            symbol = config['symbol']
-            realistic_price = config['realistic_price']
-            optimistic_price = config['optimistic_price']
-            
-            # Initialize tracking for this coin if not exists
-            if coin_name not in self.notified_thresholds:
-                self.notified_thresholds[coin_name] = {
-                    'realistic': False,
-                    'optimistic': False
-                }
             
-            # Check realistic price threshold
-            if (current_price >= realistic_price and 
-                not self.notified_thresholds[coin_name]['realistic']):
-                
-                message = (
-                    f"🎯 <b>Realistic Target Reached!</b>\n\n"
-                    f"<b>{symbol}</b> ({coin_name.title()})\n"
-                    f"Current Price: <b>${current_price:,.2f}</b>\n"
-                    f"Target Price: <b>${realistic_price:,.2f}</b>\n"
-                    f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                )
-                
-                self.send_notification(message)
-                self.notified_thresholds[coin_name]['realistic'] = True
+            coin = self.config.coins.get(event.coin)
+            symbol = coin.symbol if coin is not None else event.coin.upper()
+            currency = coin.currency if coin is not None else 'usd'
+            message = (
+                f"{ALERT_TITLES[event.level]}\n\n"
+                f"<b>{symbol}</b> ({event.coin.title()})\n"
+                f"Current Price: <b>{format_money(event.price, currency)}</b>\n"
+                f"Target Price: <b>{format_money(event.target, currency)}</b>\n"
+                f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            )
             
-            # Check optimistic price threshold
-            if (current_price >= optimistic_price and 
-                not self.notified_thresholds[coin_name]['optimistic']):
-                
-                message = (
-                    f"🚀 <b>Optimistic Target Reached!</b>\n\n"
-                    f"<b>{symbol}</b> ({coin_name.title()})\n"
-                    f"Current Price: <b>${current_price:,.2f}</b>\n"
-                    f"Target Price: <b>${optimistic_price:,.2f}</b>\n"
-                    f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                )
-                
-                self.send_notification(message)
-                self.notified_thresholds[coin_name]['optimistic'] = True
-    
-    def reset_notifications_if_below_threshold(self, prices: Dict[str, float]):
-        """Reset notification flags if price drops below threshold"""
-        for coin_name, current_price in prices.items():
-            if coin_name not in CRYPTO_CONFIG or coin_name not in self.notified_thresholds:
+            await self.send_notification(message)
+        
+        # Targets registered by chats
+        with EVALUATE_SECONDS.time(source='subscriptions'):
+            events = self.subscriptions.evaluate(self._prices_by_coingecko_id(prices))
+        for event in events:
+            changed = True
+            ALERTS.inc(source='subscriptions', level=event.level, event='fired' if event.fired else 'reset')
+            if not event.fired:
                 continue
-                
-            config = CRYPTO_CONFIG[coin_name]
-            realistic_price = config['realistic_price']
-            optimistic_price = config['optimistic_price']
             
-            # Reset realistic threshold if price drops below it
-            if (current_price < realistic_price and 
-                self.notified_thresholds[coin_name]['realistic']):
-                self.notified_thresholds[coin_name]['realistic'] = False
-                logger.info(f"Reset realistic threshold for {coin_name}")
+            message = (
+                f"{ALERT_TITLES[event.level]}\n\n"
+                f"<b>{html.escape(event.coin)}</b>\n"
+                f"Current Price: <b>${event.price:,.2f}</b>\n"
+                f"Target Price: <b>${event.target:,.2f}</b>\n"
+                f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            )
             
-            # Reset optimistic threshold if price drops below it
-            if (current_price < optimistic_price and 
-                self.notified_thresholds[coin_name]['optimistic']):
-                self.notified_thresholds[coin_name]['optimistic'] = False
-                logger.info(f"Reset optimistic threshold for {coin_name}")
+            await self.send_notification(message, chat_id=event.chat_id)
+        
+        return changed
+    
+    async def check_alert_rules(self, prices: Dict[str, float]) -> bool:
+        """Feed prices to the alert rules and send notifications for rules that fired
+        
+        Returns True if any rule fired or re-armed, i.e. the state to checkpoint changed.
+        """
+        if not len(self.rules):
+            return False
+        quoted = await self.quote(prices)
+        with EVALUATE_SECONDS.time(source='rules'):
+            events = self.rules.evaluate(quoted)
+        for event in events:
+            ALERTS.inc(source='rules', level=event.rule.kind, event='fired' if event.fired else 'reset')
+            if event.fired:
+                await self.send_notification(self._rule_message(event), chat_id=event.rule.chat_id)
+        return bool(events)
+    
+    def _rule_message(self, event: RuleEvent) -> str:
+        rule = event.rule
+        coin = self.config.coins.get(rule.coin)
+        symbol = coin.symbol if coin is not None else rule.coin.upper()
+        currency = coin.currency if coin is not None else 'usd'
+        if rule.kind == 'change':
+            detail = f"Change: <b>{event.indicator:+.2f}%</b>"
+        elif rule.kind in ('above', 'below'):
+            detail = f"Target Price: <b>{format_money(event.indicator, currency)}</b>"
+        else:
+            label = 'Band' if rule.kind == 'bollinger' else rule.kind.upper()
+            detail = f"{label}: <b>{format_money(event.indicator, currency)}</b>"
+        
+        return (
+            f"{RULE_TITLES[rule.kind]}\n\n"
+            f"<b>{symbol}</b> ({rule.coin.title()}) {rule.describe(currency)}\n"
+            f"Current Price: <b>{format_money(event.price, currency)}</b>\n"
+            f"{detail}\n"
+            f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+    
+    def _moved(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """Coins whose price changed since their targets were last checked"""
+        against = (self.thresholds, self.fx.version)
+        if against != self._checked_against:
+            # New targets or exchange rates, so every coin needs another look
+            self._checked_prices = {}
+            self._checked_against = against
+        
+        checked = self._checked_prices
+        moved = {coin_name: price for coin_name, price in prices.items() if checked.get(coin_name) != price}
+        checked.update(moved)
+        self.coins_checked += len(moved)
+        self.coins_skipped += len(prices) - len(moved)
+        return moved
     
-    def monitor_prices(self):
+    async def monitor_prices(self):
         """Main monitoring function - checks prices and sends notifications"""
         logger.info("Checking cryptocurrency prices...")
         
-        prices = self.get_crypto_prices()
+        # Alerts must be based on fresh prices, never a stale cached snapshot
+        prices = await self.price_cache.aget(allow_stale=False)
         if not prices:
             logger.warning("Could not fetch prices, skipping this check")
             return
+        # Taken before any await, so the live status shows these prices with their own timestamp
+        snapshot = self.price_cache.snapshot
         
-        # Log current prices
-        price_info = []
-        for coin_name, price in prices.items():
-            symbol = CRYPTO_CONFIG[coin_name]['symbol']
-            price_info.append(f"{symbol}: ${price:,.2f}")
+        # Targets can only be crossed by coins whose price changed
+        moved = self._moved(prices)
+        if moved:
+            price_info = []
+            for coin_name, price in moved.items():
+                coin = self.config.coins.get(coin_name)
+                symbol = coin.symbol if coin is not None else coin_name
+                price_info.append(f"{symbol}: ${price:,.2f}")
+            logger.info(f"Price changes - {' | '.join(price_info)}")
+        else:
+            logger.info("Prices unchanged since the last check")
+        logger.debug(f"Price cache stats: {self.price_cache.stats()}")
+        logger.debug(f"Price provider health: {self.provider.health()}")
+        logger.debug(f"Fetch stats: {self.fetcher.stats()}, coins skipped: {self.coins_skipped}"
+                     f"/{self.coins_checked + self.coins_skipped}")
         
-        logger.info(f"Current prices - {' | '.join(price_info)}")
+        # Check thresholds, send notifications and reset the ones prices dropped below
+        flags_changed = bool(moved) and await self.check_price_thresholds(moved)
+        # Rolling indicators count every update, moved or not
+        rules_changed = await self.check_alert_rules(prices)
+        # The checkpoint only needs rewriting when a flag changed, close() saves the latest prices
+        if flags_changed or rules_changed:
+            self.save_state()
+        await self.refresh_live_status(snapshot)
+    
+    def start_metrics_server(self, scheduler: Optional[MonitorScheduler] = None,
+                             stream: Optional[PriceStream] = None) -> Optional[MetricsServer]:
+        """Serve metrics on METRICS_PORT (0 disables), including scheduler and stream stats"""
+        port = int(os.getenv('METRICS_PORT', DEFAULT_METRICS_PORT))
+        if not port:
+            return None
         
-        # Check thresholds and send notifications
-        self.check_price_thresholds(prices)
+        try:
+            self.metrics_server = MetricsServer(
+                REGISTRY, self.profiler, host=os.getenv('METRICS_HOST', DEFAULT_METRICS_HOST), port=port
+            )
+        except OSError as e:
+            logger.error(f"Could not start metrics server on port {port}: {e}")
+            return None
+        loop = asyncio.get_running_loop()
+
+        async def collect() -> List[Sample]:
+            return self.collect_metrics(scheduler, stream)
+
+        # The stats belong to the event loop, so scrapes read them there instead of on the server thread
+        self._metrics_collector = lambda: asyncio.run_coroutine_threadsafe(collect(), loop).result(
+            METRICS_COLLECT_TIMEOUT
+        )
+        REGISTRY.add_collector(self._metrics_collector)
+        self.metrics_server.start()
+        return self.metrics_server
+    
+    def collect_metrics(self, scheduler: Optional[MonitorScheduler] = None,
+                        stream: Optional[PriceStream] = None) -> List[Sample]:
+        """Report stats kept by other components as metric samples; call it on the event loop"""
+        samples = [
+            Sample(f"crypto_price_cache_{name}_total", 'counter', f"Price cache {name.replace('_', ' ')}", {}, value)
+            for name, value in self.price_cache.stats().items()
+        ]
+        for name, health in self.provider.health().items():
+            samples.append(Sample('crypto_provider_up', 'gauge', "1 if the provider's circuit is not open",
+                                  {'provider': name}, health['state'] != 'open'))
+            samples.append(Sample('crypto_provider_p95_seconds', 'gauge', "Provider p95 latency used for hedging",
+                                  {'provider': name}, health['p95']))
+        if scheduler is not None:
+            stats = scheduler.stats()
+            samples.append(Sample('crypto_monitor_tick_lag_seconds', 'gauge', "How late the last tick started",
+                                  {}, stats['last_lag']))
+            samples.append(Sample('crypto_monitor_tick_duration_seconds', 'gauge', "Duration of the last tick",
+                                  {}, stats['last_duration']))
+            samples.append(Sample('crypto_monitor_ticks_total', 'counter', "Monitor ticks run", {}, stats['ticks']))
+            samples.append(Sample('crypto_monitor_failed_ticks_total', 'counter', "Monitor ticks that raised",
+                                  {}, stats['failed_ticks']))
+            samples.append(Sample('crypto_monitor_skipped_ticks_total', 'counter', "Intervals skipped after overruns",
+                                  {}, stats['skipped_ticks']))
+        if self.dispatcher is not None:
+            stats = self.dispatcher.stats()
+            samples.append(Sample('crypto_notification_queue_depth', 'gauge', "Chats with queued notifications",
+                                  {}, stats['queue_depth']))
+            for name in ('sent', 'coalesced', 'retried', 'failed'):
+                samples.append(Sample(f"crypto_notifications_{name}_total", 'counter', f"Notifications {name}",
+                                      {}, stats[name]))
+        for name, value in self.fetcher.stats().items():
+            samples.append(Sample(f"crypto_price_fetch_{name}_total", 'counter',
+                                  f"Price API {name.replace('_', ' ')}", {}, value))
+        samples.append(Sample('crypto_price_checks_total', 'counter', "Coin prices checked against targets",
+                              {}, self.coins_checked))
+        samples.append(Sample('crypto_price_checks_skipped_total', 'counter',
+                              "Coin prices not checked because they did not change", {}, self.coins_skipped))
+        if self.fx.updated_at is not None:
+            samples.append(Sample('crypto_fx_rates_age_seconds', 'gauge', "Age of the exchange rate table",
+                                  {}, time.time() - self.fx.updated_at))
+        samples.append(Sample('crypto_live_status_chats', 'gauge', "Chats with a live status message",
+                              {}, self.live_status.chats))
+        samples.append(Sample('crypto_live_status_edits_total', 'counter', "Live status messages edited",
+                              {}, self.live_status.edits))
+        samples.append(Sample('crypto_live_status_unchanged_total', 'counter',
+                              "Live status edits skipped because the content was unchanged",
+                              {}, self.live_status.unchanged))
+        for name, value in self.charts.cache.stats().items():
+            samples.append(Sample(f"crypto_chart_cache_{name}_total", 'counter', f"Chart cache {name}", {}, value))
+        samples.append(Sample('crypto_chart_cache_bytes', 'gauge', "PNG bytes in the chart cache",
+                              {}, self.charts.cache.bytes))
+        samples.append(Sample('crypto_chart_renders_total', 'counter', "Charts drawn", {}, self.charts.renders))
+        samples.append(Sample('crypto_chart_uploads_total', 'counter', "Charts uploaded to Telegram",
+                              {}, self.charts.uploads))
+        if stream is not None:
+            stats = stream.stats()
+            samples.append(Sample('crypto_stream_tick_age_seconds', 'gauge', "Seconds since the last streamed tick",
+                                  {}, stats['last_tick_age']))
+            samples.append(Sample('crypto_stream_ticks_total', 'counter', "Streamed ticks received",
+                                  {}, stats['ticks']))
+            samples.append(Sample('crypto_stream_connects_total', 'counter', "Stream (re)connections",
+                                  {}, stats['connects']))
+        return samples
+    
+    def create_stream(self) -> Optional[PriceStream]:
+        """Create the WebSocket price feed, or None if streaming mode is off"""
+        enabled = os.getenv('PRICE_STREAM_ENABLED', str(DEFAULT_STREAM_ENABLED)).lower() in ('1', 'true', 'yes')
+        if not enabled:
+            return None
         
-        # Reset notifications if prices drop below thresholds
-        self.reset_notifications_if_below_threshold(prices)
+        pairs = self._binance_pairs()
+        channel = os.getenv('PRICE_STREAM_CHANNEL', DEFAULT_STREAM_CHANNEL)
+        streams = '/'.join(f"{pair.lower()}@{channel}" for pair in pairs.values())
+        return PriceStream(
+            f"{os.getenv('PRICE_STREAM_URL', BINANCE_STREAM_URL)}?streams={streams}",
+            {pair: coin_name for coin_name, pair in pairs.items()},
+            self.on_stream_prices,
+            debounce=float(os.getenv('PRICE_STREAM_DEBOUNCE_SECONDS', DEFAULT_STREAM_DEBOUNCE))
+        )
     
-    def send_status_update(self):
+    async def on_stream_prices(self, latest: Dict[str, float], peaks: Dict[str, float]):
+        """Handle a batch of streamed ticks: update the snapshot and check thresholds"""
+        # Streamed prices keep the shared snapshot fresh between polls, without postponing the next poll
+        self._record(latest)
+        self.price_cache.merge(latest)
+        
+        # Alerts use the peak so a spike that reverted within the batch still fires
+        moved = self._moved(peaks)
+        flags_changed = bool(moved) and await self.check_price_thresholds(moved)
+        # Rolling indicators and downside rules need the actual prices, not the peaks
+        if await self.check_alert_rules(latest) or flags_changed:
+            self.save_state()
+        await self.refresh_live_status(self.price_cache.snapshot)
+    
+    def save_state(self):
+        """Checkpoint alert flags and the current snapshot"""
+        # One snapshot, so the prices and their timestamp belong together
+        snapshot = self.price_cache.snapshot
+        try:
+            self.state_store.save({
+                'notified_thresholds': self.notified_thresholds,
+                # Flags are only restored for targets that are still the same
+                'targets': self._targets(),
+                # Rules that hold stay quiet after a restart, like notified targets
+                'rule_state': self.rules.to_state(),
+                'prices': snapshot.prices or {},
+                'updated_at': snapshot.updated_at,
+            })
+        except OSError as e:
+            logger.error(f"Error saving state: {e}")
+    
+    def restore_state(self) -> bool:
+        """Restore alert flags and warm the price cache from the last checkpoint"""
+        started = time.perf_counter()
+        state = self.state_store.load()
+        if state is None:
+            return False
+        
+        flags = state.get('notified_thresholds', {})
+        if 'targets' in state:
+            flags = self._unchanged_flags(flags, state['targets'], self.config)
+        self.thresholds.restore_state(flags)
+        if 'rule_state' in state:
+            # Rule levels are in the coin's currency, so rules of requoted coins start over
+            saved = {coin_name: targets.get('currency', 'usd')
+                     for coin_name, targets in state.get('targets', {}).items()}
+            current = self._currencies()
+            requoted = [coin_name for coin_name in set(saved) | set(current)
+                        if saved.get(coin_name, 'usd') != current.get(coin_name, 'usd')]
+            self.rules.restore_state(state['rule_state'], reset_coins=requoted)
+        if state.get('prices'):
+            # Served immediately but refreshed on first use
+            self.price_cache.put(state['prices'], updated_at=state.get('updated_at'), stale=True)
+        
+        logger.info(f"Restored state from {self.state_store.path} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return True
+    
+    async def send_startup_status(self):
+        """Announce a start without saved state, followed by the current prices"""
+        await self.send_notification("🤖 Crypto Price Monitor Started!")
+        await self.send_status_update()
+    
+    async def send_status_update(self):
         """Send a status update with current prices and thresholds"""
-        prices = self.get_crypto_prices()
-        if not prices:
-            self.send_notification("❌ Could not fetch current prices")
+        if not await self.get_crypto_prices_async():
+            await self.send_notification("❌ Could not fetch current prices")
             return
         
-        message = "📊 <b>Current Crypto Status</b>\n\n"
+        # A refresh may land while quoting, the snapshot keeps prices and timestamp consistent
+        snapshot = self.price_cache.snapshot
+        message = self.status_renderer.render(await self.quote(snapshot.prices), snapshot.updated_at)
+        await self.send_notification(message)
+    
+    async def refresh_live_status(self, snapshot: PriceSnapshot):
+        """Edit live status messages whose prices changed"""
+        if not snapshot.prices:
+            return
+        # Same snapshot, exchange rates and coins as last time: nothing to re-render
+        rendered = (snapshot.version, self.fx.version, self.status_renderer)
+        if rendered == self._live_rendered:
+            return
+        message = self.status_renderer.render(await self.quote(snapshot.prices), snapshot.updated_at)
+        # The timestamp alone changing is not worth an edit
+        if await self.live_status.refresh(self.bot, message, key=self.status_renderer.body):
+            # Only once it was shown: a throttled round is retried with this snapshot on the next call
+            self._live_rendered = rendered
+    
+    def create_scheduler(self) -> MonitorScheduler:
+        """Create the scheduler that runs monitor_prices every check interval"""
+        return MonitorScheduler(
+            self.profiler.wrap(self.monitor_prices),
+            interval=self.check_interval * 60,
+            jitter=float(os.getenv('CHECK_JITTER_SECONDS', DEFAULT_CHECK_JITTER))
+        )
+
+
+async def run_standalone():
+    """Run the monitor without the interactive bot"""
+    monitor = CryptoPriceMonitor()
+    scheduler = monitor.create_scheduler()
+    stream = monitor.create_stream()
+    
+    restored = monitor.restore_state()
+    
+    async with monitor.bot:
+        monitor.start_notifications()
         
-        for coin_name, current_price in prices.items():
-            config = CRYPTO_CONFIG[coin_name]
-            symbol = config['symbol']
-            realistic_price = config['realistic_price']
-            optimistic_price = config['optimistic_price']
-            
-            # Determine status indicators
-            realistic_status = "✅" if current_price >= realistic_price else "⏳"
-            optimistic_status = "✅" if current_price >= optimistic_price else "⏳"
-            
-            message += (
-                f"<b>{symbol}</b> - ${current_price:,.2f}\n"
-                f"  {realistic_status} Realistic: ${realistic_price:,.2f}\n"
-                f"  {optimistic_status} Optimistic: ${optimistic_price:,.2f}\n\n"
-            )
+        logger.info(f"Starting price monitoring (checking every {monitor.check_interval:g} minutes)")
+        scheduler.start()
+        if stream is not None:
+            stream.start()
+        monitor.start_metrics_server(scheduler, stream)
+        monitor.start_config_watcher()
         
-        message += f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        self.send_notification(message)
-    
+        # Initial status, unless this is a restart that picked up saved state. Sent in the
+        # background: its price request joins the first tick's instead of delaying it
+        greeting = None if restored else asyncio.create_task(monitor.send_startup_status())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            if greeting is not None:
+                greeting.cancel()
+            if stream is not None:
+                await stream.stop()
+            await scheduler.stop()
+            await monitor.close()
+
+
 if __name__ == "__main__":
     try:
-        monitor = CryptoPriceMonitor()
-        # Send initial status
-        monitor.send_notification("🤖 Crypto Price Monitor Started!")
-        monitor.send_status_update()
-        
-        # Simple monitoring loop
-        logger.info(f"Starting price monitoring (checking every {monitor.check_interval} minutes)")
-        while True:
-            monitor.monitor_prices()
-            time.sleep(monitor.check_interval * 60)
-            
+        asyncio.run(run_standalone())
     except ValueError as e:
         logger.error(f"Configuration error: {e}")
         print(f"Configuration error: {e}")
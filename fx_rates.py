@@ -0,0 +1,143 @@
+"""
+Quote currencies
+Prices are always fetched in USD. Coins whose targets are set in another
+currency (EUR, GBP, BTC, ...) are converted with one cached exchange rate
+table that is refreshed far less often than prices, so more currencies cost
+no extra price requests and one multiplication per coin.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+from price_fetcher import PriceFetcher
+
+logger = logging.getLogger(__name__)
+
+CURRENCY_SYMBOLS = {'usd': '$', 'eur': '€', 'gbp': '£', 'jpy': '¥', 'btc': '₿', 'eth': 'Ξ'}
+# Decimals shown for currencies worth far more than a coin's price in cents
+CURRENCY_DECIMALS = {'btc': 8, 'eth': 6, 'jpy': 0}
+
+NAN = float('nan')
+
+
+def format_money(amount: float, currency: str = 'usd', compact: bool = False) -> str:
+    """Format an amount with its currency sign, e.g. $1,234.56, €1,234.56 or ₿0.01234567
+
+    compact drops trailing zero decimals, e.g. $120,000 but $3.03.
+    """
+    decimals = CURRENCY_DECIMALS.get(currency, 2)
+    text = f"{amount:,.{decimals}f}"
+    if compact and decimals:
+        text = text.rstrip('0').rstrip('.')
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    return f"{symbol}{text}" if symbol else f"{text} {currency.upper()}"
+
+
+class FxRates:
+    """Units of each currency per US dollar, from CoinGecko's exchange rate table"""
+
+    def __init__(self, url: str, refresh_interval: float = 600.0, retry_interval: float = 60.0):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval    # Wait after a failed refresh before trying again
+        self.rates: Dict[str, float] = {'usd': 1.0}
+        self.updated_at: Optional[float] = None     # Wall-clock time of the current table
+        self.version = 0                            # Bumped whenever the table changes
+        self.refreshes = 0
+        self.errors = 0
+        # Called with (rates, updated_at) after each successful refresh, e.g. to share the table
+        self.on_update: Optional[Callable[[Dict[str, float], float], None]] = None
+
+        self._next_refresh = float('-inf')
+        self._lock: Optional[asyncio.Lock] = None
+
+    def rate(self, currency: str) -> float:
+        """Units of currency per USD, NaN until the table has it"""
+        return self.rates.get(currency, NAN)
+
+    async def ensure_fresh(self, http: PriceFetcher, currencies):
+        """Refresh the table if it is due and any of currencies needs it"""
+        if time.monotonic() < self._next_refresh or all(currency == 'usd' for currency in currencies):
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another caller may have refreshed while this one waited
+            if time.monotonic() >= self._next_refresh:
+                await self.refresh(http)
+
+    async def refresh(self, http: PriceFetcher) -> bool:
+        """Fetch the exchange rate table, keeping the previous one on errors"""
+        try:
+            data = await http.get_json(self.url)
+            # CoinGecko quotes every rate per bitcoin; rebase them to USD
+            per_btc = {currency: float(entry['value']) for currency, entry in data['rates'].items()}
+            usd = per_btc['usd']
+            rates = {currency: value / usd for currency, value in per_btc.items()}
+        except Exception as e:
+            self.errors += 1
+            self._next_refresh = time.monotonic() + self.retry_interval
+            logger.error(f"Error fetching exchange rates: {e!r}")
+            return False
+
+        self.rates = rates
+        self.updated_at = time.time()
+        self.version += 1
+        self.refreshes += 1
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        logger.debug(f"Exchange rates refreshed: {len(rates)} currencies")
+        if self.on_update is not None:
+            try:
+                self.on_update(rates, self.updated_at)
+            except Exception as e:
+                logger.error(f"Exchange rate update callback failed: {e!r}")
+        return True
+
+
+class QuoteConverter:
+    """Converts USD snapshots to each coin's quote currency"""
+
+    def __init__(self, fx: FxRates, currencies: Mapping[str, str]):
+        self.fx = fx
+        # Coins not listed here (e.g. subscribed CoinGecko IDs) stay in USD
+        self.currencies = {coin: currency for coin, currency in currencies.items() if currency != 'usd'}
+
+        self._factors: Dict[str, float] = {}
+        self._factors_version = -1
+        self._last_prices: Optional[Dict[str, float]] = None
+        self._last_quoted: Optional[Dict[str, float]] = None
+        self._last_version = -1
+
+    def convert(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """Return prices in each coin's quote currency
+
+        Coins whose rate is not known yet are left out rather than compared in
+        the wrong currency. The same snapshot converts to the same dict object,
+        so caches keyed on the snapshot keep working.
+        """
+        if not self.currencies:
+            return prices
+        version = self.fx.version
+        if prices is self._last_prices and version == self._last_version:
+            return self._last_quoted
+
+        if version != self._factors_version:
+            self._factors = {coin: self.fx.rate(currency) for coin, currency in self.currencies.items()}
+            self._factors_version = version
+            missing = sorted({self.currencies[coin] for coin, factor in self._factors.items() if factor != factor})
+            if missing:
+                logger.warning(f"No exchange rate for {', '.join(missing)} yet, skipping coins quoted in it")
+
+        factors = self._factors
+        quoted = {}
+        for coin, price in prices.items():
+            factor = factors.get(coin)
+            if factor is None:
+                quoted[coin] = price
+            elif factor == factor:
+                quoted[coin] = price * factor
+
+        self._last_prices, self._last_quoted, self._last_version = prices, quoted, version
+        return quoted
@@ -0,0 +1,168 @@
+"""
+Live status dashboard
+Keeps one pinned status message per chat and edits it in place when the
+rendered prices change, instead of sending a new message for every check.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from metrics import SEND_SECONDS
+from subscriptions import SubscriptionStore
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class LiveStatusBoard:
+    def __init__(self, store: SubscriptionStore, min_interval: float = 5.0, max_concurrency: int = 8):
+        self.store = store
+        self.min_interval = min_interval        # Min seconds between two rounds of edits
+        self.max_concurrency = max_concurrency  # Edits in flight at once during a round
+
+        self._messages: Dict[int, int] = store.live_messages()  # chat_id -> message_id
+        # Hash of the content each (chat_id, message_id) shows; unknown after a restart
+        self._hashes: Dict[Tuple[int, int], bytes] = {}
+        self._last_refresh = float('-inf')
+        self._refreshing = False
+        self._paused_until = float('-inf')
+
+        self.edits = 0
+        self.unchanged = 0
+        self.failed = 0
+
+    @property
+    def chats(self) -> int:
+        return len(self._messages)
+
+    async def start(self, bot: Bot, chat_id: int, text: str, key: Optional[str] = None) -> int:
+        """Post and pin a live status message in a chat, returns its message ID
+
+        key is the part of text that decides whether an edit is needed; it
+        defaults to the whole text.
+        """
+        old_message_id = self._messages.get(chat_id)
+        message = await bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+        try:
+            await bot.pin_chat_message(chat_id=chat_id, message_id=message.message_id, disable_notification=True)
+        except TelegramError as e:
+            # No pin rights in this group - the message still updates
+            logger.info(f"Could not pin live status in {chat_id}: {e}")
+        if old_message_id is not None:
+            await self._unpin(bot, chat_id, old_message_id)
+
+        self._messages[chat_id] = message.message_id
+        self._hashes[(chat_id, message.message_id)] = content_hash(key if key is not None else text)
+        self.store.set_live_message(chat_id, message.message_id)
+        return message.message_id
+
+    async def stop(self, bot: Bot, chat_id: int) -> bool:
+        """Stop updating a chat's live status, returns False if it had none"""
+        message_id = self._messages.pop(chat_id, None)
+        self._hashes.pop((chat_id, message_id), None)
+        self.store.remove_live_message(chat_id)
+        if message_id is None:
+            return False
+        await self._unpin(bot, chat_id, message_id)
+        return True
+
+    async def refresh(self, bot: Bot, text: str, key: Optional[str] = None, force: bool = False) -> bool:
+        """Edit every live message whose content differs from text
+
+        Runs at most once per min_interval unless force is set. Chats already
+        showing this content are skipped without an API call. Returns False if
+        the round was skipped or cut short by flood control, so the caller
+        should offer the same text again later.
+        """
+        now = time.monotonic()
+        if self._refreshing or now < self._paused_until:
+            return False
+        if not force and now - self._last_refresh < self.min_interval:
+            return False
+        self._last_refresh = now
+        # Webhook workers start and stop dashboards in their own processes
+        self._messages = self.store.live_messages()
+        self._hashes = {
+            shown: digest for shown, digest in self._hashes.items() if self._messages.get(shown[0]) == shown[1]
+        }
+        if not self._messages:
+            return True
+
+        digest = content_hash(key if key is not None else text)
+        stale = [chat_id for chat_id, message_id in self._messages.items()
+                 if self._hashes.get((chat_id, message_id)) != digest]
+        self.unchanged += len(self._messages) - len(stale)
+        if not stale:
+            return True
+
+        self._refreshing = True
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def edit(chat_id: int):
+            async with semaphore:
+                if time.monotonic() < self._paused_until:
+                    return
+                await self._edit(bot, chat_id, text, digest)
+
+        try:
+            await asyncio.gather(*(edit(chat_id) for chat_id in stale))
+        finally:
+            self._refreshing = False
+        return time.monotonic() >= self._paused_until
+
+    def stats(self) -> Dict[str, int]:
+        return {'chats': self.chats, 'edits': self.edits, 'unchanged': self.unchanged, 'failed': self.failed}
+
+    async def _edit(self, bot: Bot, chat_id: int, text: str, digest: bytes):
+        message_id = self._messages.get(chat_id)
+        if message_id is None:
+            return
+
+        started = time.perf_counter()
+        try:
+            await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, parse_mode='HTML')
+            SEND_SECONDS.observe(time.perf_counter() - started, result='edited')
+            self.edits += 1
+        except RetryAfter as e:
+            retry_after = getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)()
+            # The rest of this round is retried on a later tick
+            self._paused_until = time.monotonic() + retry_after
+            logger.warning(f"Flood control while editing live status, pausing for {retry_after}s")
+            return
+        except BadRequest as e:
+            # "Message is not modified" means it already shows this content
+            if 'not modified' not in str(e).lower():
+                self._drop(chat_id, e)
+                return
+        except Forbidden as e:
+            # The bot was blocked or removed from the chat
+            self._drop(chat_id, e)
+            return
+        except TelegramError as e:
+            self.failed += 1
+            logger.error(f"Error editing live status in {chat_id}: {e}")
+            return
+        self._hashes[(chat_id, message_id)] = digest
+
+    def _drop(self, chat_id: int, error: TelegramError):
+        """Stop updating a message that can no longer be edited"""
+        self.failed += 1
+        logger.warning(f"Dropping live status in {chat_id}: {error}")
+        message_id = self._messages.pop(chat_id, None)
+        self._hashes.pop((chat_id, message_id), None)
+        self.store.remove_live_message(chat_id)
+
+    async def _unpin(self, bot: Bot, chat_id: int, message_id: int):
+        try:
+            await bot.unpin_chat_message(chat_id=chat_id, message_id=message_id)
+        except TelegramError:
+            pass
@@ -1,68 +1,86 @@
 """
 Main entry point for the Telegram Crypto Price Monitor Bot
-Simple synchronous version for reliable deployment
+Price monitoring runs as a scheduled coroutine on the bot's event loop
 """
 
-import os
 import time
-import threading
+# Taken before the heavier imports below, so the startup log line includes them
+STARTED = time.perf_counter()
+
+import os
 import logging
 from dotenv import load_dotenv
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from telegram.ext import Application
 
 from crypto_monitor import CryptoPriceMonitor
 from bot_commands import TelegramBotCommands
 
 # Load environment variables
 load_dotenv()
+IMPORTED = time.perf_counter()
 
 logger = logging.getLogger(__name__)
 
 
-def price_monitoring_job(monitor: CryptoPriceMonitor):
-    """Price monitoring job that runs in background thread"""
-    while True:
-        try:
-            monitor.monitor_prices()
-            # Wait for the specified interval (convert minutes to seconds)
-            time.sleep(monitor.check_interval * 60)
-        except Exception as e:
-            logger.error(f"Price monitoring error: {e}")
-            time.sleep(60)  # Wait 1 minute before retrying
-
-
 def main():
     """Main function that runs the Telegram bot with integrated price monitoring"""
     try:
         # Create price monitor instance
         monitor = CryptoPriceMonitor()
-        
+        # Warm start: /status can be answered from the saved snapshot before the first fetch
+        monitor.restore_state()
+        scheduler = monitor.create_scheduler()
+        # Optional WebSocket feed for alerts between polls
+        stream = monitor.create_stream()
+
         # Get bot token
         bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         if not bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN must be set in environment variables")
-        
+
+        async def start_monitoring(application: Application):
+            # Send alerts through the application's bot so they share its connection pool
+            monitor.start_notifications(application.bot)
+            scheduler.start()
+            if stream is not None:
+                stream.start()
+            monitor.start_metrics_server(scheduler, stream)
+            monitor.start_config_watcher()
+            logger.info(f"Price monitoring started (checking every {monitor.check_interval:g} minutes"
+                        f"{', streaming' if stream is not None else ''})")
+            # The first fetch runs in the background, polling starts right after this
+            logger.info(f"Started in {(time.perf_counter() - STARTED) * 1000:.0f} ms, "
+                        f"{(IMPORTED - STARTED) * 1000:.0f} ms of it imports")
+
+        async def stop_monitoring(application: Application):
+            if stream is not None:
+                await stream.stop()
+            await scheduler.stop()
+            await monitor.close()
+            logger.info(f"Price monitoring stopped: {scheduler.stats()}")
+
         # Create application
-        application = Application.builder().token(bot_token).build()
-        
+        builder = (
+            Application.builder()
+            .token(bot_token)
+            .post_init(start_monitoring)
+            .post_stop(stop_monitoring)
+        )
+        # Point the bot at another Bot API server, e.g. a local one or the benchmarks' stand-in
+        if os.getenv('TELEGRAM_BASE_URL'):
+            builder = builder.base_url(os.getenv('TELEGRAM_BASE_URL'))
+        application = builder.build()
+
         # Create command handlers
         commands = TelegramBotCommands(monitor)
-        
+
         # Add handlers
-        application.add_handler(CommandHandler("start", commands.start_command))
-        application.add_handler(CommandHandler("status", commands.status_command))
-        application.add_handler(CommandHandler("help", commands.help_command))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, commands.handle_message))
-        
-        # Start price monitoring in background thread
-        monitor_thread = threading.Thread(target=price_monitoring_job, args=(monitor,), daemon=True)
-        monitor_thread.start()
-        logger.info("Price monitoring started in background")
-        
+        commands.register_handlers(application)
+
         # Start the bot
         logger.info("Starting Telegram bot...")
         application.run_polling(drop_pending_updates=True)
-        
+
     except KeyboardInterrupt:
         logger.info("Application stopped by user")
     except Exception as e:
@@ -71,4 +89,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
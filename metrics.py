@@ -0,0 +1,346 @@
+"""
+Metrics and profiling
+Counters, gauges and histograms rendered in the Prometheus text format by a
+small local HTTP exporter, plus optional cProfile sampling of monitor ticks.
+"""
+
+import bisect
+import io
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+if TYPE_CHECKING:
+    import cProfile
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits to slow API calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Sample(NamedTuple):
+    name: str
+    kind: str               # 'counter' or 'gauge'
+    help: str
+    labels: Dict[str, str]
+    value: float
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _label_text(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count in +Inf], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, counts in self._counts.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else _number(bound)
+                    lines.append(f"{self.name}_bucket{self._label_text(key, ('le', le))} {cumulative}")
+                lines.append(f"{self.name}_sum{self._label_text(key)} {_number(self._sums[key])}")
+                lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Add a callback that reports samples at scrape time, for stats kept elsewhere"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Remove a callback added with add_collector; unknown callbacks are ignored"""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def clear_collectors(self):
+        with self._lock:
+            self._collectors.clear()
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        seen = set()
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+            for sample in samples:
+                if sample.name not in seen:
+                    seen.add(sample.name)
+                    lines.append(f"# HELP {sample.name} {sample.help}")
+                    lines.append(f"# TYPE {sample.name} {sample.kind}")
+                labels = ','.join(f'{name}="{_escape(value)}"' for name, value in sample.labels.items())
+                lines.append(f"{sample.name}{{{labels}}} {_number(sample.value)}" if labels
+                             else f"{sample.name} {_number(sample.value)}")
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            return metric
+
+
+class TickProfiler:
+    """Profiles every Nth monitor tick with cProfile; N can be changed while running"""
+
+    def __init__(self, sample_every: int = 0, top: int = 30):
+        self.sample_every = sample_every    # 0 disables profiling
+        self.top = top                      # Functions shown in the report
+        self.ticks = 0
+        self.profiled = 0
+        self.last_report = ''
+
+    def wrap(self, tick: Callable[[], Awaitable[None]]) -> Callable[[], Awaitable[None]]:
+        """Return a tick function that profiles sampled runs of tick"""
+        async def profiled_tick():
+            self.ticks += 1
+            if not self.sample_every or self.ticks % self.sample_every:
+                await tick()
+                return
+
+            # Imported on first use, most runs never profile a tick
+            import cProfile
+
+            # Other tasks that run while the tick awaits show up in the profile too
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await tick()
+            finally:
+                profiler.disable()
+                self.profiled += 1
+                self.last_report = self._report(profiler)
+                logger.info(f"Profiled monitor tick #{self.ticks}")
+
+        return profiled_tick
+
+    def _report(self, profiler: 'cProfile.Profile') -> str:
+        import pstats
+
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        return out.getvalue()
+
+
+class MetricsServer:
+    """Serves /metrics, and /profile for tick profiles, on a background thread
+
+    GET /profile returns the last profile; POST /profile?every=N samples every
+    Nth tick from now on (0 turns profiling off).
+    """
+
+    def __init__(self, registry: Registry, profiler: Optional[TickProfiler] = None,
+                 host: str = '127.0.0.1', port: int = 9108):
+        self.registry = registry
+        self.profiler = profiler
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.exporter = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Metrics available at {self.url}/metrics")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        exporter = self.server.exporter
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self._reply(200, exporter.registry.render(), 'text/plain; version=0.0.4')
+        elif path == '/profile' and exporter.profiler is not None:
+            report = exporter.profiler.last_report or "No tick has been profiled yet\n"
+            self._reply(200, report)
+        else:
+            self._reply(404, "Not found\n")
+
+    def do_POST(self):
+        exporter = self.server.exporter
+        url = urlparse(self.path)
+        if url.path != '/profile' or exporter.profiler is None:
+            self._reply(404, "Not found\n")
+            return
+        try:
+            every = int(parse_qs(url.query).get('every', ['0'])[0])
+            if every < 0:
+                raise ValueError
+        except ValueError:
+            self._reply(400, "every must be a non-negative integer\n")
+            return
+
+        exporter.profiler.sample_every = every
+        logger.info(f"Tick profiling {'every ' + str(every) + ' ticks' if every else 'disabled'}")
+        self._reply(200, f"Profiling every {every} tick(s)\n" if every else "Profiling disabled\n")
+
+    def _reply(self, status: int, body: str, content_type: str = 'text/plain'):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+# Process-wide registry used by all modules
+REGISTRY = Registry()
+
+FETCH_SECONDS = REGISTRY.histogram('crypto_price_fetch_seconds', "Time to fetch a price snapshot", ['provider'])
+FETCH_BATCH_SECONDS = REGISTRY.histogram('crypto_price_fetch_batch_seconds', "Time to fetch one batch of coins",
+                                         ['provider', 'result'])
+FETCH_ERRORS = REGISTRY.counter('crypto_price_fetch_errors_total', "Failed price requests", ['provider'])
+EVALUATE_SECONDS = REGISTRY.histogram('crypto_threshold_evaluate_seconds', "Time to evaluate targets for a snapshot",
+                                      ['source'])
+RENDER_SECONDS = REGISTRY.histogram('crypto_message_render_seconds', "Time to build a message", ['message'])
+SEND_SECONDS = REGISTRY.histogram('crypto_telegram_send_seconds', "Time to send one Telegram message", ['result'])
+HANDLER_SECONDS = REGISTRY.histogram('crypto_bot_handler_seconds', "Time spent in a bot command handler",
+                                     ['command'])
+ALERTS = REGISTRY.counter('crypto_alerts_total', "Threshold state changes", ['source', 'level', 'event'])
@@ -0,0 +1,107 @@
+"""
+Async scheduler for the price monitoring loop
+Runs the monitor tick as a coroutine on the bot's event loop at a fixed,
+drift-free interval with optional jitter.
+"""
+
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MonitorScheduler:
+    def __init__(self, tick: Callable[[], Awaitable[None]], interval: float, jitter: float = 0.0):
+        if not interval > 0:
+            raise ValueError(f"Monitor interval must be positive, got {interval!r}")
+        if not jitter >= 0:
+            raise ValueError(f"Monitor jitter must not be negative, got {jitter!r}")
+        self.tick = tick
+        self.interval = interval    # Seconds between scheduled ticks
+        self.jitter = jitter        # Max random delay added to each tick, in seconds
+
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+        # Tick metrics
+        self.ticks = 0
+        self.failed_ticks = 0
+        self.skipped_ticks = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the loop on the running event loop"""
+        if self.running:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop after the current tick finishes, cancelling it if it takes longer than timeout"""
+        if not self.running:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Monitor tick did not finish in time, cancelled")
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        """Return per-tick duration metrics"""
+        return {
+            'ticks': self.ticks,
+            'failed_ticks': self.failed_ticks,
+            'skipped_ticks': self.skipped_ticks,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration,
+            'avg_duration': self.total_duration / self.ticks if self.ticks else 0.0,
+            'last_lag': self.last_lag,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        # Ticks are scheduled on a fixed grid so fetch time doesn't accumulate as drift
+        scheduled = loop.time()
+
+        while not self._stopping.is_set():
+            started = loop.time()
+            self.last_lag = started - scheduled
+            try:
+                await self.tick()
+            except Exception as e:
+                self.failed_ticks += 1
+                logger.error(f"Price monitoring error: {e}")
+
+            duration = loop.time() - started
+            self.ticks += 1
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            self.total_duration += duration
+            logger.debug(f"Monitor tick took {duration:.3f}s")
+
+            scheduled += self.interval
+            now = loop.time()
+            if scheduled < now:
+                # The tick overran one or more slots - skip them instead of bursting
+                missed = int((now - scheduled) // self.interval) + 1
+                self.skipped_ticks += missed
+                scheduled += missed * self.interval
+                logger.warning(f"Monitor tick took {duration:.1f}s, skipped {missed} interval(s)")
+
+            delay = scheduled - now + random.uniform(0, self.jitter)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
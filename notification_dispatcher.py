@@ -0,0 +1,216 @@
+"""
+Rate-limited Telegram notification dispatcher
+Queues outbound alerts, merges alerts for the same chat that arrive close
+together, and sends them within Telegram's global and per-chat limits.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from telegram import Bot
+from telegram.constants import MessageLimit
+from telegram.error import NetworkError, RetryAfter, TelegramError, TimedOut
+
+from metrics import SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate            # Tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds until a token is available, 0 if one is available now"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class NotificationDispatcher:
+    def __init__(self, bot: Bot, global_rate: float = 25.0, private_chat_rate: float = 1.0,
+                 group_chat_rate: float = 20 / 60, coalesce_window: float = 0.5,
+                 max_retries: int = 5, backoff: float = 1.0, workers: int = 8):
+        self.bot = bot
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.coalesce_window = coalesce_window  # Seconds to wait for more alerts to the same chat
+        self.max_retries = max_retries
+        self.backoff = backoff                  # Base delay for exponential backoff, in seconds
+        self.worker_count = workers
+
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._pending: Dict[int, List[str]] = {}   # Messages waiting per chat
+        self._ready: Optional[asyncio.Queue] = None  # Chats whose coalesce window has passed
+        self._workers: List[asyncio.Task] = []
+        self._paused_until = 0.0
+        self._in_flight = 0
+
+        # Stats
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.failed = 0
+        self._send_times: Deque[float] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        """Alerts accepted but not yet sent"""
+        return sum(len(messages) for messages in self._pending.values())
+
+    def start(self):
+        """Start the sender workers on the running event loop"""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self, timeout: float = 10.0):
+        """Send what is queued, then stop the workers"""
+        if not self._workers:
+            return
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logger.warning(f"Dropping {self.queue_depth} unsent notification(s) on shutdown")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enqueue(self, chat_id: int, text: str):
+        """Queue a message; messages to one chat within the coalesce window are sent together"""
+        self.queued += 1
+        messages = self._pending.get(chat_id)
+        if messages is not None:
+            messages.append(text)
+            self.coalesced += 1
+            return
+
+        self._pending[chat_id] = [text]
+        asyncio.get_running_loop().call_later(self.coalesce_window, self._ready.put_nowait, chat_id)
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth and send throughput"""
+        self._trim_send_times()
+        return {
+            'queue_depth': self.queue_depth,
+            'queued': self.queued,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retried': self.retried,
+            'failed': self.failed,
+            'sent_per_second': len(self._send_times) / 60,
+        }
+
+    def _trim_send_times(self):
+        """Keep only the last minute of send timestamps"""
+        cutoff = time.monotonic() - 60
+        while self._send_times and self._send_times[0] < cutoff:
+            self._send_times.popleft()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative chat IDs are groups and channels, which have a lower limit
+            rate = self.group_chat_rate if chat_id < 0 else self.private_chat_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, 1)
+        return bucket
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            chat_id = await self._ready.get()
+
+            # Chat is over its limit - come back later, new alerts keep merging meanwhile
+            chat_delay = self._chat_bucket(chat_id).delay()
+            if chat_delay > 0:
+                loop.call_later(chat_delay, self._ready.put_nowait, chat_id)
+                continue
+
+            while True:
+                wait = max(self._global_bucket.delay(), self._paused_until - time.monotonic())
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._global_bucket.take()
+            self._chat_bucket(chat_id).take()
+
+            texts = self._split(self._pending.pop(chat_id))
+            if len(texts) > 1:
+                # Anything over the message size limit goes out on the next turn
+                self._pending[chat_id] = texts[1:]
+                self._ready.put_nowait(chat_id)
+
+            self._in_flight += 1
+            try:
+                await self._send(chat_id, texts[0])
+            finally:
+                self._in_flight -= 1
+
+    def _split(self, messages: List[str]) -> List[str]:
+        """Join messages into as few texts as fit in Telegram's message length limit"""
+        texts: List[str] = []
+        for message in messages:
+            if texts and len(texts[-1]) + len(message) + 2 <= MessageLimit.MAX_TEXT_LENGTH:
+                texts[-1] += "\n\n" + message
+            else:
+                texts.append(message)
+        return texts
+
+    async def _send(self, chat_id: int, text: str):
+        """Send one message, honouring RetryAfter and retrying network errors with backoff"""
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+                SEND_SECONDS.observe(time.perf_counter() - started, result='ok')
+                self.sent += 1
+                self._send_times.append(time.monotonic())
+                self._trim_send_times()
+                logger.info(f"Notification sent to {chat_id}: {text}")
+                return
+            except RetryAfter as e:
+                SEND_SECONDS.observe(time.perf_counter() - started, result='retry_after')
+                retry_after = getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)()
+                # Flood control applies to the whole bot, so pause every worker
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                logger.warning(f"Flood control, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+            except (TimedOut, NetworkError) as e:
+                SEND_SECONDS.observe(time.perf_counter() - started, result='network_error')
+                if attempt == self.max_retries:
+                    break
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning(f"Error sending Telegram message ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except TelegramError as e:
+                SEND_SECONDS.observe(time.perf_counter() - started, result='error')
+                logger.error(f"Error sending Telegram message: {e}")
+                break
+            except Exception as e:
+                SEND_SECONDS.observe(time.perf_counter() - started, result='error')
+                logger.error(f"Unexpected error sending notification: {e}")
+                break
+            self.retried += 1
+
+        self.failed += 1
+        logger.error(f"Giving up on notification to {chat_id}")
@@ -0,0 +1,249 @@
+"""
+Shared price snapshot cache
+Serves the latest price snapshot to the monitor loop and the bot commands so
+they don't each call the CoinGecko API on their own. Each snapshot is an
+immutable object replaced as a whole, so readers take the current one without
+a lock and always see prices and timestamps from the same fetch.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSnapshot:
+    """Prices from one fetch with their wall-clock and monotonic fetch times
+
+    Never changed once published, and neither is its prices dict.
+    """
+    __slots__ = ('version', 'prices', 'updated_at', 'fetched_at')
+
+    def __init__(self, version: int, prices: Optional[Dict[str, float]], updated_at: Optional[float],
+                 fetched_at: float):
+        set_field = object.__setattr__
+        set_field(self, 'version', version)         # Bumped for every new set of prices
+        set_field(self, 'prices', prices)
+        set_field(self, 'updated_at', updated_at)   # Wall-clock time of the prices
+        set_field(self, 'fetched_at', fetched_at)   # time.monotonic() they count as fetched at, for the TTL
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+EMPTY_SNAPSHOT = PriceSnapshot(0, None, None, float('-inf'))
+
+
+class PriceCache:
+    def __init__(self, loader: Callable[[], Optional[Dict[str, float]]],
+                 ttl: float, stale_ttl: float = 0.0,
+                 async_loader: Optional[Callable[[], Awaitable[Optional[Dict[str, float]]]]] = None):
+        self.loader = loader
+        self.async_loader = async_loader
+        self.ttl = ttl                  # Seconds a snapshot is considered fresh
+        self.stale_ttl = stale_ttl      # Extra seconds a stale snapshot may still be served
+
+        self._lock = threading.Lock()
+        self._refresh_done = threading.Condition(self._lock)
+        # Set while any refresh runs, from get() or aget(), so there is only ever one in flight
+        self._refreshing = False
+        self._async_refresh: Optional[asyncio.Task] = None
+        # Only ever replaced, under the lock; readers load it without one
+        self._snapshot = EMPTY_SNAPSHOT
+        self._last_result: Optional[Dict[str, float]] = None
+        # Called with (prices, updated_at) whenever the snapshot changes, e.g. to publish it
+        self.on_update: Optional[Callable[[Dict[str, float], float], None]] = None
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @property
+    def snapshot(self) -> PriceSnapshot:
+        """The current snapshot, without refreshing; one attribute load, no lock"""
+        return self._snapshot
+
+    @property
+    def updated_at(self) -> Optional[float]:
+        """Wall-clock time of the current snapshot; use snapshot to get it together with the prices"""
+        return self._snapshot.updated_at
+
+    def get(self) -> Optional[Dict[str, float]]:
+        """Return the cached snapshot, refreshing it if it is too old
+
+        Blocks while a refresh runs, and the blocking loader starts its own
+        event loop, so this must not be called from the event loop; use aget there.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            age = time.monotonic() - snapshot.fetched_at
+            if snapshot.prices is not None and age < self.ttl:
+                self.hits += 1
+                return snapshot.prices
+
+            if snapshot.prices is not None and age < self.ttl + self.stale_ttl:
+                # Serve the stale snapshot and revalidate in the background
+                self.stale_hits += 1
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, daemon=True).start()
+                return snapshot.prices
+
+            self.misses += 1
+            if self._refreshing:
+                # Another caller is already fetching - wait for its result
+                while self._refreshing:
+                    self._refresh_done.wait()
+                return self._last_result
+            self._refreshing = True
+
+        return self._refresh()
+
+    async def aget(self, allow_stale: bool = True) -> Optional[Dict[str, float]]:
+        """Async variant of get; concurrent callers on the loop share one refresh
+
+        With allow_stale=False a stale snapshot is treated as a miss, for callers
+        such as the monitor loop that must act on fresh prices.
+        """
+        # Fresh hits, the common case, only take the lock to count; get() may count from other threads
+        snapshot = self._snapshot
+        if snapshot.prices is not None and time.monotonic() - snapshot.fetched_at < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return snapshot.prices
+
+        with self._lock:
+            snapshot = self._snapshot
+            age = time.monotonic() - snapshot.fetched_at
+            if snapshot.prices is not None and age < self.ttl:
+                self.hits += 1
+                return snapshot.prices
+
+            if allow_stale and snapshot.prices is not None and age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if not self._refreshing:
+                    self._start_async_refresh()
+                return snapshot.prices
+
+            self.misses += 1
+            task = self._start_async_refresh()
+
+        # Shield so a cancelled caller doesn't cancel the refresh others wait on
+        return await asyncio.shield(task)
+
+    def peek(self) -> Optional[Dict[str, float]]:
+        """Return the current prices without refreshing or counting a hit"""
+        return self._snapshot.prices
+
+    def put(self, prices: Dict[str, float], updated_at: Optional[float] = None, stale: bool = False):
+        """Store a snapshot fetched elsewhere
+
+        A stale snapshot is served right away but revalidated on first use.
+        """
+        with self._lock:
+            self._publish(prices, updated_at if updated_at is not None else time.time(),
+                          time.monotonic() - (self.ttl if stale else 0.0))
+
+    def merge(self, prices: Dict[str, float]):
+        """Update some coins' prices, e.g. from a stream, keeping the snapshot's fetch time
+
+        The poll TTL still runs from the last full fetch, so coins that are not
+        in prices are fetched again on schedule.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            self._publish({**(snapshot.prices or {}), **prices}, time.time(), snapshot.fetched_at)
+
+    def invalidate(self):
+        """Mark the current snapshot as expired"""
+        with self._lock:
+            snapshot = self._snapshot
+            self._snapshot = PriceSnapshot(snapshot.version, snapshot.prices, snapshot.updated_at, float('-inf'))
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+            }
+
+    def _start_async_refresh(self) -> asyncio.Task:
+        """Return a task with the result of the in-flight refresh, starting one if needed; caller holds the lock"""
+        if self._async_refresh is None or self._async_refresh.done():
+            loop = asyncio.get_running_loop()
+            if self._refreshing:
+                # get() is refreshing on another thread, wait for its result instead of fetching again
+                self._async_refresh = loop.create_task(asyncio.to_thread(self._wait_for_refresh))
+            else:
+                self._refreshing = True
+                self._async_refresh = loop.create_task(self._arefresh())
+        return self._async_refresh
+
+    async def _arefresh(self) -> Optional[Dict[str, float]]:
+        """Run the async loader once, falling back to the blocking loader in a thread"""
+        try:
+            try:
+                if self.async_loader is not None:
+                    prices = await self.async_loader()
+                else:
+                    prices = await asyncio.to_thread(self.loader)
+            except Exception as e:
+                logger.error(f"Price cache refresh failed: {e}")
+                prices = None
+            return self._store(prices)
+        finally:
+            self._refresh_finished()
+
+    def _refresh(self) -> Optional[Dict[str, float]]:
+        """Run the loader once; callers must set self._refreshing first"""
+        try:
+            try:
+                prices = self.loader()
+            except Exception as e:
+                logger.error(f"Price cache refresh failed: {e}")
+                prices = None
+            return self._store(prices)
+        finally:
+            self._refresh_finished()
+
+    def _refresh_finished(self):
+        with self._lock:
+            self._refreshing = False
+            self._refresh_done.notify_all()
+
+    def _wait_for_refresh(self) -> Optional[Dict[str, float]]:
+        with self._lock:
+            while self._refreshing:
+                self._refresh_done.wait()
+            return self._last_result
+
+    def _store(self, prices: Optional[Dict[str, float]]) -> Optional[Dict[str, float]]:
+        """Record the outcome of a refresh"""
+        with self._lock:
+            self.refreshes += 1
+            if prices:
+                self._publish(prices, time.time(), time.monotonic())
+            else:
+                self.refresh_errors += 1
+            self._last_result = prices or None
+        return prices or None
+
+    def _publish(self, prices: Dict[str, float], updated_at: float, fetched_at: float):
+        """Swap in a new snapshot; caller holds the lock, so there is one writer at a time"""
+        self._snapshot = PriceSnapshot(self._snapshot.version + 1, prices, updated_at, fetched_at)
+        if self.on_update is not None:
+            try:
+                self.on_update(prices, updated_at)
+            except Exception as e:
+                # The snapshot is already published here; a failing subscriber must not fail put() or a fetch
+                logger.error(f"Price cache update callback failed: {e!r}")
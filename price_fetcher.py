@@ -0,0 +1,142 @@
+"""
+Async HTTP client for price APIs
+Shares one pooled keep-alive connection pool between all price requests so
+they don't block the Telegram event loop. Responses are revalidated with
+ETag / Last-Modified where the API supports it, and a body identical to the
+previous one is not parsed again.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Requests whose URL and last response are kept, least recently used dropped first. Price
+# batches reuse a few keys every tick; one-off lookups such as /watch would otherwise pile up
+MAX_CACHED_REQUESTS = 256
+
+
+class CachedResponse(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content: bytes
+    data: Any
+
+
+class PriceFetcher:
+    def __init__(self, timeout: float = 10.0, max_concurrency: int = 4, max_connections: int = 10):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Last response per request, for conditional requests and skipping unchanged bodies
+        self._responses: 'OrderedDict[Tuple, CachedResponse]' = OrderedDict()
+        # Encoding a long query string costs more than the request itself, so it is done once
+        self._urls: 'OrderedDict[Tuple, httpx.URL]' = OrderedDict()
+
+        # Counters
+        self.requests = 0
+        self.not_modified = 0       # 304 answers, the cached body was reused
+        self.unchanged = 0          # Full answers identical to the previous one, not parsed again
+        self.bytes_received = 0
+        self.bytes_saved = 0        # Body bytes a 304 answer did not have to send
+
+    def _new_client(self) -> httpx.AsyncClient:
+        """Create an HTTP client with keep-alive connection pooling"""
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET a JSON document using the shared client
+
+        An unchanged document is returned as the same object as last time, so
+        callers must not modify it.
+        """
+        if self._client is None:
+            self._client = self._new_client()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        key = (url, tuple(sorted(params.items())) if params else ())
+        request_url = self._urls.get(key)
+        if request_url is None:
+            request_url = self._urls[key] = httpx.URL(url, params=params)
+            if len(self._urls) > MAX_CACHED_REQUESTS:
+                self._urls.popitem(last=False)
+        else:
+            self._urls.move_to_end(key)
+        cached = self._responses.get(key)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        async with self._semaphore:
+            response = await self._client.get(request_url, headers=headers)
+        self.requests += 1
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            self.bytes_saved += len(cached.content)
+            if key in self._responses:
+                self._responses.move_to_end(key)
+            return cached.data
+        response.raise_for_status()
+
+        content = response.content
+        self.bytes_received += len(content)
+        if cached is not None and content == cached.content:
+            self.unchanged += 1
+            data = cached.data
+        else:
+            data = response.json()
+        self._responses[key] = CachedResponse(
+            response.headers.get('ETag'), response.headers.get('Last-Modified'), content, data
+        )
+        self._responses.move_to_end(key)
+        if len(self._responses) > MAX_CACHED_REQUESTS:
+            self._responses.popitem(last=False)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'requests': self.requests,
+            'not_modified': self.not_modified,
+            'unchanged': self.unchanged,
+            'bytes_received': self.bytes_received,
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def run_sync(self, fetch: Callable[['PriceFetcher'], Awaitable[T]]) -> T:
+        """Blocking wrapper for scripts without an event loop
+
+        Runs fetch with a short-lived fetcher, since the shared client belongs
+        to the loop it was created on.
+        """
+        async def fetch_once():
+            fetcher = PriceFetcher(self.timeout, self.max_concurrency, self.max_connections)
+            try:
+                return await fetch(fetcher)
+            finally:
+                await fetcher.aclose()
+
+        return asyncio.run(fetch_once())
+
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
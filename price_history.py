@@ -0,0 +1,207 @@
+"""
+On-disk price history
+Appends price changes to per-coin, fixed-width binary files and keeps
+1m/1h/1d OHLC rollups up to date as ticks arrive; a coin's price holds until
+its next record. Reads go through memory
+maps so asking for recent points never loads a whole file.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Raw ticks: epoch milliseconds + USD price, 16 bytes per record
+TICK_DTYPE = np.dtype([('ts', '<i8'), ('price', '<f8')])
+# Rollups: bucket start in epoch milliseconds + OHLC, 40 bytes per record
+ROLLUP_DTYPE = np.dtype([('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8')])
+
+ROLLUPS = {
+    '1m': 60_000,
+    '1h': 3_600_000,
+    '1d': 86_400_000,
+}
+
+# Resolutions pruned by the retention setting; 1h and 1d rollups are small and kept
+PRUNED_RESOLUTIONS = ('raw', '1m')
+COMPACT_EVERY = 3600  # Seconds between retention passes
+# Append descriptors kept open, least recently used closed first; thousands of coins
+# would otherwise need a descriptor per coin and resolution
+MAX_OPEN_FILES = 128
+
+
+class PriceHistory:
+    def __init__(self, directory: str, retention_days: Optional[float] = None):
+        self.directory = directory
+        self.retention_days = retention_days
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Append-only descriptors per (coin, resolution), least recently used first
+        self._files: 'OrderedDict[Tuple[str, str], int]' = OrderedDict()
+        # Open rollup bucket per (coin, resolution): [bucket_start, open, high, low, close]
+        self._buckets: Dict[Tuple[str, str], list] = {}
+        self._last_compact = float('-inf')
+
+    def append(self, prices: Dict[str, float], timestamp: Optional[float] = None):
+        """Append one snapshot; timestamp is epoch seconds, defaults to now"""
+        ts = int((timestamp if timestamp is not None else time.time()) * 1000)
+        with self._lock:
+            for coin, price in prices.items():
+                record = np.array([(ts, price)], dtype=TICK_DTYPE)
+                os.write(self._file(coin, 'raw'), record.tobytes())
+                for resolution in ROLLUPS:
+                    self._update_rollup(coin, resolution, ts, price)
+
+            if self.retention_days and time.monotonic() - self._last_compact > COMPACT_EVERY:
+                self._last_compact = time.monotonic()
+                self._compact(ts - int(self.retention_days * 86_400_000))
+
+    def last(self, coin: str, n: int, resolution: str = 'raw') -> np.ndarray:
+        """Return the last n records for a coin, oldest first"""
+        data = self._map(coin, resolution)
+        return np.array(data[-n:]) if n > 0 else data[:0].copy()
+
+    def range(self, coin: str, start: float, end: Optional[float] = None,
+              resolution: str = 'raw', include_open: bool = False) -> np.ndarray:
+        """Return records with start <= timestamp < end (epoch seconds)
+
+        include_open adds the rollup bucket still being filled, which is only
+        written to disk once it closes.
+        """
+        data = self._map(coin, resolution)
+        timestamps = data['ts']
+        lo = np.searchsorted(timestamps, int(start * 1000), side='left')
+        hi = len(data) if end is None else np.searchsorted(timestamps, int(end * 1000), side='left')
+        records = np.array(data[lo:hi])
+
+        if include_open and resolution != 'raw':
+            with self._lock:
+                bucket = self._buckets.get((coin, resolution))
+                bucket = tuple(bucket) if bucket is not None else None
+            in_range = (bucket is not None and bucket[0] >= int(start * 1000)
+                        and (end is None or bucket[0] < int(end * 1000)))
+            if in_range and (not len(records) or records['ts'][-1] < bucket[0]):
+                records = np.concatenate([records, np.array([bucket], dtype=ROLLUP_DTYPE)])
+        return records
+
+    def close(self):
+        """Write out open rollup buckets and close files"""
+        with self._lock:
+            for (coin, resolution), bucket in self._buckets.items():
+                self._write_rollup(coin, resolution, bucket)
+            self._buckets.clear()
+            for fd in self._files.values():
+                os.close(fd)
+            self._files.clear()
+
+    def _path(self, coin: str, resolution: str) -> str:
+        safe_coin = re.sub(r'[^A-Za-z0-9_-]', '_', coin)
+        suffix = '' if resolution == 'raw' else f".{resolution}"
+        return os.path.join(self.directory, f"{safe_coin}{suffix}.bin")
+
+    def _file(self, coin: str, resolution: str) -> int:
+        """Append descriptor for a series file; records are written unbuffered, so readers see them at once"""
+        key = (coin, resolution)
+        fd = self._files.get(key)
+        if fd is not None:
+            self._files.move_to_end(key)
+            return fd
+
+        while len(self._files) >= MAX_OPEN_FILES:
+            os.close(self._files.popitem(last=False)[1])
+        # os.open rather than open(): with thousands of coins descriptors are reopened every append
+        fd = self._files[key] = os.open(self._path(coin, resolution), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return fd
+
+    def _map(self, coin: str, resolution: str) -> np.ndarray:
+        """Memory-map a series file, only whole records are mapped"""
+        dtype = TICK_DTYPE if resolution == 'raw' else ROLLUP_DTYPE
+        if resolution != 'raw' and resolution not in ROLLUPS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+
+        path = self._path(coin, resolution)
+        try:
+            count = os.path.getsize(path) // dtype.itemsize
+        except FileNotFoundError:
+            count = 0
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def _update_rollup(self, coin: str, resolution: str, ts: int, price: float):
+        width = ROLLUPS[resolution]
+        bucket_start = ts - ts % width
+        bucket = self._buckets.get((coin, resolution))
+
+        if bucket is None:
+            bucket = self._resume_bucket(coin, resolution, bucket_start)
+        elif bucket[0] != bucket_start:
+            self._write_rollup(coin, resolution, bucket)
+            bucket = None
+
+        if bucket is None:
+            self._buckets[(coin, resolution)] = [bucket_start, price, price, price, price]
+        else:
+            bucket[2] = max(bucket[2], price)
+            bucket[3] = min(bucket[3], price)
+            bucket[4] = price
+            self._buckets[(coin, resolution)] = bucket
+
+    def _resume_bucket(self, coin: str, resolution: str, bucket_start: int) -> Optional[list]:
+        """Rebuild a bucket left open by a restart from the raw ticks already on disk"""
+        rollups = self._map(coin, resolution)
+        if len(rollups) and rollups['ts'][-1] == bucket_start:
+            # close() wrote this bucket while it was still open - replace it
+            path = self._path(coin, resolution)
+            del rollups
+            os.truncate(path, os.path.getsize(path) - ROLLUP_DTYPE.itemsize)
+
+        ticks = self._map(coin, 'raw')
+        if not len(ticks):
+            return None
+        ticks = ticks[np.searchsorted(ticks['ts'], bucket_start):]
+        if not len(ticks):
+            return None
+        prices = ticks['price']
+        return [bucket_start, float(prices[0]), float(prices.max()), float(prices.min()), float(prices[-1])]
+
+    def _write_rollup(self, coin: str, resolution: str, bucket: list):
+        record = np.array([tuple(bucket)], dtype=ROLLUP_DTYPE)
+        os.write(self._file(coin, resolution), record.tobytes())
+
+    def _compact(self, cutoff_ts: int):
+        """Drop records older than cutoff_ts, rewriting files atomically"""
+        # File names are sanitized coin IDs, so open descriptors are found by path, not by the parsed name
+        open_keys = {self._path(coin, resolution): (coin, resolution) for coin, resolution in self._files}
+        for entry in os.listdir(self.directory):
+            if not entry.endswith('.bin'):
+                continue
+            name = entry[:-4]
+            coin, _, resolution = name.partition('.')
+            resolution = resolution or 'raw'
+            if resolution not in PRUNED_RESOLUTIONS:
+                continue
+
+            data = self._map(coin, resolution)
+            keep_from = int(np.searchsorted(data['ts'], cutoff_ts)) if len(data) else 0
+            if keep_from == 0:
+                continue
+
+            path = self._path(coin, resolution)
+            fd = self._files.pop(open_keys.get(path), None)
+            if fd is not None:
+                os.close(fd)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(np.asarray(data[keep_from:]).tobytes())
+            del data
+            os.replace(tmp_path, path)
+            logger.info(f"Pruned {keep_from} old {resolution} records for {coin}")
@@ -0,0 +1,364 @@
+"""
+Price providers
+Interchangeable price sources plus a hedged provider that fails over between
+them, so a slow or broken API doesn't cost a monitoring tick.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from metrics import FETCH_BATCH_SECONDS, FETCH_ERRORS, FETCH_SECONDS
+from price_fetcher import PriceFetcher
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult(NamedTuple):
+    size: int
+    seconds: float
+    error: str = ''     # Empty when the batch succeeded
+
+
+def _pack(sizes: List[int], max_items: float, max_chars: float) -> List[int]:
+    """Greedily fill batches up to the limits, returns the index each batch starts at"""
+    starts, count, chars = [0], 0, 0
+    for i, size in enumerate(sizes):
+        if count and (count + 1 > max_items or chars + size > max_chars):
+            starts.append(i)
+            count, chars = 0, 0
+        count += 1
+        chars += size
+    return starts
+
+
+def split_batches(items: List[str], max_items: int, max_chars: int, separator_chars: int = 1) -> List[List[str]]:
+    """Split items into as few batches as the limits allow, with similar sizes
+
+    Equal batches fetched in parallel finish at about the same time, so the
+    slowest one doesn't hold up the snapshot.
+    """
+    if not items:
+        return []
+    sizes = [len(item) + separator_chars for item in items]
+    # Greedy packing gives the fewest batches; then tighten both limits as far
+    # as possible without needing another batch, which evens out the sizes
+    count = len(_pack(sizes, max_items, max_chars))
+    low, high = 0.0, 1.0
+    for _ in range(12):
+        scale = (low + high) / 2
+        if len(_pack(sizes, max(1.0, max_items * scale), max_chars * scale)) <= count:
+            high = scale
+        else:
+            low = scale
+    starts = _pack(sizes, max(1.0, max_items * high), max_chars * high) + [len(items)]
+    return [items[start:end] for start, end in zip(starts, starts[1:])]
+
+
+class PriceProvider:
+    """Base class: fetch USD prices keyed by CoinGecko ID"""
+
+    name = 'provider'
+
+    async def fetch(self, http: PriceFetcher, coin_ids: List[str]) -> Dict[str, float]:
+        raise NotImplementedError
+
+
+class BatchedPriceProvider(PriceProvider):
+    """Provider whose API takes a list of coins per request; long lists are fetched in parallel batches"""
+
+    # Characters a separator adds to the URL: the comma is sent as %2C
+    separator_chars = 3
+
+    def __init__(self, batch_size: int = 250, batch_chars: int = 4000):
+        self.batch_size = batch_size      # Max coins per request
+        self.batch_chars = batch_chars    # Max URL characters of coin keys per request
+        self.last_batches: List[BatchResult] = []
+        self._batched_keys: List[str] = []     # The coin list is usually the same every tick
+        self._batches: List[List[str]] = []
+
+    async def fetch_batch(self, http: PriceFetcher, keys: List[str]) -> Dict[str, float]:
+        raise NotImplementedError
+
+    async def fetch_batches(self, http: PriceFetcher, keys: List[str]) -> Dict[str, float]:
+        """Fetch keys in batches at the fetcher's concurrency and merge what came back
+
+        A failed batch only loses its own coins; if every batch fails the
+        first error is raised.
+        """
+        if keys != self._batched_keys:
+            self._batches = split_batches(keys, self.batch_size, self.batch_chars, self.separator_chars)
+            self._batched_keys = list(keys)
+        batches = self._batches
+        results = [None] * len(batches)
+        queued = iter(enumerate(batches))
+
+        async def worker():
+            # One request per worker at a time, so batch timings don't include queueing
+            for i, batch in queued:
+                results[i] = await self._timed_batch(http, batch)
+
+        await asyncio.gather(*(worker() for _ in range(min(http.max_concurrency, len(batches)))))
+
+        self.last_batches = [result for result, _, _ in results]
+        prices: Dict[str, float] = {}
+        errors = []
+        for result, data, error in results:
+            if error is None:
+                prices.update(data)
+            else:
+                errors.append(error)
+
+        if errors and len(errors) == len(batches):
+            raise errors[0]
+        if errors:
+            logger.warning(f"{self.name}: {len(errors)} of {len(batches)} batches failed, "
+                           f"first error: {errors[0]!r}")
+        if len(batches) > 1:
+            logger.debug(f"{self.name}: {len(prices)} prices from {len(batches)} batches, slowest "
+                         f"{max(result.seconds for result in self.last_batches) * 1000:.0f} ms")
+        return prices
+
+    async def _timed_batch(self, http: PriceFetcher,
+                           keys: List[str]) -> Tuple[BatchResult, Optional[Dict[str, float]], Optional[Exception]]:
+        started = time.monotonic()
+        try:
+            data = await self.fetch_batch(http, keys)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            elapsed = time.monotonic() - started
+            FETCH_BATCH_SECONDS.observe(elapsed, provider=self.name, result='error')
+            return BatchResult(len(keys), elapsed, repr(e)), None, e
+        elapsed = time.monotonic() - started
+        FETCH_BATCH_SECONDS.observe(elapsed, provider=self.name, result='ok')
+        return BatchResult(len(keys), elapsed), data, None
+
+
+class CoinGeckoProvider(BatchedPriceProvider):
+    name = 'coingecko'
+
+    def __init__(self, api_url: str, batch_size: int = 250, batch_chars: int = 4000):
+        super().__init__(batch_size, batch_chars)
+        self.api_url = api_url
+
+    async def fetch(self, http: PriceFetcher, coin_ids: List[str]) -> Dict[str, float]:
+        return await self.fetch_batches(http, coin_ids)
+
+    async def fetch_batch(self, http: PriceFetcher, coin_ids: List[str]) -> Dict[str, float]:
+        data = await http.get_json(self.api_url, {'ids': ','.join(coin_ids), 'vs_currencies': 'usd'})
+        return {
+            coin_id: quote['usd']
+            for coin_id, quote in data.items()
+            if isinstance(quote, dict) and 'usd' in quote
+        }
+
+
+class BinanceProvider(BatchedPriceProvider):
+    """Binance spot tickers; USDT pairs are used as USD prices"""
+
+    name = 'binance'
+    # Each pair is sent quoted inside a JSON list: %22BTCUSDT%22%2C
+    separator_chars = 9
+
+    def __init__(self, api_url: str, symbols: Dict[str, str], batch_size: int = 250, batch_chars: int = 4000):
+        super().__init__(batch_size, batch_chars)
+        self.api_url = api_url
+        self.symbols = symbols  # CoinGecko ID -> Binance pair, e.g. 'bitcoin' -> 'BTCUSDT'
+
+    async def fetch(self, http: PriceFetcher, coin_ids: List[str]) -> Dict[str, float]:
+        pairs = {self.symbols[coin_id]: coin_id for coin_id in coin_ids if coin_id in self.symbols}
+        if not pairs:
+            return {}
+
+        prices = await self.fetch_batches(http, sorted(pairs))
+        return {pairs[pair]: price for pair, price in prices.items() if pair in pairs}
+
+    async def fetch_batch(self, http: PriceFetcher, pairs: List[str]) -> Dict[str, float]:
+        data = await http.get_json(self.api_url, {'symbols': json.dumps(pairs, separators=(',', ':'))})
+        return {item['symbol']: float(item['price']) for item in data if 'symbol' in item}
+
+
+class ReplayProvider(PriceProvider):
+    """Replays snapshots from a JSON-lines file of {coingecko_id: price}, for tests and offline runs"""
+
+    name = 'replay'
+
+    def __init__(self, path: str, latency: float = 0.0, loop: bool = True):
+        self.path = path
+        self.latency = latency
+        self.loop = loop
+        with open(path) as f:
+            self.snapshots = [json.loads(line) for line in f if line.strip()]
+        self.position = 0
+
+    async def fetch(self, http: PriceFetcher, coin_ids: List[str]) -> Dict[str, float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.position >= len(self.snapshots):
+            if not self.loop or not self.snapshots:
+                raise EOFError(f"Replay file {self.path} exhausted")
+            self.position = 0
+
+        snapshot = self.snapshots[self.position]
+        self.position += 1
+        return {coin_id: float(snapshot[coin_id]) for coin_id in coin_ids if coin_id in snapshot}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout    # Seconds to stay open before allowing a trial call
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def available(self) -> bool:
+        """Whether allow() would let a call through, without taking the trial slot"""
+        if self.state == 'open':
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return self.state == 'closed'
+
+    def allow(self) -> bool:
+        """Whether a call may go through; an open breaker lets one trial call through after reset_timeout
+
+        Only call this right before making the call: a half-open breaker admits
+        no other call until the trial is recorded as a success, failure or cancellation.
+        """
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+            return True
+        return self.state == 'closed'
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+
+    def record_cancelled(self):
+        """A trial call was abandoned before it finished - allow another one"""
+        if self.state == 'half_open':
+            self.state = 'open'
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failure(s)")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+
+class HedgedPriceProvider(PriceProvider):
+    """Asks providers in order, starting the next one if the current one is slower than its p95"""
+
+    name = 'hedged'
+
+    def __init__(self, providers: List[PriceProvider], default_hedge_delay: float = 2.0,
+                 min_samples: int = 20):
+        self.providers = providers
+        self.default_hedge_delay = default_hedge_delay  # Used until a provider has enough samples
+        self.min_samples = min_samples
+        self.breakers = {provider.name: CircuitBreaker(provider.name) for provider in providers}
+        self.latencies: Dict[str, Deque[float]] = {provider.name: deque(maxlen=200) for provider in providers}
+        self.wins = {provider.name: 0 for provider in providers}
+        self.hedges = 0
+
+    def hedge_delay(self, provider: PriceProvider) -> float:
+        """p95 latency of a provider's recent successful calls"""
+        samples = self.latencies[provider.name]
+        if len(samples) < self.min_samples:
+            return self.default_hedge_delay
+        ordered = sorted(samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def health(self) -> Dict[str, Dict]:
+        """Per-provider breaker state, p95 latency and wins"""
+        return {
+            provider.name: {
+                'state': self.breakers[provider.name].state,
+                'failures': self.breakers[provider.name].failures,
+                'p95': self.hedge_delay(provider),
+                'wins': self.wins[provider.name],
+            }
+            for provider in self.providers
+        }
+
+    async def fetch(self, http: PriceFetcher, coin_ids: List[str]) -> Dict[str, float]:
+        candidates = [p for p in self.providers if self.breakers[p.name].available()]
+        # Every breaker is open - better to try anyway than to skip the tick
+        forced = not candidates
+        if forced:
+            candidates = list(self.providers)
+
+        pending: Dict[asyncio.Task, PriceProvider] = {}
+        errors: List[str] = []
+
+        def start_next() -> Optional[PriceProvider]:
+            while candidates:
+                provider = candidates.pop(0)
+                # Asked only now, so a half-open breaker's one trial is a call that is really made
+                if forced or self.breakers[provider.name].allow():
+                    pending[asyncio.ensure_future(self._timed_fetch(provider, http, coin_ids))] = provider
+                    return provider
+            return None
+
+        try:
+            last_started = start_next()
+            while pending:
+                # Wait for an answer, or until the newest request is slower than its p95
+                timeout = self.hedge_delay(last_started) if candidates else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    last_started = start_next() or last_started
+                    continue
+
+                for task in done:
+                    finished = pending.pop(task)
+                    try:
+                        prices = task.result()
+                    except Exception as e:
+                        errors.append(f"{finished.name}: {e!r}")
+                        continue
+                    if prices:
+                        self.wins[finished.name] += 1
+                        return prices
+                    errors.append(f"{finished.name}: empty response")
+
+                # Everything in flight failed - fail over right away
+                if not pending and candidates:
+                    last_started = start_next() or last_started
+        finally:
+            for task, provider in pending.items():
+                task.cancel()
+                # A task cancelled before it ran never sees the CancelledError, so release its trial here
+                self.breakers[provider.name].record_cancelled()
+
+        raise RuntimeError(f"All price providers failed ({'; '.join(errors)})")
+
+    async def _timed_fetch(self, provider: PriceProvider, http: PriceFetcher,
+                           coin_ids: List[str]) -> Dict[str, float]:
+        breaker = self.breakers[provider.name]
+        started = time.monotonic()
+        try:
+            prices = await provider.fetch(http, coin_ids)
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        except Exception:
+            breaker.record_failure()
+            FETCH_ERRORS.inc(provider=provider.name)
+            raise
+        if not prices:
+            # e.g. none of the coins are listed on this provider - not a health problem, nor a passed trial
+            breaker.record_cancelled()
+            return prices
+        breaker.record_success()
+        elapsed = time.monotonic() - started
+        self.latencies[provider.name].append(elapsed)
+        FETCH_SECONDS.observe(elapsed, provider=provider.name)
+        return prices
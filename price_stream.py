@@ -0,0 +1,162 @@
+"""
+Streaming price feed
+Keeps a WebSocket connection to an exchange ticker stream and hands batched
+ticks to the monitor as they arrive, so short spikes are seen between polls.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (latest, peaks): the last and the highest price per coin since the previous call
+PricesCallback = Callable[[Dict[str, float], Dict[str, float]], Awaitable[None]]
+
+
+class PriceStream:
+    def __init__(self, url: str, symbols: Dict[str, str], on_prices: PricesCallback,
+                 debounce: float = 0.25, heartbeat: float = 20.0, idle_timeout: float = 60.0,
+                 max_backoff: float = 30.0):
+        self.url = url
+        self.symbols = symbols              # Exchange symbol -> coin name, e.g. 'BTCUSDT' -> 'bitcoin'
+        self.on_prices = on_prices
+        self.debounce = debounce            # Min seconds between two on_prices calls
+        self.heartbeat = heartbeat          # Ping interval; the connection is dropped if a ping goes unanswered
+        self.idle_timeout = idle_timeout    # Reconnect if no message arrives for this long
+        self.max_backoff = max_backoff
+
+        self._tasks = []
+        self._wake: Optional[asyncio.Event] = None
+        # Ticks received since the last on_prices call, merged per coin
+        self._latest: Dict[str, float] = {}
+        self._peaks: Dict[str, float] = {}
+        self._last_dispatch = float('-inf')
+
+        # Feed metrics
+        self.connects = 0
+        self.ticks = 0
+        self.conflated = 0
+        self.dispatches = 0
+        self.callback_errors = 0
+        self.last_tick_at = float('-inf')
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        """Connect and start delivering prices on the running event loop"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [loop.create_task(self._read_loop()), loop.create_task(self._dispatch_loop())]
+
+    async def stop(self):
+        """Disconnect; ticks not yet delivered are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, float]:
+        """Return feed metrics"""
+        return {
+            'connects': self.connects,
+            'ticks': self.ticks,
+            'conflated': self.conflated,
+            'dispatches': self.dispatches,
+            'callback_errors': self.callback_errors,
+            'last_tick_age': time.monotonic() - self.last_tick_at,
+        }
+
+    async def _read_loop(self):
+        # Imported here, so runs without streaming don't pay for websockets at startup
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import WebSocketException
+
+        backoff = 1.0
+        while True:
+            try:
+                async with connect(self.url, ping_interval=self.heartbeat, ping_timeout=self.heartbeat,
+                                   open_timeout=10) as ws:
+                    self.connects += 1
+                    backoff = 1.0
+                    logger.info(f"Price stream connected ({len(self.symbols)} symbols)")
+                    while True:
+                        message = await asyncio.wait_for(ws.recv(), self.idle_timeout)
+                        self._handle(message)
+            except asyncio.TimeoutError:
+                logger.warning(f"No price ticks for {self.idle_timeout:.0f}s, reconnecting")
+            except (OSError, WebSocketException) as e:
+                logger.warning(f"Price stream disconnected: {e!r}")
+            except Exception:
+                # Anything else must not end streaming for good: log it and reconnect
+                logger.exception("Price stream failed, reconnecting")
+
+            # Exponential backoff with jitter so restarts don't reconnect in lockstep
+            await asyncio.sleep(random.uniform(backoff / 2, backoff))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _handle(self, message):
+        """Parse a ticker message and merge it into the pending batch
+
+        Accepts Binance combined-stream messages ({"stream", "data"}) or bare
+        payloads, either one ticker or a list. Ticker ('c') and trade ('p')
+        prices are both understood.
+        """
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            logger.warning("Ignoring malformed price stream message")
+            return
+
+        data = payload.get('data', payload) if isinstance(payload, dict) else payload
+        for item in data if isinstance(data, list) else [data]:
+            if not isinstance(item, dict) or not isinstance(item.get('s'), str):
+                continue
+            coin = self.symbols.get(item['s'])
+            try:
+                price = float(item.get('c', item.get('p')))
+            except (TypeError, ValueError):
+                continue
+            if coin is None or not math.isfinite(price):
+                continue
+
+            self.ticks += 1
+            if coin in self._latest:
+                self.conflated += 1
+            self._latest[coin] = price
+            # Keep the peak, so a spike that reverts before the next delivery still counts
+            if price > self._peaks.get(coin, float('-inf')):
+                self._peaks[coin] = price
+
+        self.last_tick_at = time.monotonic()
+        if self._latest:
+            self._wake.set()
+
+    async def _dispatch_loop(self):
+        # Ticks arriving while on_prices runs are merged into one batch, so a slow
+        # consumer costs resolution, never unbounded memory or reader stalls
+        while True:
+            await self._wake.wait()
+            wait = self._last_dispatch + self.debounce - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            self._wake.clear()
+            latest, peaks = self._latest, self._peaks
+            self._latest, self._peaks = {}, {}
+            self._last_dispatch = time.monotonic()
+
+            self.dispatches += 1
+            try:
+                await self.on_prices(latest, peaks)
+            except Exception as e:
+                self.callback_errors += 1
+                logger.error(f"Error handling streamed prices: {e}")
@@ -70,22 +70,26 @@ CHECK_INTERVAL_MINUTES={interval}
 def show_current_config():
     """Show current cryptocurrency configuration"""
     try:
-        from config import CRYPTO_CONFIG
+        # Same file and validation the running bot uses
+        from coin_config import load_config
+        from fx_rates import format_money
+        config = load_config()
         
         print("\n📊 Current Cryptocurrency Configuration:")
         print("=" * 50)
         
-        for coin_name, config in CRYPTO_CONFIG.items():
-            symbol = config['symbol']
-            realistic = config['realistic_price']
-            optimistic = config['optimistic_price']
-            
-            print(f"{symbol:6} | Realistic: ${realistic:>8,.0f} | Optimistic: ${optimistic:>8,.0f}")
+        for coin in config.coins.values():
+            print(f"{coin.symbol:6} | Realistic: {format_money(coin.realistic_price, coin.currency, True):>9} | "
+                  f"Optimistic: {format_money(coin.optimistic_price, coin.currency, True):>9}")
         
-        print("\n💡 Edit config.py to change these targets")
+        for rule in config.rules:
+            coin = config.coins[rule.coin]
+            print(f"{coin.symbol:6} | Rule: {rule.describe(coin.currency)}")
         
-    except ImportError:
-        print("❌ Could not load configuration")
+        print(f"\n💡 Edit {config.path} to change these targets, the running bot picks up changes")
+        
+    except (ImportError, OSError, ValueError) as e:
+        print(f"❌ Could not load configuration: {e}")
 
 
 def main():
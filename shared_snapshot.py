@@ -0,0 +1,148 @@
+"""
+Price snapshot shared between processes
+The leader process writes each new price snapshot into a memory-mapped file;
+webhook worker processes read it without any IPC round trip. A sequence
+counter (seqlock) lets readers detect and retry torn reads. The exchange
+rate table is shared the same way through a second file.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fx_rates import FxRates
+from price_cache import EMPTY_SNAPSHOT, PriceSnapshot
+
+# seq (u64, odd while a write is in progress), then updated_at (f64) and payload length (u32)
+SEQ = struct.Struct('<Q')
+HEADER = struct.Struct('<QdI')
+BODY = struct.Struct('<dI')
+PAYLOAD_OFFSET = 24
+DEFAULT_SIZE = 1 << 20
+
+
+class SharedSnapshot:
+    def __init__(self, path: str, create: bool = False, size: int = DEFAULT_SIZE):
+        self.path = path
+        if create:
+            with open(path, 'wb') as f:
+                f.truncate(size)
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self.capacity = len(self._map) - PAYLOAD_OFFSET
+
+        self._write_lock = threading.Lock()
+        # Last snapshot read, returned as the same object until the sequence moves
+        self._read_seq = 0
+        self._snapshot = EMPTY_SNAPSHOT
+
+    @property
+    def version(self) -> int:
+        return SEQ.unpack_from(self._map)[0]
+
+    def write(self, prices: Dict[str, float], updated_at: Optional[float]):
+        """Publish a snapshot; safe to call from any thread of the writing process"""
+        payload = json.dumps(prices, separators=(',', ':')).encode()
+        if len(payload) > self.capacity:
+            raise ValueError(f"Snapshot of {len(payload)} bytes exceeds shared capacity {self.capacity}")
+
+        with self._write_lock:
+            seq = self.version
+            SEQ.pack_into(self._map, 0, seq + 1)
+            BODY.pack_into(self._map, SEQ.size, math.nan if updated_at is None else updated_at, len(payload))
+            self._map[PAYLOAD_OFFSET:PAYLOAD_OFFSET + len(payload)] = payload
+            SEQ.pack_into(self._map, 0, seq + 2)
+
+    def read(self) -> Tuple[Optional[Dict[str, float]], Optional[float]]:
+        """Return (prices, updated_at) of the latest snapshot, (None, None) before the first write"""
+        snapshot = self.read_snapshot()
+        return snapshot.prices, snapshot.updated_at
+
+    def read_snapshot(self) -> PriceSnapshot:
+        """Return the latest snapshot as one immutable object"""
+        for _ in range(1000):
+            seq, updated_at, length = HEADER.unpack_from(self._map)
+            if seq == self._read_seq:
+                break
+            if seq & 1:
+                # Writer is mid-update
+                time.sleep(0)
+                continue
+            payload = self._map[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length]
+            if SEQ.unpack_from(self._map)[0] != seq:
+                continue
+            self._read_seq = seq
+            # Always fresh to TTL checks: the leader decides when prices are refreshed
+            self._snapshot = PriceSnapshot(seq // 2, json.loads(payload),
+                                           None if math.isnan(updated_at) else updated_at, float('inf'))
+            break
+        return self._snapshot
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def unlink(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotPriceCache:
+    """Read-only stand-in for PriceCache in processes that don't fetch prices themselves"""
+
+    def __init__(self, shared: SharedSnapshot):
+        self.shared = shared
+
+    @property
+    def snapshot(self) -> PriceSnapshot:
+        return self.shared.read_snapshot()
+
+    @property
+    def updated_at(self) -> Optional[float]:
+        return self.shared.read()[1]
+
+    def peek(self) -> Optional[Dict[str, float]]:
+        return self.shared.read()[0]
+
+    def get(self) -> Optional[Dict[str, float]]:
+        return self.peek()
+
+    async def aget(self, allow_stale: bool = True) -> Optional[Dict[str, float]]:
+        return self.peek()
+
+    def stats(self) -> Dict[str, int]:
+        return {'version': self.shared.version}
+
+
+class SnapshotFxRates(FxRates):
+    """Read-only stand-in for FxRates in processes that take the leader's exchange rates"""
+
+    def __init__(self, shared: SharedSnapshot):
+        super().__init__(url='')
+        self.shared = shared
+        self._shared_version = 0
+
+    async def ensure_fresh(self, http, currencies):
+        self.sync()
+
+    async def refresh(self, http) -> bool:
+        return self.sync()
+
+    def sync(self) -> bool:
+        """Take over the latest published table, returns False if there is no newer one"""
+        snapshot = self.shared.read_snapshot()
+        if snapshot.prices is None or snapshot.version == self._shared_version:
+            return False
+        self._shared_version = snapshot.version
+        self.rates = snapshot.prices
+        self.updated_at = snapshot.updated_at
+        self.version += 1
+        self.refreshes += 1
+        return True
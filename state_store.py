@@ -0,0 +1,51 @@
+"""
+Checkpoint store for monitor state
+Saves alert flags and the last price snapshot to a small JSON file with
+atomic writes so a restart picks up where the previous process left off.
+"""
+
+import json
+import os
+import logging
+import tempfile
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+
+class StateStore:
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, state: Dict[str, Any]):
+        """Write state to a temporary file and atomically replace the checkpoint"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.state-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                # dumps uses the C encoder, dump the much slower pure Python one
+                f.write(json.dumps({'version': STATE_VERSION, **state}, separators=(',', ':')))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Return the saved state, or None if there is no usable checkpoint"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable state file {self.path}: {e}")
+            return None
+
+        if state.get('version') != STATE_VERSION:
+            logger.warning(f"Ignoring state file with unsupported version {state.get('version')}")
+            return None
+        return state
@@ -0,0 +1,96 @@
+"""
+Status message renderer
+Builds the HTML status message shared by /status and the monitor's status
+updates. Per-coin fragments are cached by (price, targets), so only coins whose
+price moved are re-rendered and an unchanged snapshot is served from memory.
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from fx_rates import format_money
+from metrics import RENDER_SECONDS
+
+STATUS_HEADER = "📊 <b>Current Crypto Status</b>\n\n"
+
+FragmentKey = Tuple[float, float, float]
+
+
+class StatusRenderer:
+    def __init__(self, crypto_config: Dict[str, Dict]):
+        self.crypto_config = crypto_config
+        self._fragments: Dict[str, Tuple[FragmentKey, str]] = {}
+        self._footer_at: Optional[float] = None
+        self._footer_text = ''
+
+        # Last assembled message and the snapshot it was built from
+        self._prices: Optional[Dict[str, float]] = None
+        self._updated_at: Optional[float] = None
+        self._message: Optional[str] = None
+        self._body = ''
+
+        self.hits = 0
+        self.fragments_rendered = 0
+
+    def render(self, prices: Dict[str, float], updated_at: Optional[float] = None) -> str:
+        """Return the status message for a snapshot; updated_at is epoch seconds, defaults to now"""
+        started = time.perf_counter()
+        # The price cache hands out the same dict until it refreshes
+        if prices is self._prices and updated_at == self._updated_at and updated_at is not None:
+            self.hits += 1
+            RENDER_SECONDS.observe(time.perf_counter() - started, message='status')
+            return self._message
+
+        parts = [STATUS_HEADER]
+        for coin_name, current_price in prices.items():
+            config = self.crypto_config.get(coin_name)
+            if config is None:
+                continue
+            parts.append(self._fragment(coin_name, config, current_price))
+
+        self._prices, self._updated_at = prices, updated_at
+        self._body = ''.join(parts)
+        self._message = self._body + self._footer(updated_at)
+        RENDER_SECONDS.observe(time.perf_counter() - started, message='status')
+        return self._message
+
+    @property
+    def body(self) -> str:
+        """The last rendered message without its timestamp footer"""
+        return self._body
+
+    def _fragment(self, coin_name: str, config: Dict, current_price: float) -> str:
+        realistic_price = config['realistic_price']
+        optimistic_price = config['optimistic_price']
+        key = (current_price, realistic_price, optimistic_price)
+        cached = self._fragments.get(coin_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # Calculate percentage to targets
+        realistic_pct = (current_price - realistic_price) / realistic_price * 100
+        optimistic_pct = (current_price - optimistic_price) / optimistic_price * 100
+
+        # Status indicators
+        realistic_status = "✅" if current_price >= realistic_price else f"📈 {realistic_pct:+.1f}%"
+        optimistic_status = "✅" if current_price >= optimistic_price else f"📈 {optimistic_pct:+.1f}%"
+
+        currency = config.get('currency', 'usd')
+        fragment = (
+            f"<b>{config['symbol']}</b> - {format_money(current_price, currency)}\n"
+            f"  Realistic ({format_money(realistic_price, currency)}): {realistic_status}\n"
+            f"  Optimistic ({format_money(optimistic_price, currency)}): {optimistic_status}\n\n"
+        )
+        self._fragments[coin_name] = (key, fragment)
+        self.fragments_rendered += 1
+        return fragment
+
+    def _footer(self, updated_at: Optional[float]) -> str:
+        if updated_at is None:
+            return f"Last updated: {datetime.now():%Y-%m-%d %H:%M:%S}"
+
+        if updated_at != self._footer_at:
+            self._footer_at = updated_at
+            self._footer_text = f"Last updated: {datetime.fromtimestamp(updated_at):%Y-%m-%d %H:%M:%S}"
+        return self._footer_text
@@ -0,0 +1,240 @@
+"""
+Per-chat price target subscriptions
+Stores each chat's coins and targets in SQLite, indexed by (coin, price) so a
+tick only looks at the targets inside the price move since the last tick.
+Each target remembers whether it has been notified; new targets are checked
+against the current price once, on the first tick after they were set.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (
+    chat_id INTEGER NOT NULL,
+    coin TEXT NOT NULL,
+    level TEXT NOT NULL,
+    price REAL NOT NULL,
+    notified INTEGER,   -- 1 once fired, 0 when armed, NULL until first checked
+    PRIMARY KEY (chat_id, coin, level)
+);
+CREATE INDEX IF NOT EXISTS targets_by_coin_price ON targets (coin, price);
+CREATE TABLE IF NOT EXISTS last_prices (
+    coin TEXT PRIMARY KEY,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS live_messages (
+    chat_id INTEGER PRIMARY KEY,
+    message_id INTEGER NOT NULL
+);
+"""
+
+
+class TargetEvent(NamedTuple):
+    chat_id: int
+    coin: str       # CoinGecko ID
+    level: str
+    target: float
+    price: float
+    fired: bool     # True when the target was reached, False when it was re-armed
+
+
+class SubscriptionStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._db.execute("CREATE INDEX IF NOT EXISTS targets_pending ON targets (coin) WHERE notified IS NULL")
+
+        self._coins: Set[str] = set()
+        # Coins with targets that have not been checked against a price yet
+        self._pending: Set[str] = set()
+        self._data_version = None
+        self._load_coins()
+        self._last_prices: Dict[str, float] = dict(self._db.execute("SELECT coin, price FROM last_prices"))
+
+    def _migrate(self):
+        """Add the notified column to stores created without it"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(targets)")}
+        if 'notified' in columns:
+            return
+        with self._db:
+            self._db.execute("ALTER TABLE targets ADD COLUMN notified INTEGER")
+            # Targets at or below the last seen price have already fired; coins without one stay pending
+            self._db.execute(
+                "UPDATE targets SET notified = price <= (SELECT price FROM last_prices WHERE coin = targets.coin)"
+            )
+
+    def coins(self) -> Set[str]:
+        """Return the CoinGecko IDs that have at least one subscription"""
+        with self._lock:
+            self._reload_if_changed()
+            return set(self._coins)
+
+    def _reload_if_changed(self):
+        # data_version changes when another connection (e.g. a webhook worker) commits
+        if self._db.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load_coins()
+
+    def _load_coins(self):
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        self._coins = {row[0] for row in self._db.execute("SELECT DISTINCT coin FROM targets")}
+        self._pending = {row[0] for row in self._db.execute("SELECT DISTINCT coin FROM targets WHERE notified IS NULL")}
+
+    def set_targets(self, chat_id: int, coin: str, realistic: float, optimistic: Optional[float] = None):
+        """Create or replace a chat's targets for a coin, without an optimistic level if it is None"""
+        rows = [(chat_id, coin, 'realistic', realistic)]
+        if optimistic is not None:
+            rows.append((chat_id, coin, 'optimistic', optimistic))
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM targets WHERE chat_id = ? AND coin = ?", (chat_id, coin))
+            self._db.executemany("INSERT INTO targets (chat_id, coin, level, price) VALUES (?, ?, ?, ?)", rows)
+            self._coins.add(coin)
+            self._pending.add(coin)
+
+    def set_targets_many(self, rows: List[Tuple[int, str, str, float]]):
+        """Bulk insert or replace (chat_id, coin, level, price) rows"""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO targets (chat_id, coin, level, price) VALUES (?, ?, ?, ?)", rows
+            )
+            self._coins.update(coin for _, coin, _, _ in rows)
+            self._pending.update(coin for _, coin, _, _ in rows)
+
+    def remove(self, chat_id: int, coin: str) -> bool:
+        """Delete a chat's targets for a coin, returns False if there were none"""
+        with self._lock, self._db:
+            deleted = self._db.execute(
+                "DELETE FROM targets WHERE chat_id = ? AND coin = ?", (chat_id, coin)
+            ).rowcount
+            if not self._db.execute("SELECT 1 FROM targets WHERE coin = ? LIMIT 1", (coin,)).fetchone():
+                # Nobody watches the coin any more, so its last price would only go stale
+                self._coins.discard(coin)
+                self._pending.discard(coin)
+                self._last_prices.pop(coin, None)
+                self._db.execute("DELETE FROM last_prices WHERE coin = ?", (coin,))
+        return deleted > 0
+
+    def targets_for_chat(self, chat_id: int) -> Dict[str, Dict[str, float]]:
+        """Return {coin: {level: price}} for a chat"""
+        targets: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT coin, level, price FROM targets WHERE chat_id = ? ORDER BY coin", (chat_id,)
+            ).fetchall()
+        for coin, level, price in rows:
+            targets.setdefault(coin, {})[level] = price
+        return targets
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM targets").fetchone()[0]
+
+    def set_live_message(self, chat_id: int, message_id: int):
+        """Remember the live status message of a chat, replacing any previous one"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO live_messages (chat_id, message_id) VALUES (?, ?)", (chat_id, message_id)
+            )
+
+    def remove_live_message(self, chat_id: int) -> bool:
+        """Forget a chat's live status message, returns False if it had none"""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM live_messages WHERE chat_id = ?", (chat_id,)).rowcount > 0
+
+    def live_messages(self) -> Dict[int, int]:
+        """Return {chat_id: message_id} for every chat with a live status message"""
+        with self._lock:
+            return dict(self._db.execute("SELECT chat_id, message_id FROM live_messages"))
+
+    def last_price(self, coin: str) -> Optional[float]:
+        return self._last_prices.get(coin)
+
+    def crossings(self, coin: str, old_price: Optional[float], new_price: float) -> List[TargetEvent]:
+        """Return targets crossed by a move from old_price to new_price and update their notified flags
+
+        Moving up fires armed targets in (old, new]; moving down re-arms fired
+        targets in (new, old]. Targets not checked yet fire if the new price is
+        at or above them, however the coin moved, and are armed otherwise.
+        Without a previous price every target is compared with the new price.
+        """
+        with self._lock, self._db:
+            return self._crossings(coin, old_price, new_price)
+
+    def _crossings(self, coin: str, old_price: Optional[float], new_price: float) -> List[TargetEvent]:
+        """crossings() for a caller holding the lock inside a transaction"""
+        execute = self._db.execute
+        if old_price is None:
+            fired_rows = execute(
+                "SELECT rowid, chat_id, level, price FROM targets WHERE coin = ? AND price <= ? "
+                "AND (notified = 0 OR notified IS NULL)", (coin, new_price)
+            ).fetchall()
+            reset_rows = execute(
+                "SELECT rowid, chat_id, level, price FROM targets WHERE coin = ? AND price > ? AND notified = 1",
+                (coin, new_price)
+            ).fetchall()
+        else:
+            fired_rows = execute(
+                "SELECT rowid, chat_id, level, price FROM targets WHERE coin = ? AND price <= ? AND notified IS NULL",
+                (coin, new_price)
+            ).fetchall() if coin in self._pending else []
+            reset_rows = []
+            if new_price > old_price:
+                fired_rows += execute(
+                    "SELECT rowid, chat_id, level, price FROM targets "
+                    "WHERE coin = ? AND price > ? AND price <= ? AND notified = 0",
+                    (coin, old_price, new_price)
+                ).fetchall()
+            elif new_price < old_price:
+                reset_rows = execute(
+                    "SELECT rowid, chat_id, level, price FROM targets "
+                    "WHERE coin = ? AND price > ? AND price <= ? AND notified = 1",
+                    (coin, new_price, old_price)
+                ).fetchall()
+
+        if fired_rows:
+            self._db.executemany("UPDATE targets SET notified = 1 WHERE rowid = ?", [row[:1] for row in fired_rows])
+        if reset_rows:
+            self._db.executemany("UPDATE targets SET notified = 0 WHERE rowid = ?", [row[:1] for row in reset_rows])
+        if coin in self._pending:
+            # Unchecked targets above the price are armed
+            execute("UPDATE targets SET notified = 0 WHERE coin = ? AND price > ? AND notified IS NULL",
+                    (coin, new_price))
+            self._pending.discard(coin)
+
+        return (
+            [TargetEvent(chat_id, coin, level, target, new_price, True) for _, chat_id, level, target in fired_rows]
+            + [TargetEvent(chat_id, coin, level, target, new_price, False) for _, chat_id, level, target in reset_rows]
+        )
+
+    def evaluate(self, prices: Dict[str, float]) -> List[TargetEvent]:
+        """Check subscribed coins against a {coingecko_id: price} snapshot and remember the prices"""
+        events: List[TargetEvent] = []
+        moved: List[Tuple[str, float]] = []
+        # One transaction for the whole snapshot, committing per coin costs more than the queries
+        with self._lock, self._db:
+            self._reload_if_changed()
+            for coin in list(self._coins):
+                new_price = prices.get(coin)
+                if new_price is None:
+                    continue
+                old_price = self._last_prices.get(coin)
+                if old_price == new_price and coin not in self._pending:
+                    continue
+                events.extend(self._crossings(coin, old_price, new_price))
+                if old_price != new_price:
+                    moved.append((coin, new_price))
+
+            if moved:
+                self._last_prices.update(moved)
+                self._db.executemany("INSERT OR REPLACE INTO last_prices (coin, price) VALUES (?, ?)", moved)
+        return events
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Targets file of the monitor_env fixture
+TARGETS = """
+[coins.bitcoin]
+symbol = "BTC"
+coingecko_id = "bitcoin"
+realistic_price = 200000
+optimistic_price = 300000
+
+[[rules]]
+coin = "bitcoin"
+type = "above"
+price = 100000
+"""
+
+
+@pytest.fixture
+def monitor_env(tmp_path, monkeypatch):
+    targets = tmp_path / 'targets.toml'
+    targets.write_text(TARGETS)
+    for name, value in {
+        'TELEGRAM_BOT_TOKEN': '123:test',
+        'TELEGRAM_CHAT_ID': '1',
+        'TARGETS_FILE': str(targets),
+        'STATE_FILE': str(tmp_path / 'state.json'),
+        'SUBSCRIPTIONS_DB': str(tmp_path / 'subscriptions.db'),
+        'PRICE_HISTORY_DIR': str(tmp_path / 'history'),
+        'CONFIG_RELOAD_SECONDS': '0',
+    }.items():
+        monkeypatch.setenv(name, value)
@@ -0,0 +1,52 @@
+"""
+Tests for alert rules and their state across restarts
+"""
+
+import asyncio
+import json
+
+from alert_rules import AlertRule, RuleEngine
+
+
+def test_rule_state_round_trips_through_json():
+    rules = [AlertRule('bitcoin', 'above', 'above', 100000.0), AlertRule('bitcoin', 'below', 'below', 50000.0)]
+    engine = RuleEngine.from_rules(rules)
+    assert [event.rule for event in engine.evaluate({'bitcoin': 110000.0})] == [rules[0]]
+
+    restarted = RuleEngine.from_rules(rules)
+    restarted.restore_state(json.loads(json.dumps(engine.to_state())))
+    assert restarted.evaluate({'bitcoin': 110000.0}) == []
+    # Still re-arms and fires again once the price has been back below
+    assert [event.fired for event in restarted.evaluate({'bitcoin': 90000.0})] == [False]
+    assert [event.fired for event in restarted.evaluate({'bitcoin': 110000.0})] == [True]
+
+
+def test_reset_coins_start_over():
+    rules = [AlertRule('bitcoin', 'above', 'above', 100000.0)]
+    engine = RuleEngine.from_rules(rules)
+    engine.evaluate({'bitcoin': 110000.0})
+
+    restarted = RuleEngine.from_rules(rules)
+    restarted.restore_state(engine.to_state(), reset_coins=['bitcoin'])
+    assert len(restarted.evaluate({'bitcoin': 110000.0})) == 1
+
+
+def test_restart_does_not_repeat_rule_alerts(monitor_env):
+    from crypto_monitor import CryptoPriceMonitor
+
+    async def run_once():
+        monitor = CryptoPriceMonitor()
+        monitor.restore_state()
+        sent = []
+
+        async def send_notification(message, chat_id=None):
+            sent.append(message)
+
+        monitor.send_notification = send_notification
+        if await monitor.check_alert_rules({'bitcoin': 110000.0}):
+            monitor.save_state()
+        await monitor.close()
+        return sent
+
+    assert len(asyncio.run(run_once())) == 1
+    assert asyncio.run(run_once()) == []
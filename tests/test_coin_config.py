@@ -0,0 +1,67 @@
+"""
+Tests for the targets file and its hot reload
+"""
+
+import asyncio
+import tomllib
+
+import pytest
+
+from coin_config import ConfigWatcher, load_config, parse_config
+
+COINS = """
+[coins.bitcoin]
+symbol = "BTC"
+coingecko_id = "bitcoin"
+realistic_price = 200000
+optimistic_price = 300000
+"""
+
+
+@pytest.mark.parametrize('rule', [
+    'type = "sma"\nperiod = [5]',
+    'type = "below"\nprice = {a = 1}',
+    'type = "below"\nprice = 1\nchat_id = [1]',
+    'type = "below"',
+])
+def test_invalid_rule_values_are_config_errors(rule):
+    data = tomllib.loads(f'{COINS}\n[[rules]]\ncoin = "bitcoin"\n{rule}\n')
+    with pytest.raises(ValueError):
+        parse_config(data)
+
+
+@pytest.mark.parametrize('coin', ['BTC', 'bitcoin', ' Bitcoin '])
+def test_rule_coins_resolve_to_coin_names(coin):
+    data = tomllib.loads(f'{COINS}\n[[rules]]\ncoin = "{coin}"\ntype = "below"\nprice = 1\n')
+    assert parse_config(data).rules[0].coin == 'bitcoin'
+
+
+def test_unknown_rule_coin_is_rejected():
+    data = tomllib.loads(f'{COINS}\n[[rules]]\ncoin = "DOGE"\ntype = "below"\nprice = 1\n')
+    with pytest.raises(ValueError, match='DOGE'):
+        parse_config(data)
+
+
+def test_watcher_survives_a_failing_reload(tmp_path):
+    path = tmp_path / 'targets.toml'
+    path.write_text(COINS)
+    applied = []
+
+    def on_change(config):
+        applied.append(config)
+        if len(applied) == 1:
+            raise RuntimeError("callback failed")
+
+    watcher = ConfigWatcher(load_config(str(path)), on_change, interval=0.01)
+
+    async def run():
+        watcher.start()
+        path.write_text(COINS.replace('200000', '210000'))
+        await asyncio.sleep(0.1)
+        path.write_text(COINS.replace('200000', '220000') + ' ')
+        await asyncio.sleep(0.1)
+        await watcher.stop()
+
+    asyncio.run(run())
+    assert [config.coins['bitcoin'].realistic_price for config in applied] == [210000, 220000]
+    assert watcher.errors == 1
@@ -0,0 +1,55 @@
+"""
+Tests for the live status dashboard
+"""
+
+import asyncio
+
+from live_status import LiveStatusBoard
+from subscriptions import SubscriptionStore
+
+
+class FakeBot:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message_text(self, text, chat_id, message_id, parse_mode=None):
+        self.edits.append(text)
+
+
+def test_throttled_refresh_reports_it_did_not_run(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subs.db'))
+    store.set_live_message(1, 10)
+    board = LiveStatusBoard(store, min_interval=60)
+    bot = FakeBot()
+
+    async def run():
+        assert await board.refresh(bot, "first")
+        assert not await board.refresh(bot, "second")
+        assert await board.refresh(bot, "second", force=True)
+
+    asyncio.run(run())
+    assert bot.edits == ["first", "second"]
+
+
+def test_live_status_retries_a_throttled_snapshot(monitor_env):
+    from crypto_monitor import CryptoPriceMonitor
+
+    monitor = CryptoPriceMonitor()
+    monitor._bot = FakeBot()
+    monitor.subscriptions.set_live_message(1, 10)
+    monitor.live_status.min_interval = 60
+
+    async def run():
+        monitor.price_cache.put({'bitcoin': 100.0})
+        await monitor.refresh_live_status(monitor.price_cache.snapshot)
+        monitor.price_cache.put({'bitcoin': 101.0})
+        await monitor.refresh_live_status(monitor.price_cache.snapshot)
+        assert len(monitor._bot.edits) == 1
+        # The interval has passed: the same snapshot is shown on the next call
+        monitor.live_status._last_refresh = float('-inf')
+        await monitor.refresh_live_status(monitor.price_cache.snapshot)
+        await monitor.close()
+
+    asyncio.run(run())
+    assert len(monitor._bot.edits) == 2
+    assert '101' in monitor._bot.edits[1]
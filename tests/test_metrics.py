@@ -0,0 +1,43 @@
+"""
+Tests for the metrics endpoint
+"""
+
+import asyncio
+import socket
+import threading
+import urllib.request
+
+from metrics import REGISTRY
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_scrapes_read_stats_on_the_event_loop(monitor_env, monkeypatch):
+    from crypto_monitor import CryptoPriceMonitor
+
+    monkeypatch.setenv('METRICS_PORT', str(free_port()))
+    monitor = CryptoPriceMonitor()
+    threads = []
+    collect_metrics = monitor.collect_metrics
+
+    def recording_collect(*args):
+        threads.append(threading.current_thread())
+        return collect_metrics(*args)
+
+    monitor.collect_metrics = recording_collect
+
+    async def run():
+        server = monitor.start_metrics_server()
+        body = await asyncio.to_thread(lambda: urllib.request.urlopen(f"{server.url}/metrics").read().decode())
+        collector = monitor._metrics_collector
+        await monitor.close()
+        return body, collector
+
+    body, collector = asyncio.run(run())
+    assert 'crypto_price_checks_total' in body
+    assert threads == [threading.main_thread()]
+    assert collector not in REGISTRY._collectors
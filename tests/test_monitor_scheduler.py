@@ -0,0 +1,22 @@
+"""
+Tests for the monitor loop scheduler
+"""
+
+import pytest
+
+from monitor_scheduler import MonitorScheduler
+
+
+async def tick():
+    pass
+
+
+@pytest.mark.parametrize('interval', [0, -60, float('nan')])
+def test_rejects_an_interval_that_is_not_positive(interval):
+    with pytest.raises(ValueError):
+        MonitorScheduler(tick, interval)
+
+
+def test_rejects_negative_jitter():
+    with pytest.raises(ValueError):
+        MonitorScheduler(tick, 60, jitter=-1)
@@ -0,0 +1,104 @@
+"""
+Tests for the shared price snapshot cache
+"""
+
+import asyncio
+import threading
+import time
+
+from price_cache import PriceCache
+
+
+class CountingLoader:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return dict(self.prices)
+
+
+def test_merged_stream_prices_do_not_postpone_the_next_poll():
+    loader = CountingLoader({'bitcoin': 100.0, 'ethereum': 10.0})
+    cache = PriceCache(lambda: None, async_loader=loader, ttl=0.1)
+
+    async def run():
+        await cache.aget(allow_stale=False)
+        cache.merge({'bitcoin': 101.0})
+        assert cache.peek() == {'bitcoin': 101.0, 'ethereum': 10.0}
+        # Still fresh from the poll, so no new request
+        await cache.aget(allow_stale=False)
+        assert loader.calls == 1
+
+        time.sleep(0.11)
+        cache.merge({'bitcoin': 102.0})
+        assert await cache.aget(allow_stale=False) == {'bitcoin': 100.0, 'ethereum': 10.0}
+        assert loader.calls == 2
+
+    asyncio.run(run())
+
+
+def test_failing_update_callback_does_not_fail_put():
+    cache = PriceCache(lambda: None, ttl=60)
+
+    def on_update(prices, updated_at):
+        raise ValueError("snapshot too large")
+
+    cache.on_update = on_update
+    cache.put({'bitcoin': 100.0})
+    assert cache.snapshot.prices == {'bitcoin': 100.0}
+    assert cache.snapshot.version == 1
+
+
+def test_get_and_aget_share_one_refresh():
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append('sync')
+        release.wait(5)
+        return {'bitcoin': 100.0}
+
+    async def async_loader():
+        calls.append('async')
+        await asyncio.to_thread(release.wait, 5)
+        return {'bitcoin': 101.0}
+
+    # A blocking refresh in flight: aget waits for it instead of starting its own
+    cache = PriceCache(loader, async_loader=async_loader, ttl=60)
+    thread = threading.Thread(target=cache.get)
+    thread.start()
+    while not calls:
+        time.sleep(0.001)
+
+    async def aget_then_release():
+        task = asyncio.ensure_future(cache.aget())
+        await asyncio.sleep(0.05)
+        release.set()
+        return await task
+
+    assert asyncio.run(aget_then_release()) == {'bitcoin': 100.0}
+    thread.join()
+    assert calls == ['sync']
+
+    # An async refresh in flight: get() on another thread waits for it
+    calls.clear()
+    release.clear()
+    cache.invalidate()
+    cache.ttl = 0
+    results = []
+
+    async def get_from_thread_then_release():
+        task = asyncio.ensure_future(cache.aget())
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=lambda: results.append(cache.get()))
+        thread.start()
+        await asyncio.sleep(0.05)
+        release.set()
+        await task
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(get_from_thread_then_release())
+    assert calls == ['async']
+    assert results == [{'bitcoin': 101.0}]
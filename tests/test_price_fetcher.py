@@ -0,0 +1,31 @@
+"""
+Tests for the pooled price API client
+"""
+
+import asyncio
+
+import httpx
+
+import price_fetcher
+from price_fetcher import PriceFetcher
+
+
+def test_cached_requests_are_bounded(monkeypatch):
+    monkeypatch.setattr(price_fetcher, 'MAX_CACHED_REQUESTS', 4)
+    fetcher = PriceFetcher()
+    fetcher._new_client = lambda: httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={'ids': request.url.params['ids']}))
+    )
+
+    async def run():
+        # The batch keeps being used while one-off lookups come and go
+        for i in range(20):
+            await fetcher.get_json('http://prices', {'ids': 'bitcoin,ethereum'})
+            await fetcher.get_json('http://prices', {'ids': f"coin-{i}"})
+        await fetcher.aclose()
+
+    asyncio.run(run())
+
+    assert len(fetcher._responses) == len(fetcher._urls) == 4
+    assert ('http://prices', (('ids', 'bitcoin,ethereum'),)) in fetcher._responses
+    assert fetcher.unchanged == 19
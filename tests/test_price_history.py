@@ -0,0 +1,40 @@
+"""
+Tests for the on-disk price history
+"""
+
+import os
+import time
+
+import price_history
+from price_history import PriceHistory
+
+
+def test_open_files_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_history, 'MAX_OPEN_FILES', 8)
+    history = PriceHistory(str(tmp_path))
+    coins = [f"coin-{i}" for i in range(50)]
+    start = time.time() - 7200
+    for minute in range(3):
+        history.append({coin: 100.0 + minute for coin in coins}, start + minute * 60)
+
+    assert len(history._files) <= 8
+    # Records written through evicted handles are all there
+    for coin in coins:
+        assert history.last(coin, 10)['price'].tolist() == [100.0, 101.0, 102.0]
+        assert len(history.last(coin, 10, resolution='1m')) == 2
+    history.close()
+
+
+def test_compaction_closes_handles_of_sanitized_coin_ids(tmp_path):
+    history = PriceHistory(str(tmp_path), retention_days=1)
+    coin = 'wrapped/bitcoin'
+    now = time.time()
+    history.append({coin: 1.0}, now - 3 * 86_400)
+    history._last_compact = float('-inf')
+    history.append({coin: 2.0}, now)
+
+    assert (coin, 'raw') not in history._files
+    history.append({coin: 3.0}, now + 1)
+    assert history.last(coin, 10)['price'].tolist() == [2.0, 3.0]
+    assert os.path.getsize(history._path(coin, 'raw')) == 2 * price_history.TICK_DTYPE.itemsize
+    history.close()
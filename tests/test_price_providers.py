@@ -0,0 +1,97 @@
+"""
+Tests for failover between price providers and their circuit breakers
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from price_providers import HedgedPriceProvider, PriceProvider
+
+
+class FakeProvider(PriceProvider):
+    def __init__(self, name: str, price: float = 100.0):
+        self.name = name
+        self.price = price
+        self.failing = False
+        self.calls = 0
+
+    async def fetch(self, http, coin_ids):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError(f"{self.name} is down")
+        return {coin_id: self.price for coin_id in coin_ids}
+
+
+def fetch(hedged: HedgedPriceProvider):
+    return asyncio.run(hedged.fetch(None, ['bitcoin']))
+
+
+def test_failing_primary_opens_then_recovers_through_one_trial():
+    primary, backup = FakeProvider('primary', 100.0), FakeProvider('backup', 101.0)
+    hedged = HedgedPriceProvider([primary, backup])
+    breaker = hedged.breakers['primary']
+    breaker.reset_timeout = 0.05
+
+    primary.failing = True
+    for _ in range(breaker.failure_threshold):
+        assert fetch(hedged) == {'bitcoin': 101.0}
+    assert breaker.state == 'open'
+
+    # While open the primary is skipped, every tick is served by the backup
+    calls = primary.calls
+    assert fetch(hedged) == {'bitcoin': 101.0}
+    assert primary.calls == calls
+
+    # After the reset timeout one trial goes through; a failed trial opens the breaker again
+    time.sleep(0.06)
+    assert fetch(hedged) == {'bitcoin': 101.0}
+    assert primary.calls == calls + 1
+    assert breaker.state == 'open'
+
+    primary.failing = False
+    time.sleep(0.06)
+    assert breaker.available()
+    assert fetch(hedged) == {'bitcoin': 100.0}
+    assert breaker.state == 'closed'
+
+
+def test_breaker_is_not_half_opened_for_a_provider_that_was_not_called():
+    primary, backup = FakeProvider('primary', 100.0), FakeProvider('backup', 101.0)
+    hedged = HedgedPriceProvider([primary, backup])
+    backup_breaker = hedged.breakers['backup']
+    backup_breaker.state, backup_breaker.opened_at = 'open', time.monotonic() - backup_breaker.reset_timeout
+
+    # The primary answers, so the backup's trial is never taken
+    assert fetch(hedged) == {'bitcoin': 100.0}
+    assert backup.calls == 0
+    assert backup_breaker.state == 'open'
+
+    # Once the primary fails the backup gets its trial and closes again
+    primary.failing = True
+    for _ in range(3):
+        assert fetch(hedged) == {'bitcoin': 101.0}
+    assert backup_breaker.state == 'closed'
+
+
+def test_half_open_breaker_admits_a_single_trial():
+    hedged = HedgedPriceProvider([FakeProvider('primary')])
+    breaker = hedged.breakers['primary']
+    breaker.state, breaker.opened_at = 'open', time.monotonic() - breaker.reset_timeout
+
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+    assert not breaker.available()
+
+    # An abandoned trial lets the next call try again
+    breaker.record_cancelled()
+    assert breaker.allow()
+
+
+def test_all_providers_failing_raises():
+    primary, backup = FakeProvider('primary'), FakeProvider('backup')
+    primary.failing = backup.failing = True
+    with pytest.raises(RuntimeError, match="All price providers failed"):
+        fetch(HedgedPriceProvider([primary, backup]))
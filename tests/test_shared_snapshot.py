@@ -0,0 +1,40 @@
+"""
+Tests for snapshots shared with webhook workers
+"""
+
+import asyncio
+
+from fx_rates import FxRates
+from shared_snapshot import SharedSnapshot, SnapshotFxRates
+
+
+class FakeHttp:
+    def __init__(self, rates):
+        self.rates = rates
+        self.calls = 0
+
+    async def get_json(self, url):
+        self.calls += 1
+        return {'rates': {currency: {'value': value} for currency, value in self.rates.items()}}
+
+
+def test_workers_take_exchange_rates_from_the_leader(tmp_path):
+    path = str(tmp_path / 'fx')
+    leader = FxRates('http://fx')
+    published = SharedSnapshot(path, create=True, size=1 << 16)
+    leader.on_update = published.write
+    worker = SnapshotFxRates(SharedSnapshot(path))
+    http = FakeHttp({'usd': 100_000.0, 'eur': 90_000.0})
+
+    async def run():
+        await worker.ensure_fresh(http, ['eur'])
+        assert worker.rate('eur') != worker.rate('eur')
+        await leader.ensure_fresh(http, ['eur'])
+        await worker.ensure_fresh(http, ['eur'])
+
+    asyncio.run(run())
+
+    assert http.calls == 1
+    assert worker.rate('eur') == 0.9
+    assert worker.version == 1
+    assert worker.updated_at == leader.updated_at
@@ -0,0 +1,110 @@
+"""
+Tests for the per-chat subscription store
+"""
+
+import sqlite3
+
+from subscriptions import SubscriptionStore
+
+
+def test_single_target_fires_once(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subs.db'))
+    store.evaluate({'bitcoin': 100.0})
+    store.set_targets(1, 'bitcoin', 110.0)
+
+    events = store.evaluate({'bitcoin': 120.0})
+
+    assert [(e.level, e.target) for e in events] == [('realistic', 110.0)]
+    assert store.targets_for_chat(1) == {'bitcoin': {'realistic': 110.0}}
+
+
+def test_set_targets_replaces_optimistic_level(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subs.db'))
+    store.set_targets(1, 'bitcoin', 110.0, 130.0)
+    store.set_targets(1, 'bitcoin', 115.0)
+
+    assert store.targets_for_chat(1) == {'bitcoin': {'realistic': 115.0}}
+
+
+def test_remove_last_watcher_forgets_last_price(tmp_path):
+    path = str(tmp_path / 'subs.db')
+    store = SubscriptionStore(path)
+    store.set_targets(1, 'bitcoin', 110.0, 130.0)
+    store.set_targets(2, 'bitcoin', 120.0)
+    store.evaluate({'bitcoin': 100.0})
+
+    store.remove(1, 'bitcoin')
+    assert store.last_price('bitcoin') == 100.0
+    store.remove(2, 'bitcoin')
+    assert store.last_price('bitcoin') is None
+    store.close()
+
+    assert SubscriptionStore(path).last_price('bitcoin') is None
+
+
+def test_second_subscriber_on_tracked_coin_fires_on_first_check(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subs.db'))
+    store.set_targets(5, 'solana', 100.0)
+    assert [(e.chat_id, e.fired) for e in store.evaluate({'solana': 150.0})] == [(5, True)]
+
+    store.set_targets(6, 'solana', 120.0)
+    events = store.evaluate({'solana': 151.0})
+
+    assert [(e.chat_id, e.level, e.fired) for e in events] == [(6, 'realistic', True)]
+
+
+def test_new_target_fires_without_a_price_move(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subs.db'))
+    store.set_targets(5, 'solana', 100.0)
+    store.evaluate({'solana': 150.0})
+
+    store.set_targets(6, 'solana', 120.0, 200.0)
+    events = store.evaluate({'solana': 150.0})
+
+    assert [(e.chat_id, e.level, e.fired) for e in events] == [(6, 'realistic', True)]
+    # Checked once, so it stays quiet until the price dips below it and comes back
+    assert store.evaluate({'solana': 150.0}) == []
+
+
+def test_only_fired_targets_are_rearmed(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subs.db'))
+    store.set_targets(5, 'solana', 100.0)
+    store.evaluate({'solana': 150.0})
+    store.set_targets(6, 'solana', 140.0)
+    store.evaluate({'solana': 130.0})
+
+    events = store.evaluate({'solana': 90.0})
+
+    assert [(e.chat_id, e.fired) for e in events] == [(5, False)]
+    events = store.evaluate({'solana': 145.0})
+    assert sorted((e.chat_id, e.fired) for e in events) == [(5, True), (6, True)]
+
+
+def test_subscription_from_another_connection_is_checked(tmp_path):
+    path = str(tmp_path / 'subs.db')
+    leader = SubscriptionStore(path)
+    leader.set_targets(5, 'solana', 100.0)
+    leader.evaluate({'solana': 150.0})
+
+    SubscriptionStore(path).set_targets(6, 'solana', 120.0)
+
+    assert [(e.chat_id, e.fired) for e in leader.evaluate({'solana': 150.0})] == [(6, True)]
+
+
+def test_store_without_notified_flags_is_migrated(tmp_path):
+    path = str(tmp_path / 'subs.db')
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE targets (chat_id INTEGER NOT NULL, coin TEXT NOT NULL, level TEXT NOT NULL,
+                              price REAL NOT NULL, PRIMARY KEY (chat_id, coin, level));
+        CREATE TABLE last_prices (coin TEXT PRIMARY KEY, price REAL NOT NULL);
+        INSERT INTO targets VALUES (1, 'solana', 'realistic', 100.0), (1, 'solana', 'optimistic', 200.0);
+        INSERT INTO last_prices VALUES ('solana', 150.0);
+    """)
+    db.close()
+
+    store = SubscriptionStore(path)
+
+    # The realistic target fired before the upgrade and is not notified again
+    assert store.evaluate({'solana': 150.0}) == []
+    assert [(e.level, e.fired) for e in store.evaluate({'solana': 210.0})] == [('optimistic', True)]
@@ -0,0 +1,50 @@
+"""
+Tests for the webhook worker pool
+"""
+
+import time
+
+import webhook_server
+from webhook_server import WorkerPool
+
+
+class FakeProcess:
+    def __init__(self, alive=True, exitcode=None):
+        self.alive = alive
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakeQueue:
+    def cancel_join_thread(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_dead_worker_is_restarted_on_dispatch(monkeypatch):
+    pool = WorkerPool(2, 10, ())
+    started = []
+
+    def start(index):
+        started.append(index)
+        pool.queues[index] = FakeQueue()
+        pool.processes[index] = FakeProcess()
+        pool._started_at[index] = time.monotonic()
+
+    monkeypatch.setattr(pool, '_start', start)
+    pool.start()
+    first_queue = pool.queues[1]
+
+    pool.processes[1].alive, pool.processes[1].exitcode = False, -9
+    # Still within the restart delay of its last start: the update is refused rather than queued
+    assert pool.queue(1) is None
+    pool._started_at[1] -= webhook_server.WORKER_RESTART_DELAY
+
+    assert pool.queue(1) is pool.queues[1] is not first_queue
+    assert first_queue.closed
+    assert started == [0, 1, 1]
+    assert pool.queue(0) is pool.queues[0]
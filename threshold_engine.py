@@ -0,0 +1,140 @@
+"""
+Vectorized price threshold engine
+Keeps every (coin, level) target and its notified flag in columnar NumPy arrays
+and evaluates a whole price snapshot in one batched pass.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+
+
+class ThresholdEvent(NamedTuple):
+    coin: str
+    level: str      # e.g. 'realistic' or 'optimistic'
+    target: float
+    price: float
+    fired: bool     # True when the target was reached, False when it was re-armed
+
+
+class ThresholdEngine:
+    def __init__(self):
+        self._coins: List[str] = []
+        self._coin_index: Dict[str, int] = {}
+        self._levels: List[str] = []
+        self._level_index: Dict[str, int] = {}
+
+        # One row per threshold
+        self.coin_idx = np.empty(0, dtype=np.int32)
+        self.level_idx = np.empty(0, dtype=np.int32)
+        self.targets = np.empty(0, dtype=np.float64)
+        # Replaced by a new read-only array whenever a flag changes, never written in
+        # place, so a reader holding it sees the flags of one evaluation
+        self.notified = self._frozen(np.empty(0, dtype=bool))
+
+    @classmethod
+    def from_config(cls, crypto_config: Dict[str, Dict]) -> 'ThresholdEngine':
+        """Build an engine with realistic and optimistic targets for each configured coin"""
+        engine = cls()
+        rows = []
+        for coin_name, config in crypto_config.items():
+            rows.append((coin_name, 'realistic', config['realistic_price']))
+            rows.append((coin_name, 'optimistic', config['optimistic_price']))
+        engine.add_many(rows)
+        return engine
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def add_many(self, rows: Iterable[tuple]):
+        """Append (coin, level, target) rows"""
+        rows = list(rows)
+        if not rows:
+            return
+
+        coin_idx = np.fromiter((self._intern_coin(coin) for coin, _, _ in rows),
+                               dtype=np.int32, count=len(rows))
+        level_idx = np.fromiter((self._intern_level(level) for _, level, _ in rows),
+                                dtype=np.int32, count=len(rows))
+        targets = np.fromiter((target for _, _, target in rows), dtype=np.float64, count=len(rows))
+
+        self.coin_idx = np.concatenate([self.coin_idx, coin_idx])
+        self.level_idx = np.concatenate([self.level_idx, level_idx])
+        self.targets = np.concatenate([self.targets, targets])
+        self._publish(np.concatenate([self.notified, np.zeros(len(rows), dtype=bool)]))
+
+    def evaluate(self, prices: Dict[str, float]) -> List[ThresholdEvent]:
+        """Fire targets the price reached and re-arm targets it dropped below
+
+        Only thresholds whose notified state changed are returned. Coins missing
+        from the snapshot keep their state.
+        """
+        if not len(self.targets):
+            return []
+
+        coin_prices = np.fromiter((prices.get(coin, np.nan) for coin in self._coins),
+                                  dtype=np.float64, count=len(self._coins))
+
+        row_prices = coin_prices[self.coin_idx]
+        # NaN compares False both ways, so coins without a price are left untouched
+        fired = (row_prices >= self.targets) & ~self.notified
+        rearmed = (row_prices < self.targets) & self.notified
+        changed = np.flatnonzero(fired | rearmed)
+        if not len(changed):
+            return []
+
+        now_notified = fired[changed]
+        notified = self.notified.copy()
+        notified[changed] = now_notified
+        self._publish(notified)
+
+        coins, levels = self._coins, self._levels
+        return [
+            ThresholdEvent(coins[coin_i], levels[level_i], target, price, is_fired)
+            for coin_i, level_i, target, price, is_fired in zip(
+                self.coin_idx[changed].tolist(),
+                self.level_idx[changed].tolist(),
+                self.targets[changed].tolist(),
+                row_prices[changed].tolist(),
+                now_notified.tolist()
+            )
+        ]
+
+    def notified_state(self) -> Dict[str, Dict[str, bool]]:
+        """Return notified flags as {coin: {level: bool}}"""
+        state: Dict[str, Dict[str, bool]] = {}
+        for coin_i, level_i, notified in zip(self.coin_idx.tolist(), self.level_idx.tolist(),
+                                             self.notified.tolist()):
+            state.setdefault(self._coins[coin_i], {})[self._levels[level_i]] = notified
+        return state
+
+    def restore_state(self, state: Dict[str, Dict[str, bool]]):
+        """Set notified flags from a {coin: {level: bool}} mapping"""
+        notified = self.notified.copy()
+        for i, (coin_i, level_i) in enumerate(zip(self.coin_idx.tolist(), self.level_idx.tolist())):
+            levels = state.get(self._coins[coin_i])
+            if levels is not None:
+                notified[i] = bool(levels.get(self._levels[level_i], False))
+        self._publish(notified)
+
+    def _publish(self, notified: np.ndarray):
+        self.notified = self._frozen(notified)
+
+    @staticmethod
+    def _frozen(array: np.ndarray) -> np.ndarray:
+        array.flags.writeable = False
+        return array
+
+    def _intern_coin(self, coin: str) -> int:
+        index = self._coin_index.get(coin)
+        if index is None:
+            index = self._coin_index[coin] = len(self._coins)
+            self._coins.append(coin)
+        return index
+
+    def _intern_level(self, level: str) -> int:
+        index = self._level_index.get(level)
+        if index is None:
+            index = self._level_index[level] = len(self._levels)
+            self._levels.append(level)
+        return index
@@ -0,0 +1,315 @@
+"""
+Webhook entry point for the Telegram Crypto Price Monitor Bot
+Telegram posts updates to an embedded aiohttp server in the leader process,
+which hands them to a pool of worker processes running the command handlers.
+Price fetching, alert evaluation and notifications run only in the leader;
+workers read prices and exchange rates from snapshots shared through
+memory-mapped files and never write the price history.
+"""
+
+import os
+import json
+import queue
+import time
+import signal
+import asyncio
+import logging
+import secrets
+import tempfile
+import threading
+import multiprocessing
+from typing import List, Optional
+
+from aiohttp import web
+from dotenv import load_dotenv
+from telegram import Update
+from telegram.ext import Application
+
+from bot_commands import TelegramBotCommands
+from config import (
+    DEFAULT_WEBHOOK_HOST, DEFAULT_WEBHOOK_PORT, DEFAULT_WEBHOOK_PATH, DEFAULT_WEBHOOK_WORKERS,
+    DEFAULT_WEBHOOK_QUEUE_SIZE
+)
+from crypto_monitor import CryptoPriceMonitor
+from fx_rates import QuoteConverter
+from metrics import REGISTRY
+from shared_snapshot import SharedSnapshot, SnapshotFxRates, SnapshotPriceCache
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Updates each worker handles at the same time
+WORKER_CONCURRENCY = 64
+# The exchange rate table is a few KB
+FX_SNAPSHOT_SIZE = 1 << 16
+# Min seconds between two starts of the same worker, so one that keeps crashing is not respawned per update
+WORKER_RESTART_DELAY = 1.0
+
+WEBHOOK_UPDATES = REGISTRY.counter('crypto_webhook_updates_total', "Updates posted to the webhook", ['result'])
+WORKER_RESTARTS = REGISTRY.counter('crypto_webhook_worker_restarts_total', "Webhook workers restarted after exiting")
+
+
+def update_chat_id(update: dict) -> Optional[int]:
+    """Return the chat an update belongs to, or None for updates without one"""
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get('chat') or value.get('message', {}).get('chat') or value.get('from')
+        if chat and 'id' in chat:
+            return chat['id']
+    return None
+
+
+class WorkerPool:
+    """Worker processes with one update queue each, restarted when they exit"""
+
+    def __init__(self, count: int, queue_size: int, args: tuple):
+        self.queue_size = queue_size
+        self.args = args                # run_worker arguments after the index and queue
+        self.context = multiprocessing.get_context('spawn')
+        self.queues: List = [None] * count
+        self.processes: List = [None] * count
+        self._started_at = [float('-inf')] * count
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def start(self):
+        for index in range(len(self)):
+            self._start(index)
+
+    def _start(self, index: int):
+        # A worker that died inside Queue.get() leaves the queue's read lock taken, so it gets a new queue
+        self.queues[index] = self.context.Queue(self.queue_size)
+        self.processes[index] = self.context.Process(
+            target=run_worker, args=(index, self.queues[index], *self.args),
+            name=f"webhook-worker-{index}", daemon=True
+        )
+        self.processes[index].start()
+        self._started_at[index] = time.monotonic()
+
+    def queue(self, index: int):
+        """Return a worker's update queue, restarting the worker if it exited; None while it can't be"""
+        process = self.processes[index]
+        if process.is_alive():
+            return self.queues[index]
+        if time.monotonic() - self._started_at[index] < WORKER_RESTART_DELAY:
+            return None
+
+        logger.error(f"Webhook worker {index} exited with code {process.exitcode}, restarting it; "
+                     f"updates still queued for it are lost")
+        WORKER_RESTARTS.inc()
+        old_queue = self.queues[index]
+        self._start(index)
+        # Nothing reads the old queue any more, don't wait for its buffered updates at exit
+        old_queue.cancel_join_thread()
+        old_queue.close()
+        return self.queues[index]
+
+    async def stop(self, timeout: float = 10.0):
+        """Ask every worker to finish its queued updates and wait for it"""
+        for updates in self.queues:
+            updates.put(None)
+        for process in self.processes:
+            await asyncio.to_thread(process.join, timeout)
+
+
+class WebhookServer:
+    def __init__(self, workers: WorkerPool, path: str, secret_token: Optional[str],
+                 host: str = DEFAULT_WEBHOOK_HOST, port: int = DEFAULT_WEBHOOK_PORT):
+        self.workers = workers          # One update queue per worker process
+        self.path = path
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        """Start accepting updates"""
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook listening on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Queue a posted update for the worker that owns its chat"""
+        if self.secret_token and not secrets.compare_digest(
+                request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), self.secret_token):
+            WEBHOOK_UPDATES.inc(result='forbidden')
+            return web.Response(status=403)
+
+        body = await request.read()
+        try:
+            update = json.loads(body)
+        except ValueError:
+            WEBHOOK_UPDATES.inc(result='invalid')
+            return web.Response(status=400)
+
+        # Updates of one chat always go to the same worker, so they are handled in order
+        chat_id = update_chat_id(update)
+        key = chat_id if chat_id is not None else update.get('update_id', 0)
+        updates = self.workers.queue(abs(key) % len(self.workers))
+        if updates is None:
+            # The chat's worker exited and is restarted shortly; Telegram retries the update later
+            WEBHOOK_UPDATES.inc(result='worker_down')
+            return web.Response(status=503)
+        try:
+            updates.put_nowait(body)
+        except queue.Full:
+            # Telegram retries the update later
+            WEBHOOK_UPDATES.inc(result='overloaded')
+            return web.Response(status=503)
+
+        WEBHOOK_UPDATES.inc(result='queued')
+        return web.Response()
+
+
+def run_worker(index: int, updates, snapshot_path: str, fx_path: str, concurrency: int):
+    """Worker process: run the bot's handlers for updates queued by the leader"""
+    # The leader decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_handle_updates(index, updates, snapshot_path, fx_path, concurrency))
+
+
+async def _handle_updates(index: int, updates, snapshot_path: str, fx_path: str, concurrency: int):
+    monitor = CryptoPriceMonitor(read_only=True)
+    snapshot = SharedSnapshot(snapshot_path)
+    fx_snapshot = SharedSnapshot(fx_path)
+    # Prices and exchange rates come from the leader, this process never fetches them itself
+    monitor.price_cache = SnapshotPriceCache(snapshot)
+    monitor.fx = SnapshotFxRates(fx_snapshot)
+    monitor.quotes = QuoteConverter(monitor.fx, monitor.quotes.currencies)
+
+    builder = Application.builder().token(monitor.bot_token).updater(None).concurrent_updates(concurrency)
+    if os.getenv('TELEGRAM_BASE_URL'):
+        builder = builder.base_url(os.getenv('TELEGRAM_BASE_URL'))
+    application = builder.build()
+    TelegramBotCommands(monitor).register_handlers(application)
+
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+
+    def feed(body: bytes):
+        application.update_queue.put_nowait(Update.de_json(json.loads(body), application.bot))
+
+    def pump():
+        # multiprocessing queues block, so they are drained on a thread
+        while True:
+            body = updates.get()
+            if body is None:
+                loop.call_soon_threadsafe(stopped.set)
+                return
+            loop.call_soon_threadsafe(feed, body)
+
+    async with application:
+        await application.start()
+        threading.Thread(target=pump, name=f"webhook-worker-{index}-pump", daemon=True).start()
+        # Workers follow the targets file for /help and coin lookups; the leader saves state
+        watcher = monitor.start_config_watcher(persist=False)
+        logger.info(f"Webhook worker {index} ready")
+        await stopped.wait()
+        await application.stop()
+        if watcher is not None:
+            await watcher.stop()
+
+    await monitor.fetcher.aclose()
+    monitor.charts.close()
+    monitor.subscriptions.close()
+    monitor.history.close()
+    snapshot.close()
+    fx_snapshot.close()
+
+
+async def run_leader():
+    """Run the webhook server, worker pool and price monitoring until interrupted"""
+    monitor = CryptoPriceMonitor()
+    worker_count = int(os.getenv('WEBHOOK_WORKERS', DEFAULT_WEBHOOK_WORKERS))
+    path = os.getenv('WEBHOOK_PATH', DEFAULT_WEBHOOK_PATH)
+    secret_token = os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
+
+    # Every snapshot the leader fetches or restores is published to the workers
+    snapshot_path = os.getenv(
+        'SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), f"crypto_monitor_snapshot_{os.getpid()}")
+    )
+    snapshot = SharedSnapshot(snapshot_path, create=True)
+    monitor.price_cache.on_update = snapshot.write
+    fx_snapshot = SharedSnapshot(f"{snapshot_path}_fx", create=True, size=FX_SNAPSHOT_SIZE)
+    monitor.fx.on_update = fx_snapshot.write
+    monitor.restore_state()
+
+    workers = WorkerPool(
+        worker_count, int(os.getenv('WEBHOOK_QUEUE_SIZE', DEFAULT_WEBHOOK_QUEUE_SIZE)),
+        (snapshot_path, fx_snapshot.path, WORKER_CONCURRENCY)
+    )
+    workers.start()
+
+    server = WebhookServer(
+        workers, path, secret_token,
+        host=os.getenv('WEBHOOK_HOST', DEFAULT_WEBHOOK_HOST),
+        port=int(os.getenv('WEBHOOK_PORT', DEFAULT_WEBHOOK_PORT))
+    )
+    scheduler = monitor.create_scheduler()
+    stream = monitor.create_stream()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    async with monitor.bot:
+        monitor.start_notifications()
+        await server.start()
+
+        public_url = os.getenv('WEBHOOK_URL')
+        if public_url:
+            await monitor.bot.set_webhook(
+                public_url.rstrip('/') + path, secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES, drop_pending_updates=True
+            )
+            logger.info(f"Webhook registered at {public_url}")
+        else:
+            logger.warning("WEBHOOK_URL is not set, the webhook was not registered with Telegram")
+
+        scheduler.start()
+        if stream is not None:
+            stream.start()
+        monitor.start_metrics_server(scheduler, stream)
+        monitor.start_config_watcher()
+        logger.info(f"Price monitoring started with {worker_count} webhook worker(s)")
+
+        try:
+            await stopping.wait()
+        finally:
+            await server.stop()
+            await workers.stop()
+            if stream is not None:
+                await stream.stop()
+            await scheduler.stop()
+            await monitor.close()
+            snapshot.close()
+            snapshot.unlink()
+            fx_snapshot.close()
+            fx_snapshot.unlink()
+            logger.info("Webhook server stopped")
+
+
+def main():
+    """Main function that runs the bot in webhook mode"""
+    try:
+        asyncio.run(run_leader())
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    main()